@@ -0,0 +1,98 @@
+"""
+Запросы к бэкенду на выбор аксессуаров в одном расчёте: по запросу accessories/{id}
+на каждое нажатие против индекса характеристик (services.accessory_specs), когда
+список аксессуаров приходит без specs и когда specs уже в нём.
+
+    python benchmarks/bench_accessory_specs.py [--calculations 200] [--accessories 40] [--picks 3]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from backend_replay import ReplayBackend, parse_latency, start_replay_server  # noqa: E402
+from services.accessory_specs import AccessorySpecIndex  # noqa: E402
+from services.backend import BackendClient  # noqa: E402
+from services.catalog import Catalog  # noqa: E402
+
+KINDS = ("fence", "gate")
+
+
+def fixture(path: str, data) -> dict:
+    return {"method": "GET", "path": path, "status": 200, "body": json.dumps({"data": data}, ensure_ascii=False)}
+
+
+def make_fixtures(accessories: int, inline_specs: bool) -> list[dict]:
+    rnd = random.Random(11)
+    fixtures = []
+    for offset, kind in enumerate(KINDS):
+        items = []
+        for i in range(accessories):
+            acc_id = offset * 10_000 + i
+            specs = [{"spec_id": acc_id * 10 + j, "dimension": f"{60 + 20 * j}x{60 + 20 * j}"}
+                     for j in range(rnd.randint(0, 3))]
+            item = {"id": acc_id, "name": f"Аксессуар {acc_id}"}
+            fixtures.append(fixture(f"accessories/{acc_id}", {**item, "specs": specs}))
+            items.append({**item, "specs": specs} if inline_specs else item)
+        fixtures.append(fixture(f"accessories?accessoriableType={kind}", items))
+    return fixtures
+
+
+async def run_mode(mode: str, args) -> tuple[float, float]:
+    stub = ReplayBackend(make_fixtures(args.accessories, mode == "index+inline"), parse_latency(args.latency))
+    runner, url = await start_replay_server(stub)
+    client = BackendClient(url)
+    source = Catalog(client)
+    index = AccessorySpecIndex(source, client)
+    rnd = random.Random(3)
+    press_times = []
+    try:
+        for _ in range(args.calculations):
+            for offset, kind in enumerate(KINDS):
+                # список аксессуаров показывают в обоих случаях; индекс строится в prefetch шага перед ним
+                await source.accessories(kind)
+                if mode != "per-press":
+                    await index.get(kind)
+                for _ in range(args.picks):
+                    acc_id = offset * 10_000 + rnd.randrange(args.accessories)
+                    started = time.perf_counter()
+                    if mode == "per-press":
+                        await client.get_json(f"accessories/{acc_id}")
+                    else:
+                        await index.lookup(kind, acc_id)
+                    press_times.append(time.perf_counter() - started)
+        return stub.requests / args.calculations, statistics.median(press_times)
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+async def run(args):
+    print(f"calculations={args.calculations} accessories={args.accessories}/kind "
+          f"picks={args.picks}/kind latency={args.latency}")
+    print(f"{'mode':<16}{'backend calls / calc':>22}{'press p50 ms':>14}")
+    for mode in ("per-press", "index", "index+inline"):
+        calls, p50 = await run_mode(mode, args)
+        print(f"{mode:<16}{calls:>22.2f}{p50 * 1000:>14.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calculations", type=int, default=200)
+    parser.add_argument("--accessories", type=int, default=40)
+    parser.add_argument("--picks", type=int, default=3)
+    parser.add_argument("--latency", default="fixed:60")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
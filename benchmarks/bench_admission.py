@@ -0,0 +1,130 @@
+"""
+Контроль допуска против стаба, который тормозит под нагрузкой: сверх capacity
+одновременных запросов задержка растёт квадратично (блокировки, свопинг).
+Сравнивает всплеск /calc без ограничений и через AdmissionController.
+
+    python benchmarks/bench_admission.py [--users 400] [--capacity 20] [--max-active 120]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from backend_replay import ReplayBackend, parse_latency, start_replay_server  # noqa: E402
+from services import admission as admission_module  # noqa: E402
+from services.admission import AdmissionController  # noqa: E402
+from services.backend import BackendClient  # noqa: E402
+
+STEP_PATHS = ("fences/types", "fences/popular-specs?typeId=1", "fences?typeId=1&height=2.0",
+              "accessories?accessoriableType=fence", "mountings")
+
+
+class OverloadedBackend(ReplayBackend):
+    """Каждый ответ занимает base_ms * max(1, одновременных / capacity) ** 2."""
+
+    def __init__(self, base_ms: float, capacity: int):
+        fixtures = [{"method": "GET", "path": path, "status": 200, "body": json.dumps({"data": [{"id": 1}]})}
+                    for path in STEP_PATHS]
+        super().__init__(fixtures, parse_latency("none"))
+        self._base = base_ms / 1000
+        self._capacity = capacity
+        self.concurrent = 0
+        self.peak = 0
+
+    async def handle(self, request):
+        self.concurrent += 1
+        self.peak = max(self.peak, self.concurrent)
+        try:
+            await asyncio.sleep(self._base * max(1.0, self.concurrent / self._capacity) ** 2)
+            return await super().handle(request)
+        finally:
+            self.concurrent -= 1
+
+
+async def dialog(client: BackendClient, rnd: random.Random) -> None:
+    for path in STEP_PATHS:
+        await client.get_json(path)
+        await asyncio.sleep(rnd.uniform(0.5, 1.5))  # пользователь думает
+
+
+async def run_scenario(users: int, capacity: int, max_active: int, controlled: bool) -> dict:
+    stub = OverloadedBackend(base_ms=100, capacity=capacity)
+    runner, url = await start_replay_server(stub)
+    client = BackendClient(url)
+    rnd = random.Random(5)
+    controller = AdmissionController(
+        client,
+        max_active=max_active if controlled else users,
+        max_queue=users,
+        latency_target=0.3 if controlled else float("inf"),
+        max_in_flight=capacity * 2 if controlled else users,
+    )
+    admitted_events: dict[int, asyncio.Event] = {}
+    waits = []
+
+    async def notify(chat_id: int):
+        admitted_events[chat_id].set()
+
+    admission_module.TICK_SECONDS = 0.2
+    controller.start(notify)
+
+    async def user(user_id: int):
+        await asyncio.sleep(rnd.uniform(0, 2))  # всплеск за 2 секунды
+        asked = time.perf_counter()
+        admitted_events[user_id] = asyncio.Event()
+        if controller.try_admit(user_id, user_id) is not None:
+            await admitted_events[user_id].wait()
+        waits.append(time.perf_counter() - asked)
+        try:
+            await dialog(client, rnd)
+        finally:
+            controller.release(user_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(users)))
+    total = time.perf_counter() - started
+    await controller.stop()
+
+    p50, p95 = client.latency.percentiles(0.5, 0.95)
+    await client.close()
+    await runner.cleanup()
+    return {
+        "total": total,
+        "p50": p50,
+        "p95": p95,
+        "peak": stub.peak,
+        "wait_p50": statistics.median(waits),
+        "wait_max": max(waits),
+    }
+
+
+async def main_async(users: int, capacity: int, max_active: int):
+    print(f"users={users}, backend capacity={capacity} concurrent requests, base latency 100 ms, "
+          f"max_active={max_active}")
+    print(f"{'mode':<12}{'total s':>9}{'req p50 ms':>12}{'req p95 ms':>12}{'peak conc':>11}"
+          f"{'queue p50 s':>13}{'queue max s':>13}")
+    for name, controlled in (("unlimited", False), ("admission", True)):
+        r = await run_scenario(users, capacity, max_active, controlled)
+        print(f"{name:<12}{r['total']:>9.1f}{r['p50'] * 1000:>12.0f}{r['p95'] * 1000:>12.0f}{r['peak']:>11}"
+              f"{r['wait_p50']:>13.1f}{r['wait_max']:>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=400)
+    parser.add_argument("--capacity", type=int, default=20)
+    parser.add_argument("--max-active", type=int, default=120)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main_async(args.users, args.capacity, args.max_active))
+
+
+if __name__ == "__main__":
+    main()
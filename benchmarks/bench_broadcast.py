@@ -0,0 +1,204 @@
+"""
+Рассылка по реестру пользователей против эмулятора Telegram с общим пределом 30 сообщений/с
+(превышение — 429 с retry_after и бан бота на это время). Параллельно идёт обычный трафик
+диалогов. Сравниваются «внешний скрипт» (gather по 16 без лимитера, ждёт retry_after
+и повторяет) и Broadcaster с SendBudget, плюс остановка на середине и продолжение
+с сохранённой позиции.
+
+    python benchmarks/bench_broadcast.py [--users 600] [--normal-rate 6] [--latency-ms 80]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from telegram.error import RetryAfter  # noqa: E402
+from telegram.ext import ExtBot  # noqa: E402
+from telegram.request import BaseRequest  # noqa: E402
+
+from services.broadcast import Broadcaster, SendBudget, retry_seconds  # noqa: E402
+from services.jobs import JobRunner  # noqa: E402
+from services.users import UserRegistry  # noqa: E402
+
+# чаты обычного трафика — отдельный диапазон, чтобы не путать с получателями рассылки
+NORMAL_CHAT_BASE = 10 ** 9
+TELEGRAM_LIMIT = 30
+BAN_SECONDS = 1
+
+
+class FakeTelegram(BaseRequest):
+    def __init__(self, latency: float):
+        self._latency = latency
+        self._rnd = random.Random(1)
+        self._accepted: deque[float] = deque()
+        self._banned_until = 0.0
+        self.delivered: Counter = Counter()
+        self.rejected = 0
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, **timeouts):
+        await asyncio.sleep(self._latency * self._rnd.uniform(0.5, 1.5))
+        endpoint = url.rsplit("/", 1)[-1]
+        if endpoint == "getMe":
+            return 200, _ok({"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"})
+
+        now = time.monotonic()
+        while self._accepted and self._accepted[0] <= now - 1:
+            self._accepted.popleft()
+        if now >= self._banned_until and len(self._accepted) >= TELEGRAM_LIMIT:
+            self._banned_until = now + BAN_SECONDS
+        if now < self._banned_until:
+            self.rejected += 1
+            retry_after = math.ceil(self._banned_until - now)
+            body = {"ok": False, "error_code": 429, "description": f"Too Many Requests: retry after {retry_after}",
+                    "parameters": {"retry_after": retry_after}}
+            return 429, json.dumps(body).encode()
+
+        self._accepted.append(now)
+        chat_id = int(request_data.parameters["chat_id"])
+        self.delivered[chat_id] += 1
+        return 200, _ok({"message_id": self.delivered.total(), "date": int(time.time()),
+                         "chat": {"id": chat_id, "type": "private"}, "text": "ok"})
+
+
+def _ok(result: dict) -> bytes:
+    return json.dumps({"ok": True, "result": result}).encode()
+
+
+async def normal_traffic(bot: ExtBot, rate: float, stop: asyncio.Event) -> tuple[list[float], int]:
+    """Ответы в диалогах: latency каждого и сколько из них получили 429."""
+    latencies, throttled = [], 0
+    tasks = set()
+
+    async def reply(chat_id: int):
+        nonlocal throttled
+        started = time.perf_counter()
+        try:
+            await bot.send_message(chat_id, "Выберите тип забора")
+            latencies.append(time.perf_counter() - started)
+        except RetryAfter:
+            throttled += 1
+
+    number = 0
+    while not stop.is_set():
+        number += 1
+        task = asyncio.create_task(reply(NORMAL_CHAT_BASE + number))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        await asyncio.sleep(1 / rate)
+    await asyncio.gather(*tasks)
+    return latencies, throttled
+
+
+async def naive_broadcast(bot: ExtBot, registry: UserRegistry) -> None:
+    slots = asyncio.Semaphore(16)
+
+    async def send(chat_id: int):
+        async with slots:
+            while True:
+                try:
+                    await bot.send_message(chat_id, "Скидка 10% на профнастил")
+                    return
+                except RetryAfter as e:
+                    await asyncio.sleep(retry_seconds(e))
+
+    await asyncio.gather(*(send(recipient.chat_id) for recipient in registry.stream()))
+
+
+async def finished(broadcaster: Broadcaster) -> None:
+    while broadcaster.active is not None:
+        await asyncio.sleep(0.05)
+
+
+async def scenario(mode: str, users: int, normal_rate: float, latency: float, tmp: Path) -> dict:
+    users_file = tmp / f"users.{mode}.jsonl"
+    registry = UserRegistry(users_file)
+    for user_id in range(1, users + 1):
+        registry.register(user_id, user_id)
+
+    telegram = FakeTelegram(latency)
+    limiter = SendBudget() if mode != "naive" else None
+    bot = ExtBot("1:TOKEN", request=telegram, get_updates_request=telegram, rate_limiter=limiter)
+    await bot.initialize()
+    runner = JobRunner(2, 10)
+    runner.start()
+    checkpoint = tmp / f"broadcast.{mode}.json"
+    broadcaster = Broadcaster(registry, runner, checkpoint, limiter)
+
+    stop = asyncio.Event()
+    traffic = asyncio.create_task(normal_traffic(bot, normal_rate, stop))
+    started = time.perf_counter()
+    if mode == "naive":
+        await naive_broadcast(bot, registry)
+    else:
+        broadcaster.start(bot, "Скидка 10% на профнастил", admin_chat_id=NORMAL_CHAT_BASE)
+    if mode == "budget":
+        await finished(broadcaster)
+    elif mode == "restart":
+        # рестарт на середине: позиция сохраняется, новый Broadcaster продолжает с неё
+        while broadcaster.active.done < users // 2:
+            await asyncio.sleep(0.05)
+        await broadcaster.suspend()
+        resumed = Broadcaster(UserRegistry(users_file), runner, checkpoint, limiter)
+        await resumed.resume(bot)
+        await finished(resumed)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    latencies, normal_throttled = await traffic
+    await runner.shutdown()
+    await bot.shutdown()
+
+    delivered = {chat: count for chat, count in telegram.delivered.items() if chat < NORMAL_CHAT_BASE}
+    return {
+        "elapsed": elapsed,
+        "rate": len(delivered) / elapsed,
+        "rejected": telegram.rejected,
+        "duplicates": sum(count - 1 for count in delivered.values()),
+        "missed": users - len(delivered),
+        "normal_p95": statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else 0.0,
+        "normal_throttled": normal_throttled,
+    }
+
+
+async def run(users: int, normal_rate: float, latency: float):
+    print(f"users={users} normal={normal_rate}/s latency={latency * 1000:.0f} ms telegram limit={TELEGRAM_LIMIT}/s")
+    print(f"{'mode':<9}{'time s':>8}{'msg/s':>8}{'429':>7}{'dup':>6}{'missed':>8}"
+          f"{'normal p95 ms':>15}{'normal 429':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("naive", "budget", "restart"):
+            r = await scenario(mode, users, normal_rate, latency, Path(tmp))
+            print(f"{mode:<9}{r['elapsed']:>8.1f}{r['rate']:>8.1f}{r['rejected']:>7}{r['duplicates']:>6}"
+                  f"{r['missed']:>8}{r['normal_p95'] * 1000:>15.0f}{r['normal_throttled']:>12}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=600)
+    parser.add_argument("--normal-rate", type=float, default=6)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(run(args.users, args.normal_rate, args.latency_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
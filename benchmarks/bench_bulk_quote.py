@@ -0,0 +1,104 @@
+"""
+Пропускная способность массового расчёта: 1000 строк против локального стаба бэкенда
+(backend_replay) с задержкой POST calculations, при разной параллельности.
+
+    python benchmarks/bench_bulk_quote.py [--rows 1000] [--latency lognormal:120:0.4]
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from backend_replay import ReplayBackend, parse_latency, start_replay_server  # noqa: E402
+from services.backend import BackendClient  # noqa: E402
+from services.bulk_quote import parse_table, run_bulk_quote  # noqa: E402
+from services.catalog import Catalog  # noqa: E402
+
+PARALLELISM = (1, 4, 8, 16, 32)
+
+
+def fixture(method: str, path: str, data, status: int = 200) -> dict:
+    return {"method": method, "path": path, "status": status, "body": json.dumps({"data": data}, ensure_ascii=False)}
+
+
+def make_fixtures() -> list[dict]:
+    fixtures = [
+        fixture("GET", "fences/types", [{"id": 1, "name": "Профнастил"}, {"id": 2, "name": "Евроштакетник"}]),
+        fixture("GET", "gates/types", [{"id": 1, "name": "Распашные"}]),
+        fixture("GET", "mountings", [{"id": 1, "name": "Без монтажа"}, {"id": 2, "name": "С монтажом"}]),
+        fixture("GET", "gates/popular-specs?typeId=1", [{"spec_id": 50, "height": 2000, "width": 4000}]),
+        fixture("GET", "gates?typeId=1&height=2.0&width=4.0", [{"id": 70, "name": "Стандарт"}]),
+        fixture("GET", "accessories?accessoriableType=fence", [{"id": 5, "name": "Столб"}, {"id": 6, "name": "Заглушка"}]),
+        fixture("GET", "accessories?accessoriableType=gate", [{"id": 9, "name": "Замок"}]),
+        fixture("GET", "accessories/5", {"specs": [{"spec_id": 51, "dimension": "60x60"}, {"spec_id": 52, "dimension": "80x80"}]}),
+        fixture("GET", "accessories/6", {"specs": []}),
+        fixture("GET", "accessories/9", {"specs": [{"spec_id": 91, "dimension": "стандарт"}]}),
+        fixture("POST", "calculations", {"ok": True}),
+    ]
+    for type_id in (1, 2):
+        fixtures.append(fixture("GET", f"fences/popular-specs?typeId={type_id}",
+                                [{"spec_id": type_id * 10 + h, "height": 1500 + 250 * h} for h in range(3)]))
+        for h in range(3):
+            height = (1500 + 250 * h) / 1000.0
+            fixtures.append(fixture("GET", f"fences?typeId={type_id}&height={height}",
+                                    [{"id": 100 + h, "name": "С8 оцинкованный"}, {"id": 200 + h, "name": "С20 полимер"}]))
+    return fixtures
+
+
+def make_csv(rows: int) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";")
+    writer.writerow(["Тип забора", "Высота", "Вариант забора", "Длина", "Аксессуары",
+                     "Тип ворот", "Размер ворот", "Модель ворот", "Автоматика", "Аксессуары ворот", "Монтаж"])
+    for i in range(rows):
+        gates = ["Распашные", "2x4", "Стандарт", "да" if i % 2 else "нет", "Замок*1"] if i % 3 == 0 else [""] * 5
+        writer.writerow([
+            "Профнастил" if i % 2 else "Евроштакетник",
+            ("1,5", "1.75", "2")[i % 3],
+            "С8 оцинкованный",
+            f"{10 + i % 90}",
+            "Столб/60x60*4; Заглушка*4",
+            *gates,
+            "С монтажом",
+        ])
+    return buffer.getvalue().encode("utf-8-sig")
+
+
+async def run(rows: int, latency: str):
+    stub = ReplayBackend(make_fixtures(), parse_latency("none"), {"calculations": parse_latency(latency, seed=1)})
+    runner, url = await start_replay_server(stub)
+    content = make_csv(rows)
+    print(f"rows={rows} POST latency={latency}")
+    try:
+        for parallelism in PARALLELISM:
+            client = BackendClient(url)
+            parsed = parse_table("bench.csv", content)
+            start = time.perf_counter()
+            await run_bulk_quote(parsed, user_id=1, parallelism=parallelism, source=Catalog(client), client=client)
+            elapsed = time.perf_counter() - start
+            await client.close()
+            submitted = sum(1 for row in parsed if row.status == "submitted")
+            print(f"  parallelism={parallelism:<3} {elapsed:7.2f} s  {submitted / elapsed:8.1f} rows/s  "
+                  f"submitted={submitted}/{len(parsed)}")
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--latency", default="lognormal:120:0.4")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args.rows, args.latency))
+
+
+if __name__ == "__main__":
+    main()
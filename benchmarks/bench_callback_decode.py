@@ -0,0 +1,53 @@
+"""
+Стоимость декодирования callback_data: старый разбор строки против поиска в реестре токенов.
+
+    python benchmarks/bench_callback_decode.py
+"""
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from services.callback_registry import CallbackRegistry, FenceSpecChoice, GateSpecChoice  # noqa: E402
+
+N = 200_000
+
+
+def legacy_fence(data: str):
+    spec_id, height = data.split("_")
+    return int(spec_id), float(height)
+
+
+def legacy_gate(data: str):
+    spec_id_part, size_part = data.split("_size_")
+    _, spec_id = spec_id_part.split("specId_")
+    h_str, w_str = size_part.split("x")
+    return spec_id, float(h_str), float(w_str)
+
+
+def main():
+    registry = CallbackRegistry()
+    fence_token = registry.issue(FenceSpecChoice(17, 1.8))
+    gate_token = registry.issue(GateSpecChoice(4, 2.0, 4.5))
+
+    for _ in range(50_000):
+        registry.issue(FenceSpecChoice(_, 2.0))
+
+    cases = [
+        ("legacy fence split/float", lambda: legacy_fence("17_1.8")),
+        ("registry fence resolve", lambda: registry.resolve(fence_token)),
+        ("legacy gate split/float", lambda: legacy_gate("specId_4_size_2.0x4.5")),
+        ("registry gate resolve", lambda: registry.resolve(gate_token)),
+        ("registry stale token", lambda: registry.resolve("~dead.0")),
+    ]
+
+    print(f"{'case':<28}{'ns/op':>10}")
+    for name, fn in cases:
+        seconds = min(timeit.repeat(fn, number=N, repeat=5))
+        print(f"{name:<28}{seconds / N * 1e9:>10.1f}")
+    print(f"token length: fence={len(fence_token)} gate={len(gate_token)} bytes")
+
+
+if __name__ == "__main__":
+    main()
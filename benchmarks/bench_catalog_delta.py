@@ -0,0 +1,134 @@
+"""
+Стоимость обновления каталога в зависимости от размера и доли изменений:
+полная перезагрузка (как раньше), полная с локальным сравнением по id и запрос
+изменений по курсору (?since=). После каждого обновления перерисовывается прайс-лист,
+чтобы было видно и точечную инвалидацию построенного по каталогу.
+
+Стаб бэкенда здесь свой: ему нужно менять данные и вести журнал изменений.
+
+    python benchmarks/bench_catalog_delta.py [--sizes 1000,10000,100000] [--rates 0.001,0.01,0.1]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from aiohttp import web  # noqa: E402
+
+from services.backend import CURSOR_HEADER, BackendClient  # noqa: E402
+from services.catalog import Catalog  # noqa: E402
+from services.price_list import PriceListService  # noqa: E402
+
+catalog_module = sys.modules["services.catalog"]
+
+MODES = ("full", "full+diff", "delta")
+# журнал изменений хранится на столько версий назад, дальше — 410
+LOG_DEPTH = 100
+
+
+class ChangingBackend:
+    def __init__(self, size: int, change_feed: bool):
+        self._rnd = random.Random(size)
+        self.items = {i: {"id": i, "name": f"Профнастил С8 {i}", "price": round(self._rnd.uniform(300, 9000), 2)}
+                      for i in range(size)}
+        self.version = 0
+        self._changed_at: dict[int, int] = {}
+        self._deleted_at: dict[int, int] = {}
+        self._change_feed = change_feed
+
+    def mutate(self, count: int) -> None:
+        self.version += 1
+        for item_id in self._rnd.sample(sorted(self.items), count):
+            self.items[item_id] = {**self.items[item_id], "price": round(self._rnd.uniform(300, 9000), 2)}
+            self._changed_at[item_id] = self.version
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if request.path != "/fences":
+            return web.json_response({"data": []})
+
+        since = request.query.get("since")
+        if since is None:
+            body = json.dumps({"data": list(self.items.values())}, ensure_ascii=False)
+            return web.Response(text=body, content_type="application/json",
+                                headers={CURSOR_HEADER: str(self.version)})
+
+        if not self._change_feed:
+            return web.json_response({"error": "not supported"}, status=404)
+        since_version = int(since)
+        if since_version < self.version - LOG_DEPTH:
+            return web.json_response({"error": "cursor expired"}, status=410)
+        upserted = [self.items[i] for i, v in self._changed_at.items() if v > since_version]
+        deleted = [i for i, v in self._deleted_at.items() if v > since_version]
+        return web.json_response({"upserted": upserted, "deleted": deleted, "cursor": str(self.version)})
+
+
+async def measure(size: int, rate: float, mode: str, cycles: int) -> tuple[float, float, float]:
+    stub = ChangingBackend(size, change_feed=mode == "delta")
+    app = web.Application()
+    app.router.add_route("GET", "/{tail:.*}", stub.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    client = BackendClient(f"http://127.0.0.1:{runner.addresses[0][1]}/")
+
+    original_diff = catalog_module._diff
+    if mode == "full":
+        # поведение до инкрементальной синхронизации: изменения неизвестны, всё перестраивается
+        catalog_module._diff = lambda previous, items: None
+    source = Catalog(client)
+    prices = PriceListService(source)
+    try:
+        await prices.refresh()
+        sizes, refresh_times, render_times = [], [], []
+        for _ in range(cycles):
+            stub.mutate(max(1, round(size * rate)))
+            source.expire()
+            before = client.bytes_received
+            started = time.perf_counter()
+            await source.all_fences()
+            refreshed = time.perf_counter()
+            await prices.refresh()
+            refresh_times.append(refreshed - started)
+            render_times.append(time.perf_counter() - refreshed)
+            sizes.append(client.bytes_received - before)
+        return statistics.mean(sizes), statistics.median(refresh_times), statistics.median(render_times)
+    finally:
+        catalog_module._diff = original_diff
+        await client.close()
+        await runner.cleanup()
+
+
+async def run(sizes: list[int], rates: list[float], cycles: int):
+    print(f"cycles={cycles}")
+    print(f"{'items':>8}{'changed':>9}  {'mode':<11}{'KB':>9}{'refresh ms':>12}{'price list ms':>15}")
+    for size in sizes:
+        for rate in rates:
+            for mode in MODES:
+                kb, refresh, render = await measure(size, rate, mode, cycles)
+                print(f"{size:>8}{rate:>9.1%}  {mode:<11}{kb / 1024:>9.1f}{refresh * 1000:>12.1f}{render * 1000:>15.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--rates", default="0.001,0.01,0.1")
+    parser.add_argument("--cycles", type=int, default=3)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(
+        [int(size) for size in args.sizes.split(",")],
+        [float(rate) for rate in args.rates.split(",")],
+        args.cycles,
+    ))
+
+
+if __name__ == "__main__":
+    main()
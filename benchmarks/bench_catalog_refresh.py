@@ -0,0 +1,98 @@
+"""
+Байты и время на один цикл обновления каталога (fences, accessories, mountings)
+против локального стаба (backend_replay): без сжатия, со сжатием, со сжатием и условным GET.
+
+    python benchmarks/bench_catalog_refresh.py [--items 10000] [--cycles 10]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from backend_replay import ReplayBackend, parse_latency, start_replay_server  # noqa: E402
+from services.backend import ACCEPT_ENCODING, BackendClient  # noqa: E402
+from services.catalog import Catalog  # noqa: E402
+
+MODES = (
+    ("plain", False, False),
+    ("compressed", True, False),
+    ("compressed+conditional", True, True),
+)
+
+
+def make_fixtures(items: int) -> list[dict]:
+    rnd = random.Random(3)
+
+    def entry(path: str, data: list) -> dict:
+        return {"method": "GET", "path": path, "status": 200, "recorded_at": 1_700_000_000,
+                "body": json.dumps({"data": data}, ensure_ascii=False)}
+
+    fences = [
+        {"id": i, "name": f"Профнастил С{rnd.choice([8, 10, 20])} {rnd.choice(['оцинкованный', 'полимерный'])}",
+         "price": round(rnd.uniform(300, 9000), 2), "height": rnd.choice([1500, 1800, 2000])}
+        for i in range(items)
+    ]
+    accessories = [
+        {"id": i, "name": f"Аксессуар {i}", "price": round(rnd.uniform(50, 2000), 2), "accessoriableType": kind}
+        for kind in ("fence", "gate") for i in range(items // 10)
+    ]
+    return [
+        entry("fences", fences),
+        entry("accessories?accessoriableType=fence", [a for a in accessories if a["accessoriableType"] == "fence"]),
+        entry("accessories?accessoriableType=gate", [a for a in accessories if a["accessoriableType"] == "gate"]),
+        entry("mountings", [{"id": 1, "name": "Без монтажа"}, {"id": 2, "name": "С монтажом"}]),
+    ]
+
+
+async def refresh_cycle(source: Catalog) -> None:
+    await asyncio.gather(
+        source.all_fences(),
+        source.accessories("fence"),
+        source.accessories("gate"),
+        source.mountings(),
+    )
+
+
+async def run(items: int, cycles: int):
+    fixtures = make_fixtures(items)
+    print(f"items={items} cycles={cycles} Accept-Encoding: {ACCEPT_ENCODING}")
+    print(f"{'mode':<24}{'cold KB':>10}{'warm KB':>10}{'cold ms':>10}{'warm p50 ms':>13}")
+    for name, compress, conditional in MODES:
+        stub = ReplayBackend(fixtures, parse_latency("none"), compress=compress, conditional=conditional)
+        runner, url = await start_replay_server(stub)
+        client = BackendClient(url)
+        # ttl=0: каждый вызов — обновление
+        source = Catalog(client, ttl=0)
+        try:
+            sizes, times = [], []
+            for _ in range(cycles + 1):
+                before = client.bytes_received
+                start = time.perf_counter()
+                await refresh_cycle(source)
+                times.append(time.perf_counter() - start)
+                sizes.append(client.bytes_received - before)
+            print(f"{name:<24}{sizes[0] / 1024:>10.1f}{statistics.mean(sizes[1:]) / 1024:>10.1f}"
+                  f"{times[0] * 1000:>10.1f}{statistics.median(times[1:]) * 1000:>13.1f}")
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--cycles", type=int, default=10)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args.items, args.cycles))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Построение и запросы SearchIndex на синтетическом каталоге.
+
+    python benchmarks/bench_catalog_search.py [items]
+"""
+import random
+import sys
+import time
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from services.search import SearchIndex, SearchItem  # noqa: E402
+
+MATERIALS = ["Профнастил", "Штакетник", "Евроштакетник", "Сетка-рабица", "Металлический", "Деревянный"]
+FINISHES = ["оцинкованный", "окрашенный", "полимерный", "матовый", "двусторонний"]
+COLORS = ["коричневый", "зелёный", "графитовый", "белый", "бежевый", "красный"]
+ACCESSORIES = ["Столб", "Лага", "Калитка", "Заглушка", "Саморез", "Колпак", "Петля", "Замок"]
+
+QUERIES = [
+    "профнастил",
+    "профнастил зелёный",
+    "оцинкованные столбы",
+    "евроштак",
+    "сетка рабица",
+    "калитки",
+    "профнастл",
+    "графитовый матовый 2000",
+    "колпак",
+]
+
+
+def make_catalog(size: int) -> list[SearchItem]:
+    rnd = random.Random(42)
+    items = []
+    for i in range(size):
+        if i % 3:
+            name = f"{rnd.choice(MATERIALS)} {rnd.choice(FINISHES)} {rnd.choice(COLORS)} {rnd.randint(1000, 3000)}"
+            kind = rnd.choice(("fence", "gate"))
+        else:
+            name = f"{rnd.choice(ACCESSORIES)} {rnd.choice(FINISHES)} {rnd.randint(40, 120)} мм"
+            kind = "fence_accessory"
+        items.append(SearchItem(kind, i, name))
+    return items
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    items = make_catalog(size)
+
+    started = time.perf_counter()
+    index = SearchIndex(items)
+    print(f"index build for {size} items: {time.perf_counter() - started:.2f} s")
+
+    number = 200
+    for query in QUERIES:
+        seconds = min(timeit.repeat(lambda: index.search(query), number=number, repeat=5))
+        hits = index.search(query)
+        sample = hits[0].name if hits else "-"
+        print(f"{query!r:<30}{seconds / number * 1e3:>8.3f} ms  hits={len(hits):<3} {sample}")
+
+
+if __name__ == "__main__":
+    main()
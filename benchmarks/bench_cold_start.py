@@ -0,0 +1,111 @@
+"""
+Время от старта процесса до первой готовой клавиатуры типов забора
+(catalog.fence_types -> InlineKeyboardMarkup) без снимка каталога и с ним,
+против медленного и против недоступного бэкенда.
+
+    python benchmarks/bench_cold_start.py [--items 10000] [--latency fixed:800]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+import aiohttp  # noqa: E402
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup  # noqa: E402
+
+from backend_replay import ReplayBackend, parse_latency, start_replay_server  # noqa: E402
+from services.backend import BackendClient, BackendStatusError  # noqa: E402
+from services.catalog import Catalog  # noqa: E402
+from services.snapshot import CatalogSnapshot, encode_items  # noqa: E402
+
+# порт, на котором заведомо никто не слушает
+DOWN_URL = "http://127.0.0.1:9/"
+
+
+def make_fixtures(items: int) -> list[dict]:
+    rnd = random.Random(5)
+
+    def entry(path: str, data: list) -> dict:
+        return {"method": "GET", "path": path, "status": 200, "recorded_at": 1_700_000_000,
+                "body": json.dumps({"data": data}, ensure_ascii=False)}
+
+    types = [{"id": i, "name": name} for i, name in enumerate(["Профнастил", "Штакетник", "Сетка", "3D"], 1)]
+    fences = [
+        {"id": i, "typeId": rnd.randint(1, 4), "name": f"Забор {i}",
+         "price": round(rnd.uniform(300, 9000), 2), "height": rnd.choice([1500, 1800, 2000])}
+        for i in range(items)
+    ]
+    return [entry("fences/types", types), entry("fences", fences)]
+
+
+def fence_types_markup(items: list) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([[InlineKeyboardButton(ft["name"], callback_data=str(ft["id"]))] for ft in items])
+
+
+async def first_keyboard(url: str, snapshot: CatalogSnapshot) -> tuple[float, str]:
+    started = time.perf_counter()
+    client = BackendClient(url)
+    source = Catalog(client, snapshot=snapshot)
+    try:
+        entry = await source.fence_types()
+        fence_types_markup(entry.items)
+        outcome = "snapshot" if source.snapshot_hits else "backend"
+    except (aiohttp.ClientError, BackendStatusError, asyncio.TimeoutError) as e:
+        outcome = f"error ({type(e).__name__})"
+    elapsed = time.perf_counter() - started
+    for task in list(source._background):
+        task.cancel()
+    await client.close()
+    return elapsed, outcome
+
+
+async def run(items: int, latency: str):
+    fixtures = make_fixtures(items)
+    stub = ReplayBackend(fixtures, parse_latency(latency), conditional=True)
+    runner, url = await start_replay_server(stub)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "catalog.snapshot"
+        # снимок, как его оставил бы предыдущий процесс
+        sections = [(f["path"], None, None, None, encode_items(json.loads(f["body"])["data"])) for f in fixtures]
+        size = CatalogSnapshot(path).write(sections)
+
+        started = time.perf_counter()
+        snapshot = CatalogSnapshot(path)
+        len(snapshot)
+        index_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        snapshot.section("fences")
+        fences_ms = (time.perf_counter() - started) * 1000
+        print(f"items={items} latency={latency} snapshot={size / 1024:.0f} KB, "
+              f"index {index_ms:.2f} ms, decode fences {fences_ms:.1f} ms")
+
+        print(f"{'backend':<10}{'snapshot':<10}{'first keyboard ms':>18}  outcome")
+        for label, backend_url in (("slow", url), ("down", DOWN_URL)):
+            for with_snapshot in (False, True):
+                elapsed, outcome = await first_keyboard(
+                    backend_url, CatalogSnapshot(path if with_snapshot else None)
+                )
+                print(f"{label:<10}{'yes' if with_snapshot else 'no':<10}{elapsed * 1000:>18.1f}  {outcome}")
+
+    await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--latency", default="fixed:800")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(run(args.items, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Накладные расходы на диспетчеризацию шага диалога расчёта:
+поиск хэндлера в скомпилированной таблице (как это делает ConversationHandler)
+и хуки шага (замер времени, подгрузка) по сравнению с прямым вызовом.
+
+    python benchmarks/bench_flow_dispatch.py
+"""
+import asyncio
+import datetime
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from telegram import CallbackQuery, Chat, Message, Update, User  # noqa: E402
+
+from handlers.calculation_conversation import calculation_flow  # noqa: E402
+from handlers.calculation_states import CalcStates  # noqa: E402
+from handlers.flow import Flow, Step  # noqa: E402
+
+N = 200_000
+
+
+def make_updates():
+    user = User(1, "dealer", False)
+    chat = Chat(1, "private")
+    callback = Update(1, callback_query=CallbackQuery("1", user, "chat", data="42"))
+    text = Update(2, message=Message(1, datetime.datetime.now(), chat, from_user=user, text="12"))
+    return callback, text
+
+
+def bench_lookup(table, state: int, update: Update) -> float:
+    handlers = table[state]
+    start = time.perf_counter()
+    for _ in range(N):
+        for handler in handlers:
+            if handler.check_update(update):
+                break
+    return (time.perf_counter() - start) / N * 1e9
+
+
+async def bench_hooks() -> tuple[float, float]:
+    async def noop(update, context):
+        return None
+
+    flow = Flow([Step(CalcStates.FENCE_TYPE, on_callback=noop)], page_handler=noop)
+    hooked = flow.compile()[CalcStates.FENCE_TYPE.value][0].callback
+    context = SimpleNamespace(user_data={})
+
+    results = []
+    for callback in (noop, hooked):
+        start = time.perf_counter()
+        for _ in range(N):
+            await callback(None, context)
+        results.append((time.perf_counter() - start) / N * 1e9)
+    return results[0], results[1]
+
+
+def main():
+    start = time.perf_counter()
+    table = calculation_flow.compile()
+    compile_us = (time.perf_counter() - start) * 1e6
+    print(f"compile: {len(table)} states in {compile_us:.0f} us")
+
+    callback, text = make_updates()
+    for state, update, label in (
+            (CalcStates.FENCE_TYPE, callback, "callback, 1 handler"),
+            (CalcStates.FENCE_LENGTH, callback, "callback, page turn + choice"),
+            (CalcStates.FENCE_LENGTH, text, "text, 3 handlers"),
+    ):
+        print(f"lookup {state.name:<14} {label:<30} {bench_lookup(table, state.value, update):7.0f} ns")
+
+    direct, hooked = asyncio.run(bench_hooks())
+    print(f"call direct {direct:7.0f} ns, with step hooks {hooked:7.0f} ns (+{hooked - direct:.0f} ns)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+История расчётов: запись расчёта (record) и список последних (recent) на заполненной базе,
+с индексом (user_id, created_at) и без него. Повторная отправка отчёта по file_id — это
+один запрос к Telegram вместо нового прохода /calc и генерации PDF на бэкенде,
+так что здесь меряется только то, что добавляет сама история.
+
+    python benchmarks/bench_history.py [--users 20000] [--per-user 20]
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from services.history import CalculationHistory  # noqa: E402
+
+DRAFT = {
+    "fence_type_id": 1, "fence_spec_id": 12, "fence_variant_id": 5, "fence_length": 25.0,
+    "fence_accessories_chosen": [{"id": 3, "spec_id": 31, "quantity": 4}],
+    "need_gates": True, "gate_type_id": 2, "gate_spec_id": 21, "gate_variant_id": 7, "gate_automation": True,
+    "gate_accessories_chosen": [], "mounting_id": 2,
+    "fence_variant_name": "Профнастил С8", "gate_variant_name": "Распашные 3м", "mounting_name": "С монтажом",
+}
+
+
+def fill(history: CalculationHistory, users: int, per_user: int) -> None:
+    db = history._connect()
+    rows = []
+    now = time.time()
+    for user_id in range(users):
+        for n in range(per_user):
+            rows.append((f"{user_id}_{n}", user_id, user_id, now - n * 3600, "Профнастил С8, 25 м", "{}"))
+    # порядок вставки как в жизни: пользователи вперемешку
+    random.Random(3).shuffle(rows)
+    with db:
+        db.executemany(
+            "INSERT INTO calculations (report_id, user_id, chat_id, created_at, summary, draft) "
+            "VALUES (?, ?, ?, ?, ?, ?)", rows,
+        )
+
+
+def measure(history: CalculationHistory, users: int, samples: int) -> tuple[float, float]:
+    rnd = random.Random(7)
+    reads, writes = [], []
+    for n in range(samples):
+        user_id = rnd.randrange(users)
+        started = time.perf_counter()
+        history.recent(user_id)
+        reads.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        history.record(f"new_{n}", user_id, user_id, DRAFT)
+        writes.append(time.perf_counter() - started)
+    return statistics.median(reads), statistics.median(writes)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--per-user", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"users={args.users} per_user={args.per_user} rows={args.users * args.per_user}")
+    print(f"{'index':<8}{'recent ms':>11}{'record ms':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for indexed in (False, True):
+            history = CalculationHistory(Path(tmp) / f"history.{indexed}.sqlite3", per_user=args.per_user)
+            if not indexed:
+                history._connect().execute("DROP INDEX calculations_by_user")
+            fill(history, args.users, args.per_user)
+            read, write = measure(history, args.users, args.samples)
+            print(f"{'yes' if indexed else 'no':<8}{read * 1000:>11.3f}{write * 1000:>11.3f}")
+            history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Декодирование каталожных ответов: json.loads и orjson.loads (services.codec выбирает второй, если он установлен).
+
+    python benchmarks/bench_json_codec.py
+"""
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from services.codec import orjson  # noqa: E402
+
+SIZES = (1_000, 10_000, 100_000)
+
+
+def make_payload(size: int) -> bytes:
+    rnd = random.Random(7)
+    data = [
+        {
+            "id": i,
+            "name": f"Профнастил С8 {rnd.choice(['оцинкованный', 'полимерный', 'матовый'])} {rnd.randint(1000, 3000)}",
+            "price": round(rnd.uniform(300, 9000), 2),
+            "specs": [{"spec_id": i * 10 + j, "dimension": f"{1000 + 250 * j} мм"} for j in range(3)],
+            "accessoriableType": "fence",
+        }
+        for i in range(size)
+    ]
+    return json.dumps({"data": data, "meta": {"total": size}}, ensure_ascii=False).encode()
+
+
+def measure(fn, payload: bytes) -> tuple[float, float]:
+    started = time.perf_counter()
+    fn(payload)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    result = fn(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+
+def main():
+    decoders = [("json.loads", lambda p: json.loads(p)["data"])]
+    if orjson is not None:
+        decoders.append(("orjson.loads", lambda p: orjson.loads(p)["data"]))
+
+    print(f"{'items':>8}{'payload':>10}  {'decoder':<22}{'time ms':>10}{'peak MB':>10}")
+    for size in SIZES:
+        payload = make_payload(size)
+        for name, fn in decoders:
+            elapsed, peak = measure(fn, payload)
+            print(f"{size:>8}{len(payload) / 1e6:>8.1f}MB  {name:<22}{elapsed * 1000:>10.1f}{peak / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Размер reply_markup и время подготовки отправки для больших списков:
+одна клавиатура со всеми позициями против кэшированной страницы KeyboardPager.
+
+    python benchmarks/bench_keyboard_pages.py [items]
+"""
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup  # noqa: E402
+
+from services.keyboards import KeyboardPager  # noqa: E402
+
+N = 2_000
+
+
+def make_catalog(size: int) -> list[dict]:
+    return [{"id": 10_000 + i, "name": f"Аксессуар для забора №{i} (оцинкованный)"} for i in range(size)]
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 250
+    items = make_catalog(size)
+    footer = [[InlineKeyboardButton("Готово", callback_data="done")]]
+
+    def build_rows():
+        return [[InlineKeyboardButton(acc["name"], callback_data=str(acc["id"]))] for acc in items]
+
+    def full_markup():
+        return InlineKeyboardMarkup(build_rows() + footer).to_json()
+
+    pager = KeyboardPager()
+    pages = pager.pages("accessories?accessoriableType=fence", 1, build_rows, footer)
+
+    def cached_page():
+        return pager.pages("accessories?accessoriableType=fence", 1, build_rows, footer)[0].to_json()
+
+    full_bytes = len(full_markup().encode())
+    page_bytes = len(cached_page().encode())
+
+    print(f"items: {size}, pages: {len(pages)}")
+    print(f"reply_markup bytes: full={full_bytes} page={page_bytes} ({full_bytes / page_bytes:.1f}x smaller)")
+
+    for name, fn in (("full build+serialize", full_markup), ("cached page serialize", cached_page)):
+        seconds = min(timeit.repeat(fn, number=N, repeat=5))
+        print(f"{name:<24}{seconds / N * 1e6:>10.1f} us/send")
+
+
+if __name__ == "__main__":
+    main()
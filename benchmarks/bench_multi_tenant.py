@@ -0,0 +1,150 @@
+"""
+Память и CPU: N ботов отдельными процессами против одного хоста (bot/host.py) с N ботами
+на общем бэкенде. Каждый бот прогревает каталог, индекс аксессуаров, прайс-лист и поиск,
+затем --cycles раз каталог «протухает» и всё перестраивается заново. Бэкенд — локальный
+стаб (backend_replay), Telegram не трогаем: приложения только собираются.
+
+    python benchmarks/bench_multi_tenant.py [--tenants 1,4,8] [--items 10000] [--cycles 3]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import time
+from pathlib import Path
+
+BOT_DIR = Path(__file__).resolve().parent.parent / "bot"
+sys.path.insert(0, str(BOT_DIR))
+
+
+def make_fixtures(items: int) -> list[dict]:
+    rnd = random.Random(9)
+
+    def entry(path: str, data: list) -> dict:
+        return {"method": "GET", "path": path, "status": 200, "body": json.dumps({"data": data}, ensure_ascii=False)}
+
+    fences = [{"id": i, "name": f"Профнастил С{rnd.choice([8, 10, 20])} {i}", "price": round(rnd.uniform(300, 9000), 2)}
+              for i in range(items)]
+    gates = [{"id": i, "name": f"Ворота распашные {i}", "price": round(rnd.uniform(9000, 90000), 2)}
+             for i in range(items // 10)]
+    fixtures = [
+        entry("fences/types", [{"id": 1, "name": "Профнастил"}, {"id": 2, "name": "Штакетник"}]),
+        entry("fences", fences),
+        entry("gates", gates),
+        entry("mountings", [{"id": 1, "name": "Без монтажа"}, {"id": 2, "name": "С монтажом"}]),
+    ]
+    for kind in ("fence", "gate"):
+        fixtures.append(entry(f"accessories?accessoriableType={kind}", [
+            {"id": i, "name": f"Аксессуар {kind} {i}", "price": round(rnd.uniform(50, 2000), 2),
+             "specs": [{"spec_id": i * 10 + j, "dimension": f"{60 + 20 * j} мм"} for j in range(rnd.randint(0, 3))]}
+            for i in range(items // 50)
+        ]))
+    return fixtures
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def warm(tenant) -> None:
+    await tenant.catalog.fence_types()
+    await tenant.catalog.mountings()
+    await tenant.accessory_specs.get("fence")
+    await tenant.accessory_specs.get("gate")
+    await tenant.price_list.refresh()
+    await tenant.catalog_search.ensure_fresh()
+
+
+async def worker(tenant_count: int, cycles: int) -> dict:
+    import main
+    from services import backend_stacks, build_tenants
+
+    imported_cpu = cpu_seconds()
+    tenants = build_tenants([{"name": f"t{i}", "token": f"{i + 1}:TOKEN"} for i in range(tenant_count)])
+    applications = [main.build_application(tenant) for tenant in tenants]
+    for _ in range(cycles + 1):
+        for stack in backend_stacks(tenants):
+            stack.catalog.invalidate()
+        for tenant in tenants:
+            await warm(tenant)
+    requests = sum(stack.client.requests_total for stack in backend_stacks(tenants))
+    await main.close_process(tenants)
+    return {
+        "rss_mb": rss_mb(),
+        "cpu": cpu_seconds(),
+        "work_cpu": cpu_seconds() - imported_cpu,
+        "requests": requests,
+        "applications": len(applications),
+    }
+
+
+async def spawn(url: str, tenant_count: int, cycles: int) -> dict:
+    env = {**os.environ, "BASE_API_URL": url, "BOT_TOKEN": "0:UNUSED", "TRACING_ENABLED": "0",
+           "CATALOG_SNAPSHOT_FILE": "", "PYTHONPATH": os.pathsep.join([str(BOT_DIR.parent), str(BOT_DIR)])}
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, __file__, "--worker", str(tenant_count), "--cycles", str(cycles),
+        env=env, stdout=asyncio.subprocess.PIPE,
+    )
+    stdout, _ = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"worker exited with {process.returncode}")
+    return json.loads(stdout.decode().strip().splitlines()[-1])
+
+
+async def run(tenant_counts: list[int], items: int, cycles: int):
+    from backend_replay import ReplayBackend, parse_latency, start_replay_server
+
+    stub = ReplayBackend(make_fixtures(items), parse_latency("none"))
+    runner, url = await start_replay_server(stub)
+    print(f"items={items} cycles={cycles}")
+    print(f"{'tenants':>8}  {'mode':<10}{'RSS MB':>9}{'CPU s':>8}{'work CPU s':>12}{'requests':>10}{'wall s':>8}")
+    try:
+        for count in tenant_counts:
+            started = time.perf_counter()
+            separate = await asyncio.gather(*(spawn(url, 1, cycles) for _ in range(count)))
+            separate_wall = time.perf_counter() - started
+            started = time.perf_counter()
+            shared = await spawn(url, count, cycles)
+            shared_wall = time.perf_counter() - started
+
+            rows = (
+                ("processes", sum(r["rss_mb"] for r in separate), sum(r["cpu"] for r in separate),
+                 sum(r["work_cpu"] for r in separate), sum(r["requests"] for r in separate), separate_wall),
+                ("host", shared["rss_mb"], shared["cpu"], shared["work_cpu"], shared["requests"], shared_wall),
+            )
+            for mode, rss, cpu, work_cpu, requests, wall in rows:
+                print(f"{count:>8}  {mode:<10}{rss:>9.1f}{cpu:>8.2f}{work_cpu:>12.2f}{requests:>10}{wall:>8.2f}")
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tenants", default="1,4,8")
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.worker:
+        print(json.dumps(asyncio.run(worker(args.worker, args.cycles))))
+        return
+    asyncio.run(run([int(n) for n in args.tenants.split(",")], args.items, args.cycles))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Время до PDF после выбора монтажа: обычный расчёт против расчётов «на опережение»
+(SpeculativeReports) с 1 и 2 вариантами монтажа. Стаб бэкенда формирует отчёты
+на ограниченном числе воркеров (capacity) с задержкой lognormal, так что лишние
+заранее отправленные расчёты видны как очередь на генерацию. Время масштабируется
+(--scale), все цифры выводятся в «настоящих» секундах.
+
+    python benchmarks/bench_speculation.py [--users 120] [--arrivals 0.05] [--report-s 60] [--think-s 8]
+"""
+import argparse
+import asyncio
+import logging
+import math
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from aiohttp import web  # noqa: E402
+
+from services import reports  # noqa: E402
+from services.backend import BackendClient  # noqa: E402
+from services.calculations import SPECULATIVE_HEADER, build_calculation, new_report_id, submit_calculation  # noqa: E402
+from services.jobs import JobRunner  # noqa: E402
+from services.reports import PendingReports, ReportDelivery  # noqa: E402
+from services.speculation import SpeculativeReports  # noqa: E402
+
+MOUNTINGS = [1, 2, 3]
+# доли выбора монтажа: «без монтажа», «с монтажом», «под ключ»
+MOUNTING_WEIGHTS = [0.6, 0.3, 0.1]
+DRAFT = {
+    "fence_type_id": 1, "fence_spec_id": 12, "fence_variant_id": 5, "fence_length": 25.0,
+    "fence_accessories_chosen": [], "need_gates": False,
+}
+
+
+class ReportStub:
+    """POST calculations ставит отчёт в очередь генерации на capacity воркеров; отменить его нельзя."""
+
+    def __init__(self, capacity: int, report_seconds: float, api_seconds: float, scale: float):
+        self._slots = asyncio.Semaphore(capacity)
+        self._mu = math.log(report_seconds)
+        self._api = api_seconds * scale
+        self._scale = scale
+        self._ready: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self.posts = 0
+        self.speculative = 0
+
+    async def _generate(self, report_id: str, seconds: float) -> None:
+        async with self._slots:
+            await asyncio.sleep(seconds * self._scale)
+        self._ready.add(report_id)
+
+    async def submit(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self._api)
+        body = await request.json()
+        self.posts += 1
+        if request.headers.get(SPECULATIVE_HEADER):
+            self.speculative += 1
+        # время генерации зависит только от (пользователь, монтаж) — режимы сравниваются на одних и тех же отчётах
+        seconds = random.Random(body["user_id"] * 100 + body["mountingId"]).lognormvariate(self._mu, 0.3)
+        task = asyncio.create_task(self._generate(body["report_id"], seconds))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.json_response({"data": {"ok": True}})
+
+    async def status(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self._api)
+        if request.match_info["report_id"] in self._ready:
+            return web.json_response({"status": "success"})
+        return web.json_response({"status": "pending"}, status=202)
+
+    async def download(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self._api)
+        if request.match_info["report_id"] not in self._ready:
+            return web.Response(status=404)
+        return web.Response(body=b"%PDF-1.4 report", content_type="application/pdf")
+
+    async def start(self) -> tuple[web.AppRunner, str]:
+        app = web.Application()
+        app.router.add_post("/calculations", self.submit)
+        app.router.add_get("/reports/{report_id}/status", self.status)
+        app.router.add_get("/calculations/{report_id}/download-report", self.download)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        return runner, f"http://127.0.0.1:{runner.addresses[0][1]}/"
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+
+class FakeBot:
+    def __init__(self):
+        self.delivered: dict[int, asyncio.Event] = {}
+
+    async def send_document(self, chat_id, document, filename=None, caption=None):
+        self.delivered.setdefault(chat_id, asyncio.Event()).set()
+        return SimpleNamespace(document=None)
+
+
+async def user_session(user_id: int, args, scale: float, client, speculation, delivery, bot, rnd) -> tuple[float, bool]:
+    user_data = dict(DRAFT)
+    speculation.start(user_id, user_data, MOUNTINGS)
+    await asyncio.sleep(rnd.lognormvariate(math.log(args.think_s), 0.5) * scale)
+
+    user_data["mounting_id"] = rnd.choices(MOUNTINGS, MOUNTING_WEIGHTS)[0]
+    chosen_at = time.perf_counter()
+    promoted = await speculation.promote(user_id, user_data)
+    report_id = promoted or new_report_id(user_id)
+    await submit_calculation(build_calculation(user_data, report_id, user_id), client)
+    delivered = bot.delivered.setdefault(user_id, asyncio.Event())
+    delivery.deliver(bot, report_id, user_id)
+    await delivered.wait()
+    return (time.perf_counter() - chosen_at) / scale, promoted is not None
+
+
+async def scenario(per_user: int, args) -> dict:
+    scale = args.scale
+    reports.REPORT_POLL_INTERVAL = 10 * scale
+    stub = ReportStub(args.capacity, args.report_s, args.api_ms / 1000, scale)
+    server, url = await stub.start()
+    client = BackendClient(url)
+    runner = JobRunner(64, 1000)
+    runner.start()
+    pending = PendingReports(None)
+    speculation = SpeculativeReports(client, runner, pending, per_user=per_user, max_in_flight=args.max_in_flight)
+    delivery = ReportDelivery(client, pending, runner)
+    bot = FakeBot()
+    rnd = random.Random(11)
+
+    sessions = []
+    for user_id in range(1, args.users + 1):
+        sessions.append(asyncio.create_task(
+            user_session(user_id, args, scale, client, speculation, delivery, bot, random.Random(user_id))
+        ))
+        await asyncio.sleep(rnd.expovariate(args.arrivals) * scale)
+    results = await asyncio.gather(*sessions)
+    times = [elapsed for elapsed, _ in results]
+    hits = [elapsed for elapsed, promoted in results if promoted]
+
+    await runner.shutdown()
+    await client.close()
+    await stub.stop()
+    await server.cleanup()
+    return {
+        "mean": statistics.fmean(times),
+        "p95": statistics.quantiles(times, n=20)[-1],
+        "hit_mean": statistics.fmean(hits) if hits else 0.0,
+        "posts": stub.posts / args.users,
+        "promoted": speculation.promoted,
+        "wasted": speculation.wasted + speculation.in_flight,
+        "skipped": speculation.skipped,
+    }
+
+
+async def run(args):
+    load = args.arrivals * args.report_s / args.capacity
+    print(f"users={args.users} arrivals={args.arrivals}/s report={args.report_s:g} s think={args.think_s:g} s "
+          f"capacity={args.capacity} (load without speculation {load:.0%}) poll=10 s")
+    print(f"{'mode':<14}{'mean s':>8}{'p95 s':>8}{'hit mean s':>12}{'POST/calc':>11}{'promoted':>10}{'wasted':>8}{'skipped':>9}")
+    for per_user in (0, 1, 2):
+        r = await scenario(per_user, args)
+        mode = "off" if per_user == 0 else f"speculate {per_user}"
+        print(f"{mode:<14}{r['mean']:>8.1f}{r['p95']:>8.1f}{r['hit_mean']:>12.1f}"
+              f"{r['posts']:>11.2f}{r['promoted']:>10}{r['wasted']:>8}{r['skipped']:>9}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=120)
+    parser.add_argument("--arrivals", type=float, default=0.05, help="users reaching the mounting step per second")
+    parser.add_argument("--report-s", type=float, default=60, help="median report generation time")
+    parser.add_argument("--think-s", type=float, default=8, help="median time to pick a mounting")
+    parser.add_argument("--capacity", type=int, default=8, help="reports generated in parallel by the backend")
+    parser.add_argument("--api-ms", type=float, default=150)
+    parser.add_argument("--max-in-flight", type=int, default=40)
+    parser.add_argument("--scale", type=float, default=0.01, help="wall-clock seconds per simulated second")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Холодный старт процесса бота: импорт, сборка Application, on_startup, обработка первого
+обновления (/start) против эмулятора Telegram и выход процесса — каждый прогон в новом
+процессе. Отдельными прогонами под python -X importtime — время импорта по пакетам и модулям
+бота (importtime сам замедляет импорт, поэтому фазы меряются без него). Для сравнения
+меряется «пол»: голый импорт telegram.ext и aiohttp, без которых бот не обработает обновление.
+
+Порог регрессии: собственные накладные расходы бота (первое обновление минус «пол»)
+по процессорному времени не должны превышать STARTUP_BUDGET_MS — иначе выход с кодом 1.
+Процессорное время, в отличие от настенного, почти не зависит от соседней нагрузки на машине.
+
+    python benchmarks/bench_startup.py [--runs 7] [--budget-ms 100] [--top 15]
+"""
+import gc
+import importlib
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# процессорное время бота сверх импорта telegram.ext и aiohttp до первого обновления, медиана по прогонам
+STARTUP_BUDGET_MS = 100
+PHASES = ("interpreter", "import", "build", "startup", "first_update", "stop", "exit")
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+OWN_PACKAGES = ("main", "services", "handlers", "config", "log_storm", "logging_config")
+
+
+def child() -> None:
+    """Один холодный старт: печатает JSON с отметками фаз (time.time(), разницы считает родитель)."""
+    marks = {"interpreter": time.time()}
+    cpu = {}
+    import asyncio
+    import main
+    marks["import"] = time.time()
+
+    from telegram import Update
+    from telegram.request import BaseRequest
+    from services import default_tenant
+
+    class FakeTelegram(BaseRequest):
+        sent = 0
+
+        @property
+        def read_timeout(self):
+            return None
+
+        async def initialize(self):
+            pass
+
+        async def shutdown(self):
+            pass
+
+        async def do_request(self, url, method, request_data=None, **timeouts):
+            if url.endswith("getMe"):
+                result = {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+            else:
+                FakeTelegram.sent += 1
+                result = {"message_id": FakeTelegram.sent, "date": int(time.time()),
+                          "chat": {"id": 42, "type": "private"}, "text": "ok"}
+            return 200, json.dumps({"ok": True, "result": result}).encode()
+
+    async def run():
+        telegram = FakeTelegram()
+        # как в main.main(): сборщик мусора выключен от сборки до конца on_startup
+        gc.disable()
+        application = main.build_application(
+            default_tenant, main.Application.builder().request(telegram).get_updates_request(telegram)
+        )
+        marks["build"] = time.time()
+        await application.initialize()
+        await main.on_startup(application)
+        marks["startup"] = time.time()
+
+        update = Update.de_json({
+            "update_id": 1,
+            "message": {
+                "message_id": 1, "date": int(time.time()), "text": "/start",
+                "chat": {"id": 42, "type": "private"},
+                "from": {"id": 42, "is_bot": False, "first_name": "Иван"},
+                "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+            },
+        }, application.bot)
+        await application.process_update(update)
+        if not FakeTelegram.sent:
+            raise RuntimeError("/start was not answered")
+        marks["first_update"] = time.time()
+        cpu["first_update"] = time.process_time()
+
+        await main.on_stop(application)
+        await application.shutdown()
+        await main.on_shutdown(application)
+        marks["stop"] = time.time()
+
+    asyncio.run(run())
+    print(json.dumps({"marks": marks, "cpu": cpu}))
+
+
+def floor_child() -> None:
+    marks = {"interpreter": time.time()}
+    for module in ("aiohttp", "telegram.ext"):
+        importlib.import_module(module)
+    marks["import"] = time.time()
+    print(json.dumps({"marks": marks, "cpu": {"import": time.process_time()}}))
+
+
+def spawn(mode: str, importtime: bool = False) -> tuple[dict, dict, str]:
+    """
+    Прогон в новом процессе: длительности фаз в секундах (interpreter — от запуска до скрипта)
+    и процессорное время процесса на отметках.
+    """
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join([str(ROOT), str(ROOT / "bot")]),
+        BOT_TOKEN=os.environ.get("BOT_TOKEN") or "1:TOKEN",
+        BASE_API_URL=os.environ.get("BASE_API_URL") or "http://127.0.0.1:9/",
+        CATALOG_SNAPSHOT_FILE="",
+    )
+    started = time.time()
+    result = subprocess.run(
+        [sys.executable, *(("-X", "importtime") if importtime else ()), __file__, mode],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    marks = report["marks"]
+    marks["exit"] = time.time()
+    phases, previous = {}, started
+    for phase in PHASES:
+        if phase in marks:
+            phases[phase] = marks[phase] - previous
+            previous = marks[phase]
+    phases["total"] = marks["exit"] - started
+    return phases, report["cpu"], result.stderr
+
+
+def import_times(stderr: str) -> tuple[Counter, Counter]:
+    """Собственное время импорта (мкс): по пакетам верхнего уровня и по модулям бота."""
+    packages, own = Counter(), Counter()
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match is None:
+            continue
+        self_us, name = int(match.group(1)), match.group(4)
+        packages[name.split(".")[0]] += self_us
+        if name.split(".")[0] in OWN_PACKAGES:
+            own[name] += self_us
+    return packages, own
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    phases = {phase: [] for phase in (*PHASES, "total")}
+    floors, floors_cpu, cpu_to_first_update = [], [], []
+    packages, own = Counter(), Counter()
+    for _ in range(args.runs):
+        floor, floor_cpu, _ = spawn("floor")
+        floors.append(floor["import"])
+        floors_cpu.append(floor_cpu["import"])
+        run_phases, run_cpu, _ = spawn("child")
+        for phase, seconds in run_phases.items():
+            phases[phase].append(seconds)
+        cpu_to_first_update.append(run_cpu["first_update"])
+        _, _, stderr = spawn("child", importtime=True)
+        run_packages, run_own = import_times(stderr)
+        packages.update(run_packages)
+        own.update(run_own)
+
+    def ms(values: list[float]) -> float:
+        return statistics.median(values) * 1000
+
+    print(f"runs={args.runs} python={sys.version.split()[0]}")
+    print("phase, ms (median):")
+    for phase in (*PHASES, "total"):
+        print(f"  {phase:<14}{ms(phases[phase]):8.1f}")
+    to_first_update = sum(ms(phases[phase]) for phase in ("import", "build", "startup", "first_update"))
+    print(f"  {'to 1st update':<14}{to_first_update:8.1f}  (import .. first_update)")
+    print(f"  {'floor':<14}{ms(floors):8.1f}  (import telegram.ext + aiohttp)")
+    overhead = ms(cpu_to_first_update) - ms(floors_cpu)
+    print(f"cpu time to first update {ms(cpu_to_first_update):.1f} ms, floor {ms(floors_cpu):.1f} ms")
+
+    print(f"\nimport self time by package under -X importtime, ms (mean of {args.runs}):")
+    for name, total in packages.most_common(args.top):
+        print(f"  {name:<28}{total / args.runs / 1000:8.1f}")
+    print("\nbot modules, ms:")
+    for name, total in own.most_common(args.top):
+        print(f"  {name:<34}{total / args.runs / 1000:8.1f}")
+
+    print(f"\ncpu overhead over floor: {overhead:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if overhead > args.budget_ms:
+        print("FAIL: cold start exceeds the budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    match sys.argv[1:2]:
+        case ["child"]:
+            child()
+        case ["floor"]:
+            floor_child()
+        case _:
+            main()
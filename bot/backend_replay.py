@@ -0,0 +1,178 @@
+"""
+Локальный стаб бэкенда, отдающий записанные фикстуры (BACKEND_RECORD_FILE) с настраиваемой задержкой.
+
+    python bot/backend_replay.py fixtures.jsonl --port 8099 --latency lognormal:80:0.5 \\
+        --route-latency "reports/{id}/status=fixed:200"
+
+Затем запустить бота с BASE_API_URL=http://127.0.0.1:8099/
+
+--conditional включает ETag/Last-Modified и ответы 304, --compress — gzip/br по Accept-Encoding.
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import math
+import random
+from collections import defaultdict
+from email.utils import formatdate
+from pathlib import Path
+from typing import Callable, Optional
+
+from aiohttp import web
+
+from services.backend import route_name
+from services.recording import fixture_body, load_fixtures
+
+logger = logging.getLogger(__name__)
+
+LatencyModel = Callable[[dict], float]
+
+
+def parse_latency(spec: str, seed: Optional[int] = None) -> LatencyModel:
+    """
+    none | fixed:MS | uniform:MIN_MS:MAX_MS | lognormal:MEDIAN_MS:SIGMA | recorded
+    Возвращает функцию fixture -> задержка в секундах.
+    """
+    rnd = random.Random(seed)
+    kind, *args = spec.split(":")
+    values = [float(arg) for arg in args]
+
+    match kind:
+        case "none":
+            return lambda entry: 0.0
+        case "fixed":
+            return lambda entry: values[0] / 1000
+        case "uniform":
+            return lambda entry: rnd.uniform(values[0], values[1]) / 1000
+        case "lognormal":
+            mu = math.log(values[0])
+            return lambda entry: rnd.lognormvariate(mu, values[1]) / 1000
+        case "recorded":
+            return lambda entry: entry.get("elapsed_ms", 0.0) / 1000
+        case _:
+            raise ValueError(f"Unknown latency model: {spec}")
+
+
+class ReplayBackend:
+    """
+    Сопоставляет запрос с фикстурой сначала по точному пути, затем по шаблону маршрута.
+    Несколько записей одного запроса отдаются по очереди (например 202, 202, 200
+    при опросе статуса отчёта), последняя повторяется.
+    """
+
+    def __init__(
+            self,
+            fixtures: list[dict],
+            latency: LatencyModel,
+            route_latency: Optional[dict[str, LatencyModel]] = None,
+            conditional: bool = False,
+            compress: bool = False,
+    ):
+        self._exact: dict[tuple[str, str], list[dict]] = defaultdict(list)
+        self._routes: dict[tuple[str, str], list[dict]] = defaultdict(list)
+        for entry in fixtures:
+            self._exact[(entry["method"], entry["path"])].append(entry)
+            self._routes[(entry["method"], route_name(entry["path"]))].append(entry)
+        self._cursors: dict[tuple[str, str], int] = defaultdict(int)
+        self._latency = latency
+        self._route_latency = route_latency or {}
+        self._conditional = conditional
+        self._compress = compress
+        self.requests = 0
+        self.not_modified = 0
+
+    def _next(self, method: str, path: str) -> Optional[dict]:
+        for table, key in ((self._exact, (method, path)), (self._routes, (method, route_name(path)))):
+            entries = table.get(key)
+            if entries:
+                cursor = self._cursors[(method, path)]
+                self._cursors[(method, path)] = cursor + 1
+                return entries[min(cursor, len(entries) - 1)]
+        return None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        path = request.path_qs.lstrip("/")
+        entry = self._next(request.method, path)
+        if entry is None:
+            logger.warning(f"No fixture for {request.method} {path}")
+            return web.json_response({"error": "no fixture"}, status=404)
+
+        model = self._route_latency.get(route_name(path), self._latency)
+        delay = model(entry)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        body = fixture_body(entry)
+        headers = {}
+        if self._conditional and entry["status"] == 200 and request.method == "GET":
+            etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+            headers["ETag"] = etag
+            headers["Last-Modified"] = formatdate(entry.get("recorded_at", 0), usegmt=True)
+            if request.headers.get("If-None-Match") == etag:
+                self.not_modified += 1
+                return web.Response(status=304, headers=headers)
+
+        response = web.Response(
+            body=body,
+            status=entry["status"],
+            headers=headers,
+            content_type=entry.get("content_type") or "application/json",
+        )
+        if self._compress:
+            response.enable_compression()
+        return response
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self.handle)
+        return app
+
+
+async def start_replay_server(
+        backend: ReplayBackend,
+        host: str = "127.0.0.1",
+        port: int = 0,
+) -> tuple[web.AppRunner, str]:
+    runner = web.AppRunner(backend.app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    return runner, f"http://{host}:{bound_port}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded backend traffic")
+    parser.add_argument("fixtures", type=Path)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", default="none", help="latency model for all routes")
+    parser.add_argument(
+        "--route-latency", action="append", default=[],
+        help="per-route override, e.g. 'reports/{id}/status=fixed:200'",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--conditional", action="store_true", help="send ETag/Last-Modified, answer 304")
+    parser.add_argument("--compress", action="store_true", help="compress responses per Accept-Encoding")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    route_latency = {}
+    for item in args.route_latency:
+        route, spec = item.split("=", 1)
+        route_latency[route] = parse_latency(spec, args.seed)
+
+    backend = ReplayBackend(
+        load_fixtures(args.fixtures),
+        parse_latency(args.latency, args.seed),
+        route_latency,
+        conditional=args.conditional,
+        compress=args.compress,
+    )
+    web.run_app(backend.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,34 @@ from .start import start
 from .contact import handle_contact
 from .menu import (
     show_main_menu,
-    handle_main_menu_selection
+    handle_main_menu_selection,
+    handle_price_list_callback
 )
 from .error import error_handler
+from .inline_search import handle_inline_query
+from .admin import (
+    admin_only,
+    profile_command,
+    stats_command,
+    broadcast_command
+)
+from .bulk_quote import handle_bulk_quote_file
+from .history import (
+    show_history,
+    handle_history_callback,
+    save_history_length,
+    cancel_history_edit,
+    HISTORY_LENGTH
+)
+from .dedup import (
+    suppress_duplicate_press,
+    mark_press_done,
+    PRESS_GUARD_GROUP,
+    PRESS_DONE_GROUP
+)
+from .tenant import (
+    enter_tenant,
+    leave_tenant,
+    TENANT_ENTER_GROUP,
+    TENANT_EXIT_GROUP
+)
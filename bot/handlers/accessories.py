@@ -0,0 +1,230 @@
+import logging
+from dataclasses import dataclass
+
+import aiohttp
+from telegram import Update, InlineKeyboardButton
+from telegram.ext import ContextTypes
+
+from services import (
+    current_tenant,
+    BackendStatusError,
+    keyboard_pager,
+    callback_registry,
+    AccessorySpecChoice,
+    traced,
+)
+from .calculation_states import CalcStates
+from .flow import StepCallback
+from .inline_search import take_search_pick
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class AccessoryTexts:
+    prompt: str
+    server_error: str
+    network_error: str
+    empty: str
+    summary_title: str
+    nothing_chosen: str
+
+
+class AccessoryPipeline:
+    """
+    Выбор аксессуаров для одной товарной линии (забор, ворота, ...):
+    список -> характеристика -> количество, по кругу до «Готово».
+    kind — это accessoriableType бэкенда и префикс ключей в user_data.
+    """
+
+    def __init__(
+            self,
+            kind: str,
+            list_state: CalcStates,
+            spec_state: CalcStates,
+            quantity_state: CalcStates,
+            texts: AccessoryTexts,
+            next_step: StepCallback,
+    ):
+        self.kind = kind
+        self.list_state = list_state
+        self.spec_state = spec_state
+        self.quantity_state = quantity_state
+        self.texts = texts
+        self._next_step = next_step
+
+        self._map_key = f"{kind}_accessories_map"
+        self._chosen_key = f"{kind}_accessories_chosen"
+        self._current_id_key = f"current_{kind}_accessory_id"
+        self._current_name_key = f"current_{kind}_accessory_name"
+
+        # имена нужны трассировке и профайлеру, чтобы шаги забора и ворот различались
+        self.ask = _named(self._ask, f"ask_{kind}_accessories")
+        self.handle_choice = _named(self._handle_choice, f"handle_{kind}_accessory")
+        self.handle_spec_choice = _named(self._handle_spec_choice, f"handle_{kind}_accessory_spec_choice")
+        self.handle_quantity = _named(self._handle_quantity, f"handle_{kind}_accessory_quantity")
+
+    async def _ask(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+        try:
+            entry = await current_tenant().catalog.accessories(self.kind)
+        except BackendStatusError:
+            await update.effective_message.reply_text(self.texts.server_error)
+            return await self._next_step(update, context)
+        except aiohttp.ClientError as e:
+            logger.error(f"Network error (accessories/{self.kind}): {e}")
+            await update.effective_message.reply_text(self.texts.network_error)
+            return await self._next_step(update, context)
+
+        accessories = entry.items
+
+        if not accessories:
+            await update.effective_message.reply_text(self.texts.empty)
+            return await self._next_step(update, context)
+
+        context.user_data[self._map_key] = {
+            acc["id"]: acc["name"] for acc in accessories
+        }
+
+        markup = keyboard_pager.first_page(
+            entry.key,
+            entry.version,
+            lambda: [
+                [InlineKeyboardButton(acc["name"], callback_data=str(acc["id"]))]
+                for acc in accessories
+            ],
+            footer=[[InlineKeyboardButton("Готово", callback_data="done")]],
+        )
+
+        context.user_data.setdefault(self._chosen_key, [])
+
+        await update.effective_message.reply_text(self.texts.prompt, reply_markup=markup)
+
+        # аксессуар из поиска выбран сразу, как если бы его нажали в списке
+        picked = take_search_pick(context.user_data, f"{self.kind}_accessory")
+        if picked is not None and picked in context.user_data[self._map_key]:
+            return await self._choose(update, context, picked)
+        return self.list_state.value
+
+    async def _handle_choice(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+        query = update.callback_query
+        await query.answer()
+        choice = query.data
+
+        if choice == "done":
+            chosen_list = context.user_data.get(self._chosen_key, [])
+            if chosen_list:
+                text = self.texts.summary_title + "\n"
+                acc_map = context.user_data.get(self._map_key, {})
+                for item in chosen_list:
+                    name = acc_map.get(item["id"], str(item["id"]))
+                    text += f"• {name} x {item['quantity']}\n"
+                await query.message.reply_text(text)
+            else:
+                await query.message.reply_text(self.texts.nothing_chosen)
+
+            return await self._next_step(update, context)
+
+        return await self._choose(update, context, int(choice))
+
+    async def _choose(self, update: Update, context: ContextTypes.DEFAULT_TYPE, acc_id: int) -> int:
+        context.user_data[self._current_id_key] = acc_id
+
+        accessory_specs = current_tenant().accessory_specs
+        try:
+            accessory = await accessory_specs.lookup(self.kind, acc_id)
+        except BackendStatusError:
+            await update.effective_message.reply_text("Ошибка при получении данных аксессуара.")
+            return self.list_state.value
+        except aiohttp.ClientError as e:
+            logger.error(f"Network error (GET /accessories/{acc_id}): {e}")
+            await update.effective_message.reply_text("Проблема с сетью. Попробуйте позже.")
+            return self.list_state.value
+
+        acc_name = accessory.name
+
+        context.user_data[self._current_name_key] = acc_name
+        context.user_data.pop("current_spec_id", None)
+        context.user_data.pop("current_spec_dimension", None)
+
+        if not accessory.specs:
+            await update.effective_message.reply_text(
+                f"Для «{acc_name}» нет характеристик. Сколько штук вам нужно?"
+            )
+            return self.quantity_state.value
+        elif len(accessory.specs) == 1:
+            only_spec = accessory.specs[0]
+            context.user_data["current_spec_id"] = only_spec.spec_id
+            context.user_data["current_spec_dimension"] = only_spec.dimension
+
+            await update.effective_message.reply_text(
+                f"Вы выбрали «{acc_name}» ({only_spec.dimension}). Сколько штук вам нужно?"
+            )
+            return self.quantity_state.value
+        else:
+            await update.effective_message.reply_text(
+                f"Вы выбрали «{acc_name}».\nТеперь выберите характеристику:",
+                reply_markup=accessory_specs.keyboard(self.kind, accessory)
+            )
+            return self.spec_state.value
+
+    async def _handle_spec_choice(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+        query = update.callback_query
+        await query.answer()
+        choice = callback_registry.resolve(query.data)
+
+        if not isinstance(choice, AccessorySpecChoice):
+            await query.message.reply_text("Кнопка устарела. Выберите аксессуар заново.")
+            return await self.ask(update, context)
+
+        context.user_data["current_spec_id"] = choice.spec_id
+        context.user_data["current_spec_dimension"] = choice.dimension
+
+        acc_name = context.user_data.get(self._current_name_key, "неизвестный аксессуар")
+
+        await query.message.reply_text(
+            f"Вы выбрали «{acc_name}» ({choice.dimension}). Сколько штук вам нужно?"
+        )
+        return self.quantity_state.value
+
+    async def _handle_quantity(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+        try:
+            qty = int(update.message.text)
+            if qty <= 0:
+                raise ValueError("Quantity must be > 0")
+        except ValueError:
+            await update.message.reply_text("Пожалуйста, введите целое положительное число")
+            return self.quantity_state.value
+
+        acc_id = context.user_data.get(self._current_id_key)
+        acc_name = context.user_data.get(self._current_name_key, "неизвестный аксессуар")
+        spec_id = context.user_data.get("current_spec_id")
+        dimension = context.user_data.get("current_spec_dimension")
+
+        if not acc_id:
+            await update.message.reply_text("Неизвестный аксессуар, попробуйте заново.")
+            return await self.ask(update, context)
+
+        context.user_data.setdefault(self._chosen_key, []).append({
+            "id": acc_id,
+            "spec_id": spec_id,
+            "quantity": qty
+        })
+
+        msg = f"Добавлено: {acc_name}"
+        if dimension:
+            msg += f" ({dimension})"
+        msg += f" x {qty}."
+
+        await update.message.reply_text(
+            msg + "\nЕсли хотите выбрать ещё аксессуары, нажмите на нужный пункт.\n"
+                  "Или нажмите «Готово»."
+        )
+        return await self.ask(update, context)
+
+
+def _named(method, name: str) -> StepCallback:
+    async def handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+        return await method(update, context)
+
+    handler.__name__ = handler.__qualname__ = name
+    return traced(handler)
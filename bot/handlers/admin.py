@@ -0,0 +1,213 @@
+import functools
+import logging
+import sys
+
+from telegram import Update
+from telegram.ext import CallbackContext
+from config import config
+from log_storm import log_storm
+from services import (
+    profiler,
+    send_queues,
+    step_latency,
+    press_guard,
+    job_runner,
+    current_tenant,
+    all_tenants,
+    describe_broadcast,
+    BroadcastError,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def admin_only(func):
+    @functools.wraps(func)
+    async def wrapper(update: Update, context: CallbackContext, *args, **kwargs):
+        user = update.effective_user
+        if user is None or user.id not in config.ADMIN_IDS:
+            logger.warning(f"Admin command {func.__name__} denied for user {user.id if user else None}")
+            return None
+        return await func(update, context, *args, **kwargs)
+
+    return wrapper
+
+
+@admin_only
+async def profile_command(update: Update, context: CallbackContext):
+    action = context.args[0] if context.args else "status"
+
+    match action:
+        case "on":
+            try:
+                rate = float(context.args[1]) if len(context.args) > 1 else None
+            except ValueError:
+                await update.message.reply_text("Доля сэмплирования должна быть числом от 0 до 1.")
+                return
+            profiler.start(rate)
+            await update.message.reply_text(f"Профайлер включён, доля вызовов: {profiler.sample_rate}")
+        case "off":
+            profiler.stop()
+            await update.message.reply_text("Профайлер выключен.")
+        case "dump":
+            path = profiler.dump()
+            if path is None:
+                await update.message.reply_text("Сэмплов пока нет.")
+            else:
+                await update.message.reply_text(f"Профиль сохранён: {path}")
+        case _:
+            rows = profiler.summary()
+            state = "включён" if profiler.enabled else "выключен"
+            lines = [f"Профайлер {state}, доля вызовов: {profiler.sample_rate}"]
+            for label, invocations, samples in rows[:15]:
+                lines.append(f"{label}: вызовов {invocations}, сэмплов {samples}")
+            lines.append("\nКоманды: /profile on [доля], /profile off, /profile dump")
+            await update.message.reply_text("\n".join(lines))
+
+
+@admin_only
+async def broadcast_command(update: Update, context: CallbackContext):
+    broadcasts = current_tenant().broadcasts
+    # text_html сохраняет разметку (жирный, ссылки) — рассылка отправляется с parse_mode HTML
+    parts = update.message.text_html.split(None, 1)
+    text = parts[1].strip() if len(parts) > 1 else ""
+
+    match text:
+        case "" | "status":
+            if broadcasts.active is None:
+                await update.message.reply_text(
+                    f"Рассылки нет. Получателей: {len(current_tenant().users)}\n"
+                    "Запустить: /broadcast текст, остановить: /broadcast stop"
+                )
+            else:
+                await update.message.reply_text("Рассылка идёт.\n" + describe_broadcast(broadcasts.active))
+        case "stop":
+            if await broadcasts.stop():
+                await update.message.reply_text("Рассылка остановлена.")
+            else:
+                await update.message.reply_text("Рассылки нет.")
+        case _:
+            try:
+                state = broadcasts.start(context.bot, text, update.effective_chat.id)
+            except BroadcastError as e:
+                await update.message.reply_text(str(e))
+                return
+            await update.message.reply_text(f"Рассылка запущена: получателей {state.total}.")
+
+
+def _deep_sizeof(obj, seen=None) -> int:
+    seen = seen if seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+@admin_only
+async def stats_command(update: Update, context: CallbackContext):
+    application = context.application
+    lines = ["<b>Диалоги по шагам</b>"]
+
+    tenant = current_tenant()
+    steps = tenant.metrics.steps.counts()
+    if steps:
+        lines += [f"{name}: {count}" for name, count in steps.most_common()]
+    else:
+        lines.append("нет активных диалогов")
+
+    active_users = [data for data in application.user_data.values() if data]
+    user_data_bytes = sum(_deep_sizeof(data) for data in active_users)
+    lines.append(f"\n<b>user_data</b>: {len(active_users)} польз., ~{user_data_bytes / 1024:.1f} КБ")
+
+    catalog, backend, admission = tenant.catalog, tenant.backend, tenant.admission
+    accessory_specs = tenant.accessory_specs
+
+    lookups = catalog.hits + catalog.misses
+    hit_ratio = catalog.hits / lookups * 100 if lookups else 0.0
+    lines.append(
+        f"<b>Каталог</b>: записей {len(catalog)}, попаданий {catalog.hits}/{lookups} ({hit_ratio:.1f}%), "
+        f"304 {catalog.not_modified}, по изменениям {catalog.delta_syncs}, из снимка {catalog.snapshot_hits}"
+    )
+    lines.append(
+        f"<b>Характеристики аксессуаров</b>: {len(accessory_specs)} шт., перестроений {accessory_specs.builds} "
+        f"({accessory_specs.build_requests} запр.), из индекса {accessory_specs.hits}, догружено {accessory_specs.misses}"
+    )
+    if catalog.degraded:
+        lines.append(f"⚠️ бэкенд недоступен, устаревшие данные: {', '.join(sorted(catalog.degraded))}")
+
+    p50, p95, p99 = backend.latency.percentiles(0.5, 0.95, 0.99)
+    lines.append(
+        f"<b>Бэкенд</b>: в полёте {backend.in_flight}, всего {backend.requests_total}, "
+        f"получено {backend.bytes_received / 1024:.0f} КБ, "
+        f"p50 {p50 * 1000:.0f} мс, p95 {p95 * 1000:.0f} мс, p99 {p99 * 1000:.0f} мс"
+    )
+
+    lines.append(
+        f"<b>Допуск</b>: расчётов {admission.active}/{admission.capacity()} (макс. {admission.max_active}), "
+        f"в очереди {admission.queued}, отказов {admission.rejected_total}"
+    )
+
+    lines.append(f"<b>Повторные нажатия</b>: отсечено {press_guard.suppressed}")
+
+    if step_latency:
+        lines.append("<b>Шаги расчёта</b> (p50 / p95):")
+        for name, window in sorted(step_latency.items()):
+            step_p50, step_p95 = window.percentiles(0.5, 0.95)
+            lines.append(f"{name}: {step_p50 * 1000:.0f} / {step_p95 * 1000:.0f} мс")
+
+    (job_p95,) = job_runner.run_latency.percentiles(0.95)
+    lines.append(
+        f"<b>Фоновые задачи</b>: выполняется {job_runner.running}/{job_runner.workers}, "
+        f"в очереди {job_runner.queued}, готово {job_runner.completed}, ошибок {job_runner.failed}, "
+        f"таймаутов {job_runner.timed_out}, отменено {job_runner.cancelled}, p95 {job_p95:.0f} с"
+    )
+
+    ages = tenant.pending_reports.ages()
+    lines.append(f"<b>Отчёты в ожидании</b>: {len(ages)}")
+    lines += [f"{report_id}: {age:.0f} с" for report_id, age in ages[:10]]
+
+    if tenant.broadcasts.active is not None:
+        state = tenant.broadcasts.active
+        lines.append(
+            f"<b>Рассылка</b>: {state.done}/{state.total}, {state.rate:.1f} сообщ./с, "
+            f"429 от Telegram {tenant.broadcasts.limiter.throttled}"
+        )
+
+    lines.append(
+        f"<b>История расчётов</b>: записей {len(tenant.history)}, "
+        f"отправлено по file_id {tenant.history.resent}, пересчитано {tenant.history.resubmitted}"
+    )
+
+    if tenant.speculation.enabled:
+        speculation = tenant.speculation
+        lines.append(
+            f"<b>Расчёты заранее</b>: отправлено {speculation.submitted}, пригодилось {speculation.promoted}, "
+            f"мимо {speculation.missed}, впустую {speculation.wasted}, пропущено {speculation.skipped}, "
+            f"ждут выбора {speculation.in_flight}"
+        )
+
+    lines.append(f"<b>Очередь входящих обновлений</b>: {application.update_queue.qsize()}")
+    for name, depth in send_queues.items():
+        lines.append(f"<b>Очередь отправки {name}</b>: {depth()}")
+
+    tenants = all_tenants()
+    if len(tenants) > 1:
+        lines.append(f"<b>Боты в процессе</b>: {len(tenants)}, бэкендов {len({t.stack.url for t in tenants})}")
+        for other in tenants:
+            (other_p95,) = other.metrics.latency.percentiles(0.95)
+            lines.append(
+                f"{other.name}: обновлений {other.metrics.updates}, ошибок {other.metrics.errors}, "
+                f"расчётов {other.metrics.calculations}, допуск {other.admission.active}/{other.admission.queued}, "
+                f"p95 {other_p95 * 1000:.0f} мс"
+            )
+
+    lines.append(
+        f"<b>Логи</b>: подавлено повторов {log_storm.suppressed_total}, отпечатков ошибок {len(log_storm)}"
+    )
+
+    await update.message.reply_text("\n".join(lines), parse_mode="HTML")
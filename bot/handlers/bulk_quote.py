@@ -0,0 +1,107 @@
+import logging
+
+import aiohttp
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import CallbackContext
+
+from config import config
+from services import (
+    current_tenant,
+    traced_entry,
+    BackendStatusError,
+    BulkQuoteError,
+    ProgressThrottle,
+    parse_table,
+    run_bulk_quote,
+    summary_csv,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_FILE_SIZE = 5 * 1024 * 1024
+
+# у пользователя не больше одной загрузки в работе: каждая — до MAX_BULK_ROWS запросов к бэкенду
+_active_uploads: set[int] = set()
+
+
+def may_bulk_quote(user_id: int) -> bool:
+    return user_id in config.ADMIN_IDS or user_id in config.BULK_QUOTE_USER_IDS
+
+
+@traced_entry
+async def handle_bulk_quote_file(update: Update, context: CallbackContext):
+    user_id = update.effective_user.id
+    if not may_bulk_quote(user_id):
+        logger.warning(f"Bulk quote denied for user {user_id}")
+        await update.message.reply_text("Расчёт из файла доступен только дилерам. Воспользуйтесь /calc.")
+        return
+    if user_id in _active_uploads:
+        await update.message.reply_text("Предыдущий файл ещё обрабатывается, дождитесь сводки по нему.")
+        return
+    _active_uploads.add(user_id)
+    try:
+        await _bulk_quote(update, context)
+    finally:
+        _active_uploads.discard(user_id)
+
+
+async def _bulk_quote(update: Update, context: CallbackContext):
+    document = update.message.document
+    if document.file_size and document.file_size > MAX_FILE_SIZE:
+        await update.message.reply_text("Файл слишком большой, максимум 5 МБ.")
+        return
+
+    try:
+        file = await document.get_file()
+        content = bytes(await file.download_as_bytearray())
+        rows = parse_table(document.file_name or "", content)
+    except BulkQuoteError as e:
+        await update.message.reply_text(str(e))
+        return
+
+    status_message = await update.message.reply_text(f"Проверяю {len(rows)} строк по каталогу...")
+
+    async def show_progress(done: int, total: int):
+        try:
+            await status_message.edit_text(f"Отправлено расчётов: {done} из {total}")
+        except TelegramError as e:
+            logger.warning(f"Failed to update bulk quote progress: {e}")
+
+    tenant = current_tenant()
+    try:
+        await run_bulk_quote(
+            rows,
+            update.effective_user.id,
+            progress=ProgressThrottle(show_progress),
+            source=tenant.catalog,
+            client=tenant.backend,
+            specs=tenant.accessory_specs,
+        )
+    except (aiohttp.ClientError, BackendStatusError) as e:
+        logger.error(f"Catalog unavailable for bulk quote: {e}")
+        await status_message.edit_text("Каталог сейчас недоступен, попробуйте позже.")
+        return
+
+    # каждый принятый расчёт доставляется и попадает в историю, как обычный из диалога
+    chat_id = update.effective_chat.id
+    submitted = 0
+    for row in rows:
+        if row.status != "submitted":
+            continue
+        submitted += 1
+        tenant.history.record(row.report_id, update.effective_user.id, chat_id, row.draft)
+        tenant.report_delivery.deliver(context.bot, row.report_id, chat_id)
+    invalid = sum(1 for row in rows if row.status == "invalid")
+    failed = sum(1 for row in rows if row.status == "failed")
+    logger.info(f"Bulk quote from user {update.effective_user.id}: "
+                f"{submitted} submitted, {invalid} invalid, {failed} failed")
+
+    await update.message.reply_document(
+        document=summary_csv(rows),
+        filename="bulk_quote.csv",
+        caption=(
+            f"Готово: отправлено {submitted}, с ошибками {invalid}, не принято сервером {failed}. "
+            "Отчёты придут сюда по мере готовности."
+        ),
+    )
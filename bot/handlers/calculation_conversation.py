@@ -1,8 +1,8 @@
 import logging
+from typing import Optional
 import aiohttp
-import asyncio
-import datetime
 from telegram import (
+    Bot,
     Update,
     InlineKeyboardButton,
     InlineKeyboardMarkup
@@ -11,15 +11,159 @@ from telegram.ext import (
     ContextTypes,
     ConversationHandler,
 )
-from config import config
+from services import (
+    BackendStatusError,
+    current_tenant,
+    keyboard_pager,
+    callback_registry,
+    AccessorySpecChoice,
+    FenceSpecChoice,
+    GateSpecChoice,
+    PageTurn,
+    new_report_id,
+    draft_from,
+    build_calculation,
+    submit_calculation,
+    traced,
+    traced_entry,
+)
+from .accessories import AccessoryPipeline, AccessoryTexts
 from .calculation_states import CalcStates
+from .flow import Flow, Step
+from .inline_search import SEARCH_PICK_KEY, describe_search_item, find_search_pick, take_search_pick
 
 logger = logging.getLogger(__name__)
 
 
+@traced
+async def reply_stale_button(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    logger.info(f"Stale callback token: {update.callback_query.data}")
+    context.user_data.clear()
+    current_tenant().speculation.discard(update.effective_user.id)
+    calculation_flow.track(update.effective_user.id, ConversationHandler.END)
+    await update.effective_message.reply_text(
+        "Эта кнопка устарела. Начните расчёт заново: /calc или «Расчет»."
+    )
+    return ConversationHandler.END
+
+
+@traced
+async def reply_expired_keyboard(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Токен кнопки вытеснен из реестра: клавиатуру не восстановить, расчёт начинается заново."""
+    await update.callback_query.answer("Клавиатура устарела")
+    return await reply_stale_button(update, context)
+
+
+@traced
+async def turn_page(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    await query.answer()
+
+    turn = callback_registry.resolve(query.data)
+    if not isinstance(turn, PageTurn):
+        return None
+
+    markup = keyboard_pager.page(turn)
+    if markup is None:
+        await query.message.reply_text("Список обновился. Начните расчёт заново: /calc или «Расчет».")
+        return None
+
+    await query.edit_message_reply_markup(reply_markup=markup)
+    return None
+
+
+CALC_START_CALLBACK = "calc_start"
+# callback_data кнопок выбора из каталога — id позиции
+CHOICE_ID = r"^\d+$"
+ACCESSORY_CHOICE = r"^(\d+|done)$"
+
+
+@traced_entry
 async def start_calculation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     context.user_data.clear()
+    picked = find_search_pick(context.args)
+
+    user_id = update.effective_user.id
+    admission = current_tenant().admission
+    position = admission.try_admit(user_id, update.effective_chat.id)
+    if position is not None:
+        if update.callback_query:
+            await update.callback_query.answer()
+        if position == 0:
+            await update.effective_message.reply_text(
+                "Сейчас очень много расчётов, очередь заполнена. Попробуйте, пожалуйста, через несколько минут."
+            )
+        else:
+            await update.effective_message.reply_text(
+                f"Сейчас много расчётов одновременно. Вы в очереди: №{position}.\n"
+                "Мы напишем, как только можно будет начать. Выйти из очереди — «Главное меню»."
+            )
+        return ConversationHandler.END
+
+    # id отчёта выдаётся на весь диалог, так что повторная отправка итога попадёт в тот же отчёт
+    context.user_data["report_id"] = new_report_id(user_id)
+    state = None
+    if picked is not None:
+        if picked.kind == "fence":
+            await update.effective_message.reply_text(f"Из поиска: {describe_search_item(picked)}.")
+            state = await _begin_from_fence(update, context, picked.id)
+        else:
+            # ворота и аксессуары выбираются после забора — свой шаг подставит позицию сам
+            context.user_data[SEARCH_PICK_KEY] = (picked.kind, picked.id)
+            await update.effective_message.reply_text(
+                f"Из поиска: {describe_search_item(picked)}. Сначала выберем забор, "
+                "эта позиция подставится на своём шаге."
+            )
+    if state is None:
+        state = await _begin_calculation(update, context)
+    if state == ConversationHandler.END:
+        admission.release(user_id)
+    calculation_flow.track(user_id, state)
+    return state
+
+
+async def notify_admitted(bot: Bot, chat_id: int) -> None:
+    await bot.send_message(
+        chat_id=chat_id,
+        text="Подошла ваша очередь — можно начинать расчёт.",
+        reply_markup=InlineKeyboardMarkup([
+            [InlineKeyboardButton("Начать расчёт", callback_data=CALC_START_CALLBACK)]
+        ]),
+    )
+
+
+async def _begin_from_fence(update: Update, context: ContextTypes.DEFAULT_TYPE, fence_id: int) -> Optional[int]:
+    """
+    Забор из поиска: тип, высота и вариант берутся из каталога, расчёт продолжается с ввода длины.
+    Если высоты позиции нет среди популярных — с выбора высоты. None — начать расчёт с начала.
+    """
+    catalog = current_tenant().catalog
+    try:
+        fence = next((f for f in (await catalog.all_fences()).items if f["id"] == fence_id), None)
+        if fence is None or not fence.get("typeId"):
+            return None
+        specs = (await catalog.fence_popular_specs(fence["typeId"])).items
+    except (BackendStatusError, aiohttp.ClientError) as e:
+        logger.warning(f"Failed to resolve fence {fence_id} from search: {e}")
+        return None
+
+    context.user_data["fence_type_id"] = fence["typeId"]
+    spec = next((s for s in specs if s["height"] == fence.get("height")), None)
+    if spec is None:
+        return await ask_fence_popular_specs(update, context)
+
+    context.user_data["fence_spec_id"] = spec["spec_id"]
+    context.user_data["fence_height"] = spec["height"] / 1000.0
+    context.user_data["fence_variant_id"] = fence_id
+    context.user_data["fence_variants_map"] = {fence_id: fence["name"]}
+    await update.effective_message.reply_text(
+        f"Вариант забора: «{fence['name']}».\n"
+        "Введите общую длину забора (в метрах)."
+    )
+    return CalcStates.FENCE_LENGTH.value
 
+
+async def _begin_calculation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     if update.message:
         await update.message.reply_text("Запускаем расчёт забора...")
     elif update.callback_query:
@@ -27,38 +171,37 @@ async def start_calculation(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await update.callback_query.message.reply_text("Запускаем расчёт забора...")
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"{config.BASE_API_URL}fences/types") as response:
-                if response.status == 200:
-                    data = await response.json()
-                    fence_types = data.get("data", [])
-
-                    if not fence_types:
-                        await update.effective_message.reply_text(
-                            "К сожалению, нет доступных типов забора."
-                        )
-                        return ConversationHandler.END
-
-                    keyboard = [
-                        [InlineKeyboardButton(ft["name"], callback_data=str(ft["id"]))]
-                        for ft in fence_types
-                    ]
-
-                    markup = InlineKeyboardMarkup(keyboard)
-                    await update.effective_message.reply_text(
-                        "Выберите тип забора:",
-                        reply_markup=markup
-                    )
-                    return CalcStates.FENCE_TYPE.value
-                else:
-                    await update.effective_message.reply_text("Ошибка сервера при загрузке типов забора.")
-                    return ConversationHandler.END
+        entry = await current_tenant().catalog.fence_types()
+    except BackendStatusError:
+        await update.effective_message.reply_text("Ошибка сервера при загрузке типов забора.")
+        return ConversationHandler.END
     except aiohttp.ClientError as e:
         logger.error(f"Network error: {e}")
         await update.effective_message.reply_text("Проблема с сетью. Попробуйте позже.")
         return ConversationHandler.END
 
+    fence_types = entry.items
+
+    if not fence_types:
+        await update.effective_message.reply_text(
+            "К сожалению, нет доступных типов забора."
+        )
+        return ConversationHandler.END
+
+    keyboard = [
+        [InlineKeyboardButton(ft["name"], callback_data=str(ft["id"]))]
+        for ft in fence_types
+    ]
+
+    markup = InlineKeyboardMarkup(keyboard)
+    await update.effective_message.reply_text(
+        "Выберите тип забора:",
+        reply_markup=markup
+    )
+    return CalcStates.FENCE_TYPE.value
+
 
+@traced
 async def choose_fence_type(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
@@ -76,6 +219,7 @@ async def choose_fence_type(update: Update, context: ContextTypes.DEFAULT_TYPE)
     return await ask_fence_popular_specs(update, context)
 
 
+@traced
 async def ask_fence_popular_specs(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     fence_type_id = context.user_data.get("fence_type_id")
 
@@ -84,101 +228,100 @@ async def ask_fence_popular_specs(update: Update, context: ContextTypes.DEFAULT_
         return ConversationHandler.END
 
     try:
-        url = f"{config.BASE_API_URL}fences/popular-specs?typeId={fence_type_id}"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    specs = data.get("data", [])
-
-                    if not specs:
-                        await update.effective_message.reply_text(
-                            "К сожалению, нет популярных высот. Попробуйте начать заново."
-                        )
-                        return ConversationHandler.END
-
-                    keyboard = []
-                    for spec in specs:
-                        mm_height = spec["height"]
-                        spec_id = spec["spec_id"]
-                        meters = mm_height / 1000.0
-                        text_label = f"{meters} м"
-                        callback_data = str(spec_id) + "_" + str(meters)
-                        keyboard.append([InlineKeyboardButton(text_label, callback_data=callback_data)])
-
-                    markup = InlineKeyboardMarkup(keyboard)
-                    await update.effective_message.reply_text(
-                        "Выберите популярную высоту забора:",
-                        reply_markup=markup
-                    )
-                    return CalcStates.FENCE_VARIANTS.value
-                else:
-                    await update.effective_message.reply_text("Ошибка сервера при получении популярных высот.")
-                    return ConversationHandler.END
+        entry = await current_tenant().catalog.fence_popular_specs(fence_type_id)
+    except BackendStatusError:
+        await update.effective_message.reply_text("Ошибка сервера при получении популярных высот.")
+        return ConversationHandler.END
     except aiohttp.ClientError as e:
         logger.error(f"Network error: {e}")
         await update.effective_message.reply_text("Не удалось связаться с сервером. Попробуйте позже.")
         return ConversationHandler.END
 
+    specs = entry.items
+
+    if not specs:
+        await update.effective_message.reply_text(
+            "К сожалению, нет популярных высот. Попробуйте начать заново."
+        )
+        return ConversationHandler.END
+
+    keyboard = []
+    for spec in specs:
+        mm_height = spec["height"]
+        spec_id = spec["spec_id"]
+        meters = mm_height / 1000.0
+        text_label = f"{meters} м"
+        callback_data = callback_registry.issue(FenceSpecChoice(spec_id, meters))
+        keyboard.append([InlineKeyboardButton(text_label, callback_data=callback_data)])
+
+    markup = InlineKeyboardMarkup(keyboard)
+    await update.effective_message.reply_text(
+        "Выберите популярную высоту забора:",
+        reply_markup=markup
+    )
+    return CalcStates.FENCE_VARIANTS.value
 
+
+@traced
 async def choose_fence_variant(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
-    choice = query.data
+    choice = callback_registry.resolve(query.data)
 
     fence_type_id = context.user_data.get("fence_type_id")
     if not fence_type_id:
         await query.message.reply_text("Ошибка: отсутствует выбранный тип забора.")
         return ConversationHandler.END
 
-    spec_id, height_meters = choice.split("_")
+    if not isinstance(choice, FenceSpecChoice):
+        return await reply_stale_button(update, context)
 
-    height_meters = float(height_meters)
+    height_meters = choice.height
 
     context.user_data["fence_height"] = height_meters
-    context.user_data["fence_spec_id"] = int(spec_id)
+    context.user_data["fence_spec_id"] = choice.spec_id
 
     try:
-        url = f"{config.BASE_API_URL}fences?typeId={fence_type_id}&height={height_meters}"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    fence_variants = data.get("data", [])
-
-                    if not fence_variants:
-                        await query.message.reply_text(
-                            "К сожалению, по выбранным параметрам ничего не нашлось.\n"
-                            "Можете начать заново (нажмите /calc или 'Расчет')."
-                        )
-                        return ConversationHandler.END
-
-                    context.user_data["fence_variants_map"] = {
-                        fv["id"]: fv["name"] for fv in fence_variants
-                    }
-
-                    keyboard = [
-                        [InlineKeyboardButton(fv["name"], callback_data=str(fv["id"]))]
-                        for fv in fence_variants
-                    ]
-
-                    keyboard.append([InlineKeyboardButton("Главное меню", callback_data="main_menu")])
-
-                    markup = InlineKeyboardMarkup(keyboard)
-                    await query.message.edit_text(
-                        "Выберите вариант забора из списка:",
-                        reply_markup=markup
-                    )
-                    return CalcStates.FENCE_LENGTH.value
-                else:
-                    await query.message.reply_text("Ошибка сервера при получении вариантов забора.")
-                    return ConversationHandler.END
+        entry = await current_tenant().catalog.fence_variants(fence_type_id, height_meters)
+    except BackendStatusError:
+        await query.message.reply_text("Ошибка сервера при получении вариантов забора.")
+        return ConversationHandler.END
     except aiohttp.ClientError as e:
         logger.error(f"Network error: {e}")
         await query.message.reply_text("Проблема с сетью. Попробуйте позже.")
         return ConversationHandler.END
 
+    fence_variants = entry.items
+
+    if not fence_variants:
+        await query.message.reply_text(
+            "К сожалению, по выбранным параметрам ничего не нашлось.\n"
+            "Можете начать заново (нажмите /calc или 'Расчет')."
+        )
+        return ConversationHandler.END
+
+    context.user_data["fence_variants_map"] = {
+        fv["id"]: fv["name"] for fv in fence_variants
+    }
 
+    markup = keyboard_pager.first_page(
+        entry.key,
+        entry.version,
+        lambda: [
+            [InlineKeyboardButton(fv["name"], callback_data=str(fv["id"]))]
+            for fv in fence_variants
+        ],
+        footer=[[InlineKeyboardButton("Главное меню", callback_data="main_menu")]],
+    )
+
+    await query.message.edit_text(
+        "Выберите вариант забора из списка:",
+        reply_markup=markup
+    )
+    return CalcStates.FENCE_LENGTH.value
+
+
+@traced
 async def save_fence_variant(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
@@ -204,6 +347,7 @@ async def save_fence_variant(update: Update, context: ContextTypes.DEFAULT_TYPE)
     return CalcStates.FENCE_LENGTH.value
 
 
+@traced
 async def ask_fence_length(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     message_text = update.message.text
     try:
@@ -224,210 +368,12 @@ async def ask_fence_length(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     return await ask_fence_accessories(update, context)
 
 
-async def ask_fence_accessories(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    try:
-        url = f"{config.BASE_API_URL}accessories?accessoriableType=fence"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    accessories = data.get("data", [])
-
-                    if not accessories:
-                        await update.effective_message.reply_text(
-                            "Аксессуаров для забора не найдено. Переходим к следующему шагу."
-                        )
-                        return CalcStates.NEED_GATES.value
-
-                    context.user_data["fence_accessories_map"] = {
-                        acc["id"]: acc["name"] for acc in accessories
-                    }
-
-                    keyboard = []
-                    for acc in accessories:
-                        btn_text = acc["name"]
-                        btn_data = str(acc["id"])
-                        keyboard.append([InlineKeyboardButton(btn_text, callback_data=btn_data)])
-
-                    keyboard.append([InlineKeyboardButton("Готово", callback_data="done")])
-
-                    markup = InlineKeyboardMarkup(keyboard)
-
-                    if "fence_accessories_chosen" not in context.user_data:
-                        context.user_data["fence_accessories_chosen"] = []
-
-                    await update.effective_message.reply_text(
-                        "Выберите аксессуар для вашего забора (каждый раз после выбора введите количество), "
-                        "или нажмите «Готово»:",
-                        reply_markup=markup
-                    )
-                    return CalcStates.FENCE_ACCESSORIES.value
-                else:
-                    await update.effective_message.reply_text(
-                        "Ошибка сервера при получении списка аксессуаров. Переходим дальше."
-                    )
-                    return CalcStates.NEED_GATES.value
-    except aiohttp.ClientError as e:
-        logger.error(f"Network error (accessories/fence): {e}")
-        await update.effective_message.reply_text("Проблема с сетью. Пропускаем выбор аксессуаров.")
-        return CalcStates.NEED_GATES.value
-
-
-async def handle_fence_accessory(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    query = update.callback_query
-    await query.answer()
-    choice = query.data
-
-    if choice == "done":
-        chosen_list = context.user_data.get("fence_accessories_chosen", [])
-        if chosen_list:
-            text = "Вы выбрали аксессуары:\n"
-            acc_map = context.user_data.get("fence_accessories_map", {})
-            for item in chosen_list:
-                acc_id = item["id"]
-                qty = item["quantity"]
-                name = acc_map.get(acc_id, str(acc_id))
-                text += f"• {name} x {qty}\n"
-            await query.message.reply_text(text)
-        else:
-            await query.message.reply_text("Вы не выбрали ни одного аксессуара.")
-
-        return await ask_need_gates(update, context)
-
-    acc_id = int(choice)
-    context.user_data["current_fence_accessory_id"] = acc_id
-
-    try:
-        url = f"{config.BASE_API_URL}accessories/{acc_id}"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    acc_data = data.get("data", {})
-
-                    acc_name = acc_data.get("name", "неизвестный аксессуар")
-                    specs_list = acc_data.get("specs", [])
-
-                    context.user_data["current_fence_accessory_name"] = acc_name
-
-                    if not specs_list:
-                        await query.message.reply_text(
-                            f"Для «{acc_name}» нет характеристик. Сколько штук вам нужно?"
-                        )
-                        return CalcStates.FENCE_ACCESSORIES_QUANTITY.value
-                    elif len(specs_list) == 1:
-                        only_spec = specs_list[0]
-                        spec_id = only_spec["spec_id"]
-                        dimension = only_spec["dimension"]
-                        context.user_data["current_spec_id"] = spec_id
-                        context.user_data["current_spec_dimension"] = dimension
-
-                        await query.message.reply_text(
-                            f"Вы выбрали «{acc_name}» ({dimension}). Сколько штук вам нужно?"
-                        )
-                        return CalcStates.FENCE_ACCESSORIES_QUANTITY.value
-                    else:
-                        specs_map = {}
-                        for spec in specs_list:
-                            sp_id = spec["spec_id"]
-                            sp_dim = spec["dimension"]
-                            specs_map[sp_id] = sp_dim
-
-                        context.user_data["current_specs_map"] = specs_map
-
-                        keyboard = []
-                        for spec in specs_list:
-                            btn_data = f"spec_{spec['spec_id']}"
-                            keyboard.append([InlineKeyboardButton(
-                                spec["dimension"],
-                                callback_data=btn_data
-                            )])
-
-                        await query.message.reply_text(
-                            f"Вы выбрали «{acc_name}».\nТеперь выберите характеристику:",
-                            reply_markup=InlineKeyboardMarkup(keyboard)
-                        )
-                        return CalcStates.FENCE_ACCESSORY_SPECS.value
-                else:
-                    await query.message.reply_text("Ошибка при получении данных аксессуара.")
-                    return CalcStates.FENCE_ACCESSORIES.value
-    except aiohttp.ClientError as e:
-        logger.error(f"Network error (GET /accessories/{acc_id}): {e}")
-        await query.message.reply_text("Проблема с сетью. Попробуйте позже.")
-        return CalcStates.FENCE_ACCESSORIES.value
-
-
-async def handle_fence_accessory_spec_choice(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    query = update.callback_query
-    await query.answer()
-    choice = query.data
-
-    if not choice.startswith("spec_"):
-        await query.message.reply_text("Неверный выбор спецификации.")
-        return CalcStates.FENCE_ACCESSORY_SPECS.value
-
-    spec_id_str = choice[len("spec_"):]
-    spec_id = int(spec_id_str)
-
-    specs_map = context.user_data.get("current_specs_map", {})
-    dimension = specs_map.get(spec_id, "неизвестная характеристика")
-
-    context.user_data["current_spec_id"] = spec_id
-    context.user_data["current_spec_dimension"] = dimension
-
-    acc_name = context.user_data.get("current_fence_accessory_name", "неизвестный аксессуар")
-
-    await query.message.reply_text(
-        f"Вы выбрали «{acc_name}» ({dimension}). Сколько штук вам нужно?"
-    )
-
-    return CalcStates.FENCE_ACCESSORIES_QUANTITY.value
-
-
-async def handle_fence_accessory_quantity(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    text = update.message.text
-
-    try:
-        qty = int(text)
-        if qty <= 0:
-            raise ValueError("Quantity must be > 0")
-    except ValueError:
-        await update.message.reply_text("Пожалуйста, введите положительное число")
-        return CalcStates.FENCE_ACCESSORIES_QUANTITY.value
-
-    acc_id = context.user_data.get("current_fence_accessory_id")
-    acc_name = context.user_data.get("current_fence_accessory_name", "неизвестный аксессуар")
-    spec_id = context.user_data.get("current_spec_id")
-    dimension = context.user_data.get("current_spec_dimension", "неизвестная характеристика")
-
-    if not acc_id:
-        await update.message.reply_text("Неизвестный аксессуар, попробуйте заново.")
-        return await ask_fence_accessories(update, context)
-
-    chosen_list = context.user_data.get("fence_accessories_chosen", [])
-
-    chosen_list.append({
-        "id": acc_id,
-        "spec_id": spec_id,
-        "quantity": qty
-    })
-
-    context.user_data["fence_accessories_chosen"] = chosen_list
-
-    msg = f"Добавлено: {acc_name}"
-    if dimension:
-        msg += f" ({dimension})"
-    msg += f" x {qty}."
-
-    await update.message.reply_text(
-        msg + "\nЕсли хотите выбрать ещё аксессуары, нажмите на нужный пункт.\n"
-              "Или нажмите «Готово»."
-    )
-
-    return await ask_fence_accessories(update, context)
-
-
+@traced
 async def ask_need_gates(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    gate_id = take_search_pick(context.user_data, "gate")
+    if gate_id is not None:
+        return await _begin_gates_from_search(update, context, gate_id)
+
     keyboard = [
         [
             InlineKeyboardButton("Да", callback_data="gates_yes"),
@@ -443,6 +389,7 @@ async def ask_need_gates(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     return CalcStates.NEED_GATES.value
 
 
+@traced
 async def handle_need_gates(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
@@ -454,38 +401,52 @@ async def handle_need_gates(update: Update, context: ContextTypes.DEFAULT_TYPE)
     elif choice == "gates_no":
         context.user_data["need_gates"] = False
         await query.message.reply_text("Окей, идём без ворот.")
-        return CalcStates.MOUNTING_TYPE.value
+        return await ask_mounting_type(update, context)
     else:
         await query.message.reply_text("Неверный ответ. Выберите 'Да' или 'Нет'.")
         return CalcStates.NEED_GATES.value
 
 
-async def ask_gate_types(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    url = f"{config.BASE_API_URL}gates/types"
+async def _begin_gates_from_search(update: Update, context: ContextTypes.DEFAULT_TYPE, gate_id: int) -> int:
+    """Ворота из поиска: вопрос «нужны ли ворота» пропускаем, а если известен тип — и его выбор."""
+    context.user_data["need_gates"] = True
+    try:
+        gate = next((g for g in (await current_tenant().catalog.all_gates()).items if g["id"] == gate_id), None)
+    except (BackendStatusError, aiohttp.ClientError) as e:
+        logger.warning(f"Failed to resolve gate {gate_id} from search: {e}")
+        gate = None
+    if gate is None or not gate.get("typeId"):
+        return await ask_gate_types(update, context)
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            data = await response.json()
-            gate_types = data["data"]
+    context.user_data["gate_type_id"] = gate["typeId"]
+    await update.effective_message.reply_text(f"Добавляем ворота из поиска: «{gate['name']}».")
+    return await ask_gate_popular_specs_for_gates(update, context)
 
-            context.user_data["gate_types_map"] = {
-                gt["id"]: gt["name"] for gt in gate_types
-            }
 
-            keyboard = [
-                [InlineKeyboardButton(gt["name"], callback_data=str(gt["id"]))]
-                for gt in gate_types
-            ]
+@traced
+async def ask_gate_types(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    entry = await current_tenant().catalog.gate_types()
+    gate_types = entry.items
 
-            markup = InlineKeyboardMarkup(keyboard)
+    context.user_data["gate_types_map"] = {
+        gt["id"]: gt["name"] for gt in gate_types
+    }
 
-            await update.effective_message.reply_text(
-                "Выберите тип ворот:",
-                reply_markup=markup
-            )
-            return CalcStates.GATE_TYPE.value
+    keyboard = [
+        [InlineKeyboardButton(gt["name"], callback_data=str(gt["id"]))]
+        for gt in gate_types
+    ]
+
+    markup = InlineKeyboardMarkup(keyboard)
+
+    await update.effective_message.reply_text(
+        "Выберите тип ворот:",
+        reply_markup=markup
+    )
+    return CalcStates.GATE_TYPE.value
 
 
+@traced
 async def handle_gate_type(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
@@ -502,82 +463,76 @@ async def handle_gate_type(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     return await ask_gate_popular_specs_for_gates(update, context)
 
 
+@traced
 async def ask_gate_popular_specs_for_gates(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     gate_type_id = context.user_data["gate_type_id"]
 
-    url = f"{config.BASE_API_URL}gates/popular-specs?typeId={gate_type_id}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            data = await response.json()
-            specs_data = data["data"]  # не пуст, по условию
-
-            keyboard = []
-            for spec in specs_data:
-                mm_height = spec["height"]
-                mm_width = spec["width"]
-                spec_id = spec["spec_id"]
-                h_m = mm_height / 1000.0
-                w_m = mm_width / 1000.0
-                text_label = f"{h_m} м x {w_m} м"
-                callback_data = f"specId_{spec_id}_size_{h_m}x{w_m}"
-                keyboard.append([InlineKeyboardButton(text_label, callback_data=callback_data)])
-
-            markup = InlineKeyboardMarkup(keyboard)
+    entry = await current_tenant().catalog.gate_popular_specs(gate_type_id)
+    specs_data = entry.items  # не пуст, по условию
 
-            await update.effective_message.reply_text(
-                "Выберите популярные размеры ворот (в метрах):",
-                reply_markup=markup
-            )
-            return CalcStates.GATE_POPULAR_SPECS.value
+    keyboard = []
+    for spec in specs_data:
+        mm_height = spec["height"]
+        mm_width = spec["width"]
+        spec_id = spec["spec_id"]
+        h_m = mm_height / 1000.0
+        w_m = mm_width / 1000.0
+        text_label = f"{h_m} м x {w_m} м"
+        callback_data = callback_registry.issue(GateSpecChoice(spec_id, h_m, w_m))
+        keyboard.append([InlineKeyboardButton(text_label, callback_data=callback_data)])
+
+    markup = InlineKeyboardMarkup(keyboard)
+
+    await update.effective_message.reply_text(
+        "Выберите популярные размеры ворот (в метрах):",
+        reply_markup=markup
+    )
+    return CalcStates.GATE_POPULAR_SPECS.value
 
 
+@traced
 async def handle_gate_size_choice(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
 
-    choice = query.data
+    choice = callback_registry.resolve(query.data)
     gate_type_id = context.user_data["gate_type_id"]
 
-    if not choice.startswith("specId_"):
-        await query.message.reply_text("Неверный формат. Попробуйте снова.")
-        return CalcStates.GATE_POPULAR_SPECS.value
-
-    spec_id_part, size_part = choice.split("_size_")
+    if not isinstance(choice, GateSpecChoice):
+        return await reply_stale_button(update, context)
 
-    _, spec_id = spec_id_part.split("specId_")
-
-    h_str, w_str = size_part.split("x")
-    h_m = float(h_str)
-    w_m = float(w_str)
+    h_m = choice.height
+    w_m = choice.width
 
     context.user_data["gate_height"] = h_m
     context.user_data["gate_width"] = w_m
 
-    context.user_data["gate_spec_id"] = spec_id
-
-    url = f"{config.BASE_API_URL}gates?typeId={gate_type_id}&height={h_m}&width={w_m}"
+    context.user_data["gate_spec_id"] = choice.spec_id
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            data = await response.json()
-            gate_variants = data["data"]  # по условию не пусто
+    entry = await current_tenant().catalog.gate_variants(gate_type_id, h_m, w_m)
+    gate_variants = entry.items  # по условию не пусто
 
-            context.user_data["gate_variants_map"] = {
-                gv["id"]: gv["name"] for gv in gate_variants
-            }
-            keyboard = [
-                [InlineKeyboardButton(gv["name"], callback_data=str(gv["id"]))]
-                for gv in gate_variants
-            ]
-            keyboard.append([InlineKeyboardButton("Без ворот", callback_data="no_gate_variant")])
+    context.user_data["gate_variants_map"] = {
+        gv["id"]: gv["name"] for gv in gate_variants
+    }
+    markup = keyboard_pager.first_page(
+        entry.key,
+        entry.version,
+        lambda: [
+            [InlineKeyboardButton(gv["name"], callback_data=str(gv["id"]))]
+            for gv in gate_variants
+        ],
+        footer=[[InlineKeyboardButton("Без ворот", callback_data="no_gate_variant")]],
+    )
 
-            await query.message.edit_text(
-                "Выберите конкретную модель ворот:",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-            return CalcStates.GATE_VARIANTS.value
+    await query.message.edit_text(
+        "Выберите конкретную модель ворот:",
+        reply_markup=markup
+    )
+    return CalcStates.GATE_VARIANTS.value
 
 
+@traced
 async def handle_chosen_gate_variant(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
@@ -586,7 +541,7 @@ async def handle_chosen_gate_variant(update: Update, context: ContextTypes.DEFAU
     if choice == "no_gate_variant":
         context.user_data["gate_variant_id"] = None
         await query.message.reply_text("Окей, без ворот. Идём дальше.")
-        return CalcStates.MOUNTING_TYPE.value
+        return await ask_mounting_type(update, context)
 
     gate_variant_id = int(choice)
     context.user_data["gate_variant_id"] = gate_variant_id
@@ -606,6 +561,7 @@ async def handle_chosen_gate_variant(update: Update, context: ContextTypes.DEFAU
     return CalcStates.GATE_AUTOMATION.value
 
 
+@traced
 async def handle_gate_automation_choice(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
@@ -625,229 +581,42 @@ async def handle_gate_automation_choice(update: Update, context: ContextTypes.DE
     return await ask_gate_accessories(update, context)
 
 
-async def ask_gate_accessories(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    try:
-        url = f"{config.BASE_API_URL}accessories?accessoriableType=gate"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    accessories = data.get("data", [])
-
-                    context.user_data["gate_accessories_map"] = {
-                        acc["id"]: acc["name"] for acc in accessories
-                    }
-
-                    keyboard = []
-                    for acc in accessories:
-                        btn_text = acc["name"]
-                        btn_data = str(acc["id"])  # callback_data
-                        keyboard.append([InlineKeyboardButton(btn_text, callback_data=btn_data)])
-
-                    keyboard.append([InlineKeyboardButton("Готово", callback_data="done")])
-
-                    markup = InlineKeyboardMarkup(keyboard)
-
-                    if "gate_accessories_chosen" not in context.user_data:
-                        context.user_data["gate_accessories_chosen"] = []
-
-                    await update.effective_message.reply_text(
-                        "Выберите аксессуар к воротам (после выбора характеристики/количества можно повторять) "
-                        "или нажмите «Готово»:",
-                        reply_markup=markup
-                    )
-                    return CalcStates.GATE_ACCESSORIES.value
-                else:
-                    await update.effective_message.reply_text(
-                        "Ошибка сервера при получении списка аксессуаров для ворот. Пропустим аксессуары."
-                    )
-                    return CalcStates.MOUNTING_TYPE.value
-    except aiohttp.ClientError as e:
-        logger.error(f"Network error (GET /accessories gate): {e}")
-        await update.effective_message.reply_text("Проблема с сетью. Пропустим аксессуары.")
-        return CalcStates.MOUNTING_TYPE.value
-
-
-async def handle_gate_accessory(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    query = update.callback_query
-    await query.answer()
-    choice = query.data
-
-    if choice == "done":
-        chosen_list = context.user_data.get("gate_accessories_chosen", [])
-        if chosen_list:
-            text = "Вы выбрали аксессуары к воротам:\n"
-            map_ = context.user_data.get("gate_accessories_map", {})
-            for item in chosen_list:
-                acc_id = item["id"]
-                qty = item["quantity"]
-                name = map_.get(acc_id, f"ID={acc_id}")
-                text += f"• {name} x {qty}\n"
-            await query.message.reply_text(text)
-        else:
-            await query.message.reply_text("Вы не выбрали ни одного аксессуара для ворот.")
-
-        return await ask_mounting_type(update, context)
-
-    acc_id = int(choice)
-    context.user_data["current_gate_accessory_id"] = acc_id
-
+@traced
+async def ask_mounting_type(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     try:
-        url = f"{config.BASE_API_URL}accessories/{acc_id}"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    acc_data = data.get("data", {})
-                    acc_name = acc_data.get("name", "неизвестный аксессуар")
-                    specs_list = acc_data.get("specs", [])
-
-                    context.user_data["current_gate_accessory_name"] = acc_name
-
-                    if not specs_list:
-                        await query.message.reply_text(
-                            f"Для «{acc_name}» нет характеристик. Сколько штук вам нужно?"
-                        )
-                        return CalcStates.GATE_ACCESSORIES_QUANTITY.value
-                    elif len(specs_list) == 1:
-                        only_spec = specs_list[0]
-                        spec_id = only_spec["spec_id"]
-                        dimension = only_spec["dimension"]
-                        context.user_data["current_spec_id"] = spec_id
-                        context.user_data["current_spec_dimension"] = dimension
-
-                        await query.message.reply_text(
-                            f"Вы выбрали «{acc_name}» ({dimension}). Сколько штук вам нужно?"
-                        )
-                        return CalcStates.GATE_ACCESSORIES_QUANTITY.value
-                    else:
-                        specs_map = {}
-                        for spec in specs_list:
-                            specs_map[spec["spec_id"]] = spec["dimension"]
-                        context.user_data["current_specs_map"] = specs_map
-
-                        keyboard = []
-                        for spec in specs_list:
-                            btn_data = f"spec_{spec['spec_id']}"
-                            keyboard.append([InlineKeyboardButton(
-                                spec["dimension"], callback_data=btn_data
-                            )])
-
-                        await query.message.reply_text(
-                            f"Вы выбрали «{acc_name}».\nТеперь выберите характеристику:",
-                            reply_markup=InlineKeyboardMarkup(keyboard)
-                        )
-                        return CalcStates.GATE_ACCESSORY_SPECS.value
-                else:
-                    await query.message.reply_text("Ошибка при получении данных аксессуара.")
-                    return CalcStates.GATE_ACCESSORIES.value
+        entry = await current_tenant().catalog.mountings()
+    except BackendStatusError:
+        await update.effective_message.reply_text(
+            "Ошибка сервера при получении типов монтажа."
+        )
+        return ConversationHandler.END
     except aiohttp.ClientError as e:
-        logger.error(f"Network error get accessory: {e}")
-        await query.message.reply_text("Проблема с сетью. Попробуйте позже.")
-        return CalcStates.GATE_ACCESSORIES.value
-
-
-async def handle_gate_accessory_spec_choice(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    query = update.callback_query
-    await query.answer()
-    choice = query.data
-
-    if not choice.startswith("spec_"):
-        await query.message.reply_text("Неверный выбор спецификации.")
-        return CalcStates.GATE_ACCESSORY_SPECS.value
-
-    spec_id_str = choice[len("spec_"):]
-    spec_id = int(spec_id_str)
-
-    specs_map = context.user_data.get("current_specs_map", {})
-    dimension = specs_map.get(spec_id, "неизвестная характеристика")
-
-    context.user_data["current_spec_id"] = spec_id
-    context.user_data["current_spec_dimension"] = dimension
-
-    acc_name = context.user_data.get("current_gate_accessory_name", "неизвестный аксессуар")
-
-    await query.message.reply_text(
-        f"Вы выбрали «{acc_name}» ({dimension}). Сколько штук вам нужно?"
-    )
-
-    return CalcStates.GATE_ACCESSORIES_QUANTITY.value
-
-
-async def handle_gate_accessory_quantity(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    text = update.message.text
-
-    try:
-        qty = int(text)
-        if qty <= 0:
-            raise ValueError
-    except ValueError:
-        await update.message.reply_text("Введите целое положительное число.")
-        return CalcStates.GATE_ACCESSORIES_QUANTITY.value
-
-    acc_id = context.user_data.get("current_gate_accessory_id")
-    acc_name = context.user_data.get("current_gate_accessory_name", "неизвестный акс")
-    spec_id = context.user_data.get("current_spec_id")
-    dimension = context.user_data.get("current_spec_dimension")
-
-    chosen_list = context.user_data.get("gate_accessories_chosen", [])
+        logger.error(f"Network error (GET /mountings): {e}")
+        await update.effective_message.reply_text("Проблема с сетью. Завершаем.")
+        return ConversationHandler.END
 
-    chosen_list.append({
-        "id": acc_id,
-        "spec_id": spec_id,
-        "quantity": qty
-    })
+    mountings = entry.items
 
-    context.user_data["gate_accessories_chosen"] = chosen_list
+    context.user_data["mountings_map"] = {
+        m["id"]: m["name"] for m in mountings
+    }
 
-    msg = f"Добавлено: {acc_name}"
-    if dimension:
-        msg += f" ({dimension})"
-    msg += f" x {qty}."
+    keyboard = [
+        [InlineKeyboardButton(m["name"], callback_data=str(m["id"]))]
+        for m in mountings
+    ]
+    markup = InlineKeyboardMarkup(keyboard)
 
-    await update.message.reply_text(
-        msg + "\nЕсли хотите выбрать ещё аксессуары, нажмите на нужный пункт.\n"
-              "Или нажмите «Готово»."
+    await update.effective_message.reply_text(
+        "Выберите тип монтажа:",
+        reply_markup=markup
     )
-
-    return await ask_gate_accessories(update, context)
-
-
-async def ask_mounting_type(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    try:
-        url = f"{config.BASE_API_URL}mountings"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    mountings = data.get("data", [])
-
-                    context.user_data["mountings_map"] = {
-                        m["id"]: m["name"] for m in mountings
-                    }
-
-                    keyboard = [
-                        [InlineKeyboardButton(m["name"], callback_data=str(m["id"]))]
-                        for m in mountings
-                    ]
-                    markup = InlineKeyboardMarkup(keyboard)
-
-                    await update.effective_message.reply_text(
-                        "Выберите тип монтажа:",
-                        reply_markup=markup
-                    )
-                    return CalcStates.MOUNTING_TYPE.value
-                else:
-                    await update.effective_message.reply_text(
-                        "Ошибка сервера при получении типов монтажа."
-                    )
-                    return CalcStates.END.value
-    except aiohttp.ClientError as e:
-        logger.error(f"Network error (GET /mountings): {e}")
-        await update.effective_message.reply_text("Проблема с сетью. Завершаем.")
-        return CalcStates.END.value
+    # пока пользователь выбирает, вероятные варианты уже считаются на бэкенде
+    current_tenant().speculation.start(update.effective_user.id, context.user_data, [m["id"] for m in mountings])
+    return CalcStates.MOUNTING_TYPE.value
 
 
+@traced
 async def handle_mounting_type(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
@@ -861,98 +630,168 @@ async def handle_mounting_type(update: Update, context: ContextTypes.DEFAULT_TYP
 
     await query.message.reply_text(f"Вы выбрали монтаж: {mounting_name}.\nТеперь формируем итог...")
 
+    # расчёт с этим монтажом уже отправлен заранее — final_calculation не отправит его повторно
+    report_id = await current_tenant().speculation.promote(update.effective_user.id, context.user_data)
+    if report_id is not None:
+        context.user_data["report_id"] = report_id
+
     # Переходим к финальному шагу
     return await final_calculation(update, context)
 
 
+@traced
 async def final_calculation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    fence_type_id = context.user_data.get("fence_type_id")
-    fence_spec_id = context.user_data.get("fence_spec_id")
-    fence_variant_id = context.user_data.get("fence_variant_id")
-    fence_length = context.user_data.get("fence_length")
-    fence_accessories = context.user_data.get("fence_accessories_chosen", [])
-
-    need_gates = context.user_data.get("need_gates")
-    gate_type_id = context.user_data.get("gate_type_id")
-    gate_spec_id = context.user_data.get("gate_spec_id")
-    gate_variant_id = context.user_data.get("gate_variant_id")
-    gate_automation = context.user_data.get("gate_automation", False)
-    gate_accessories = context.user_data.get("gate_accessories_chosen", [])
-
-    mounting_id = context.user_data.get("mounting_id")
-
-    report_id = str(update.effective_user.id) + '_' + str(datetime.datetime.now().strftime("%Y-%m-%d_%H:%M:%S"))
-
+    tenant = current_tenant()
     user_id = update.effective_user.id
+    report_id = context.user_data.get("report_id") or new_report_id(user_id)
+    post_data = build_calculation(context.user_data, report_id, user_id)
 
-    post_data = {
-        "fence": {
-            "typeId": fence_type_id,
-            "specId": fence_spec_id,
-            "variantId": fence_variant_id,
-            "length": fence_length,
-            "accessories": fence_accessories,
-        },
-        "gates": {
-            "needGates": need_gates,
-            "specId": gate_spec_id,
-            "typeId": gate_type_id,
-            "variantId": gate_variant_id,
-            "automation": gate_automation,
-            "accessories": gate_accessories,
-        },
-        "mountingId": mounting_id,
-        "report_id": report_id,
-        "user_id": user_id,
-    }
-
-    logger.info(post_data)
-
+    submitted = False
     try:
-        url = f"{config.BASE_API_URL}calculations"
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=post_data) as response:
-                if response.status == 200:
-                    await update.effective_message.reply_text(
-                        "Спасибо! Ваш отчет формируется. Это займет несколько минут."
-                    )
-                    await asyncio.create_task(check_report_status(report_id, update, context))
-                else:
-                    await update.effective_message.reply_text(
-                        f"Ошибка сервера при сохранении. Попробуйте позже."
-                    )
+        submitted = await submit_calculation(post_data, tenant.backend)
+        if submitted:
+            tenant.metrics.calculations += 1
+            tenant.history.record(report_id, user_id, update.effective_chat.id, draft_from(context.user_data))
+            await update.effective_message.reply_text(
+                "Спасибо! Ваш отчет формируется. Это займет несколько минут."
+            )
+        else:
+            await update.effective_message.reply_text(
+                f"Ошибка сервера при сохранении. Попробуйте позже."
+            )
     except aiohttp.ClientError as e:
         logger.error(f"Network error final_calculation: {e}")
         await update.effective_message.reply_text("Сетевая ошибка при сохранении. Попробуйте позже.")
 
     context.user_data.clear()
+
+    # опрос статуса и отправка PDF идут в фоне, диалог завершается сразу
+    if submitted and not tenant.report_delivery.deliver(context.bot, report_id, update.effective_chat.id):
+        await update.effective_message.reply_text(
+            "Сейчас очень много отчётов в работе — пришлём ваш чуть позже."
+        )
     return ConversationHandler.END
 
 
-async def check_report_status(report_id: str, update: Update, context: ContextTypes.DEFAULT_TYPE):
-    try:
-        for _ in range(30):
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{config.BASE_API_URL}reports/{report_id}/status") as response:
-                    if response.status == 200:
-                        status_data = await response.json()
-                        if status_data["status"] == "success":
-                            async with session.get(
-                                    f"{config.BASE_API_URL}calculations/{report_id}/download-report"
-                            ) as pdf_response:
-                                if pdf_response.status == 200:
-                                    pdf_file = await pdf_response.read()
-                                    await update.effective_message.reply_document(
-                                        document=pdf_file,
-                                        filename="report.pdf",
-                                        caption="Ваш отчет готов!"
-                                    )
-                                    return
-                    elif response.status != 202:
-                        logger.warning(f"Unexpected status code {response.status}")
-            await asyncio.sleep(10)
-    except aiohttp.ClientError as e:
-        logger.error(f"Network error in check_report_status: {e}")
-    except Exception as e:
-        logger.error(f"Unexpected error in check_report_status: {e}")
+fence_accessories = AccessoryPipeline(
+    kind="fence",
+    list_state=CalcStates.FENCE_ACCESSORIES,
+    spec_state=CalcStates.FENCE_ACCESSORY_SPECS,
+    quantity_state=CalcStates.FENCE_ACCESSORIES_QUANTITY,
+    texts=AccessoryTexts(
+        prompt="Выберите аксессуар для вашего забора (каждый раз после выбора введите количество), "
+               "или нажмите «Готово»:",
+        server_error="Ошибка сервера при получении списка аксессуаров. Переходим дальше.",
+        network_error="Проблема с сетью. Пропускаем выбор аксессуаров.",
+        empty="Аксессуаров для забора не найдено. Переходим к следующему шагу.",
+        summary_title="Вы выбрали аксессуары:",
+        nothing_chosen="Вы не выбрали ни одного аксессуара.",
+    ),
+    next_step=ask_need_gates,
+)
 
+gate_accessories = AccessoryPipeline(
+    kind="gate",
+    list_state=CalcStates.GATE_ACCESSORIES,
+    spec_state=CalcStates.GATE_ACCESSORY_SPECS,
+    quantity_state=CalcStates.GATE_ACCESSORIES_QUANTITY,
+    texts=AccessoryTexts(
+        prompt="Выберите аксессуар к воротам (после выбора характеристики/количества можно повторять) "
+               "или нажмите «Готово»:",
+        server_error="Ошибка сервера при получении списка аксессуаров для ворот. Пропустим аксессуары.",
+        network_error="Проблема с сетью. Пропустим аксессуары.",
+        empty="Аксессуаров для ворот не найдено. Переходим к следующему шагу.",
+        summary_title="Вы выбрали аксессуары к воротам:",
+        nothing_chosen="Вы не выбрали ни одного аксессуара для ворот.",
+    ),
+    next_step=ask_mounting_type,
+)
+
+ask_fence_accessories = fence_accessories.ask
+ask_gate_accessories = gate_accessories.ask
+
+
+def _fence_accessories(user_data: dict):
+    return current_tenant().accessory_specs.get("fence")
+
+
+def _gate_accessories(user_data: dict):
+    return current_tenant().accessory_specs.get("gate")
+
+
+def _gate_types(user_data: dict):
+    return current_tenant().catalog.gate_types()
+
+
+def _mountings(user_data: dict):
+    return current_tenant().catalog.mountings()
+
+
+calculation_flow = Flow(
+    [
+        Step(CalcStates.FENCE_TYPE, on_callback=choose_fence_type, pattern=CHOICE_ID),
+        Step(CalcStates.FENCE_POPULAR_SPECS, on_callback=ask_fence_popular_specs),
+        Step(
+            CalcStates.FENCE_VARIANTS,
+            on_callback=choose_fence_variant,
+            pattern=callback_registry.carries(FenceSpecChoice),
+        ),
+        Step(
+            CalcStates.FENCE_LENGTH,
+            on_callback=save_fence_variant,
+            pattern=r"^(\d+|main_menu)$",
+            on_text=ask_fence_length,
+            paginated=True,
+            prefetch=(_fence_accessories,),
+        ),
+        Step(
+            CalcStates.FENCE_ACCESSORIES,
+            on_callback=fence_accessories.handle_choice,
+            pattern=ACCESSORY_CHOICE,
+            paginated=True,
+            prefetch=(_gate_types, _mountings),
+        ),
+        Step(
+            CalcStates.FENCE_ACCESSORY_SPECS,
+            on_callback=fence_accessories.handle_spec_choice,
+            pattern=callback_registry.carries(AccessorySpecChoice),
+        ),
+        Step(CalcStates.FENCE_ACCESSORIES_QUANTITY, on_text=fence_accessories.handle_quantity),
+        Step(CalcStates.NEED_GATES, on_callback=handle_need_gates, pattern=r"^gates_(yes|no)$"),
+        Step(CalcStates.GATE_TYPE, on_callback=handle_gate_type, pattern=CHOICE_ID),
+        Step(
+            CalcStates.GATE_POPULAR_SPECS,
+            on_callback=handle_gate_size_choice,
+            pattern=callback_registry.carries(GateSpecChoice),
+        ),
+        Step(
+            CalcStates.GATE_VARIANTS,
+            on_callback=handle_chosen_gate_variant,
+            pattern=r"^(\d+|no_gate_variant)$",
+            paginated=True,
+            prefetch=(_gate_accessories,),
+        ),
+        Step(
+            CalcStates.GATE_AUTOMATION,
+            on_callback=handle_gate_automation_choice,
+            pattern=r"^automation_(yes|no)$",
+        ),
+        Step(
+            CalcStates.GATE_ACCESSORIES,
+            on_callback=gate_accessories.handle_choice,
+            pattern=ACCESSORY_CHOICE,
+            paginated=True,
+        ),
+        Step(
+            CalcStates.GATE_ACCESSORY_SPECS,
+            on_callback=gate_accessories.handle_spec_choice,
+            pattern=callback_registry.carries(AccessorySpecChoice),
+        ),
+        Step(CalcStates.GATE_ACCESSORIES_QUANTITY, on_text=gate_accessories.handle_quantity),
+        Step(CalcStates.MOUNTING_TYPE, on_callback=handle_mounting_type, pattern=CHOICE_ID),
+    ],
+    page_handler=turn_page,
+    stale_handler=reply_expired_keyboard,
+    sessions=lambda: current_tenant().admission,
+    dialogs=lambda: current_tenant().metrics.steps,
+)
@@ -3,12 +3,13 @@ import logging
 import aiohttp
 from telegram import Update
 from telegram.ext import CallbackContext
-from config import config
+from services import current_tenant, traced
 from .menu import show_main_menu
 
 logger = logging.getLogger(__name__)
 
 
+@traced
 async def handle_contact(update: Update, context: CallbackContext):
     contact = update.message.contact
     user_name = update.message.from_user.first_name
@@ -22,17 +23,17 @@ async def handle_contact(update: Update, context: CallbackContext):
     }
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(f"{config.BASE_API_URL}clients", json=post_data) as response:
-                if response.status == 200:
-                    await update.message.reply_text(f"Спасибо! Ваш номер телефона {phone_number} был сохранён.")
-                    await show_main_menu(update, context)
-                elif response.status == 400:
-                    logger.error(f"HTTP error occurred. {response.json()}")
-                    await update.message.reply_text("Произошла ошибка при сохранении вашего номера. Попробуйте позже.")
-                else:
-                    logger.error(f"Unexpected error occurred.")
-                    await update.message.reply_text("Произошла непредвиденная ошибка, попробуйте позже.")
+        async with current_tenant().backend.request("POST", "clients", json=post_data) as response:
+            if response.status == 200:
+                current_tenant().users.register(user_id, update.effective_chat.id)
+                await update.message.reply_text(f"Спасибо! Ваш номер телефона {phone_number} был сохранён.")
+                await show_main_menu(update, context)
+            elif response.status == 400:
+                logger.error(f"HTTP error occurred. {await response.text()}")
+                await update.message.reply_text("Произошла ошибка при сохранении вашего номера. Попробуйте позже.")
+            else:
+                logger.error(f"Unexpected error occurred.")
+                await update.message.reply_text("Произошла непредвиденная ошибка, попробуйте позже.")
     except aiohttp.ClientError as e:
         logger.error(f"Notwork error occurred: {e}")
         await update.message.reply_text("Проблема с сетью или сервером. Попробуйте позже.")
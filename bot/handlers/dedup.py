@@ -0,0 +1,38 @@
+import logging
+from typing import Optional
+
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, CallbackContext
+
+from services import press_guard
+
+logger = logging.getLogger(__name__)
+
+# группы хэндлеров: проверка до всех остальных, отметка о завершении — после
+PRESS_GUARD_GROUP = -1
+PRESS_DONE_GROUP = 100
+
+
+def _press_key(update: Update, context: CallbackContext) -> Optional[tuple]:
+    query = update.callback_query
+    if query is None or query.message is None or update.effective_user is None:
+        return None
+    # id бота в ключе: в хосте несколько ботов, а message_id у каждого свои
+    return update.effective_user.id, query.message.chat.id, query.message.message_id, query.data, context.bot.id
+
+
+async def suppress_duplicate_press(update: Update, context: CallbackContext):
+    key = _press_key(update, context)
+    if key is None:
+        return
+
+    if not press_guard.begin(key):
+        logger.info(f"Duplicate press suppressed for user {key[0]}: {key[3]}")
+        await update.callback_query.answer("Уже обрабатываем, секунду…")
+        raise ApplicationHandlerStop
+
+
+async def mark_press_done(update: Update, context: CallbackContext):
+    key = _press_key(update, context)
+    if key is not None:
+        press_guard.end(key)
@@ -2,8 +2,12 @@ import logging
 from telegram import Update
 from telegram.ext import CallbackContext
 
+from services import current_tenant
+
 logger = logging.getLogger(__name__)
 
 
 async def error_handler(update: Update, context: CallbackContext):
-    logger.error(f"Произошла ошибка при обработке обновления: {context.error}")
+    current_tenant().metrics.errors += 1
+    # exc_info даёт отпечаток по типу и месту исключения, так что шторм одной ошибки схлопывается
+    logger.error(f"Произошла ошибка при обработке обновления: {context.error}", exc_info=context.error)
@@ -0,0 +1,137 @@
+import asyncio
+import functools
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, Union
+
+from telegram.ext import BaseHandler, CallbackQueryHandler, ConversationHandler, MessageHandler, filters
+
+from services import callback_registry, is_page_turn, observe_step, AdmissionController, DialogSteps
+from .calculation_states import CalcStates
+
+logger = logging.getLogger(__name__)
+
+StepCallback = Callable[..., Awaitable[Optional[int]]]
+Prefetch = Callable[[dict], Awaitable[Any]]
+CallbackPattern = Union[str, Callable[[object], bool]]
+
+
+@dataclass(frozen=True, slots=True)
+class Step:
+    """
+    Один шаг диалога расчёта: на какие апдейты он отвечает и что можно
+    подгрузить в кэш каталога, пока пользователь думает над следующим шагом.
+    pattern отбирает для on_callback только кнопки этого шага: чужие (история,
+    прайс-лист) проходят мимо диалога к своим хэндлерам.
+    """
+    state: CalcStates
+    on_callback: Optional[StepCallback] = None
+    pattern: Optional[CallbackPattern] = None
+    on_text: Optional[StepCallback] = None
+    paginated: bool = False
+    prefetch: tuple[Prefetch, ...] = ()
+
+
+class Flow:
+    """
+    Декларативное описание диалога, которое при старте компилируется в таблицу
+    состояние -> хэндлеры для ConversationHandler. Каждый шаг получает одинаковые
+    хуки: замер времени (services.step_latency), фоновую подгрузку каталога и,
+    если задан sessions, продление или освобождение места в контроле допуска, а если
+    задан dialogs — учёт текущего шага пользователя для /stats. Оба вызываются на каждом
+    шаге: у каждого бота в хосте свои.
+    """
+
+    def __init__(
+            self,
+            steps: list[Step],
+            page_handler: StepCallback,
+            stale_handler: Optional[StepCallback] = None,
+            sessions: Optional[Callable[[], AdmissionController]] = None,
+            dialogs: Optional[Callable[[], DialogSteps]] = None,
+    ):
+        self.steps = steps
+        self._page_handler = page_handler
+        self._stale_handler = stale_handler
+        self._sessions = sessions
+        self._dialogs = dialogs
+        self._prefetching: set[asyncio.Task] = set()
+        self.table: dict[int, list[BaseHandler]] = {}
+
+    def compile(self) -> dict[int, list[BaseHandler]]:
+        table: dict[int, list[BaseHandler]] = {}
+        for step in self.steps:
+            if step.state.value in table:
+                raise ValueError(f"Step {step.state.name} is defined twice")
+
+            handlers: list[BaseHandler] = []
+            if self._stale_handler is not None and step.on_callback is not None:
+                # кнопка с вытесненным токеном иначе дошла бы до on_callback и сломала разбор выбора
+                handlers.append(CallbackQueryHandler(
+                    self._hooked(step, self._stale_handler), pattern=callback_registry.is_expired
+                ))
+            if step.paginated:
+                handlers.append(CallbackQueryHandler(self._page_handler, pattern=is_page_turn))
+            if step.on_callback is not None:
+                handlers.append(CallbackQueryHandler(self._hooked(step, step.on_callback), pattern=step.pattern))
+            if step.on_text is not None:
+                handlers.append(MessageHandler(filters.TEXT & ~filters.COMMAND, self._hooked(step, step.on_text)))
+            if not handlers:
+                raise ValueError(f"Step {step.state.name} accepts no updates")
+            table[step.state.value] = handlers
+
+        self.table = table
+        return table
+
+    def track(self, user_id: int, state: Optional[int]) -> None:
+        """Запоминает шаг пользователя; вызывают и вход в диалог, и выход из него мимо шагов."""
+        if self._dialogs is None or state is None:
+            return
+        if state == ConversationHandler.END:
+            self._dialogs().leave(user_id)
+            return
+        try:
+            name = CalcStates(state).name
+        except ValueError:
+            name = str(state)
+        self._dialogs().enter(user_id, name)
+
+    def _hooked(self, step: Step, callback: StepCallback) -> StepCallback:
+        name = step.state.name.lower()
+
+        @functools.wraps(callback)
+        async def run(update, context):
+            started = time.perf_counter()
+            state = None
+            try:
+                state = await callback(update, context)
+                return state
+            finally:
+                observe_step(name, time.perf_counter() - started)
+                if self._sessions is not None and update.effective_user is not None:
+                    sessions = self._sessions()
+                    if state == ConversationHandler.END:
+                        sessions.release(update.effective_user.id)
+                    else:
+                        sessions.touch(update.effective_user.id)
+                if self._dialogs is not None and update.effective_user is not None:
+                    self.track(update.effective_user.id, state)
+                if step.prefetch and context.user_data is not None:
+                    self._start_prefetch(step, context.user_data)
+
+        return run
+
+    def _start_prefetch(self, step: Step, user_data: dict) -> None:
+        for prefetch in step.prefetch:
+            task = asyncio.create_task(self._prefetch(step, prefetch, user_data))
+            self._prefetching.add(task)
+            task.add_done_callback(self._prefetching.discard)
+
+    @staticmethod
+    async def _prefetch(step: Step, prefetch: Prefetch, user_data: dict) -> None:
+        # подгрузка — только прогрев кэша, ошибка здесь не должна мешать диалогу
+        try:
+            await prefetch(user_data)
+        except Exception as e:
+            logger.debug(f"Prefetch after {step.state.name} failed: {e}")
@@ -0,0 +1,199 @@
+import logging
+import time
+
+import aiohttp
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.error import BadRequest
+from telegram.ext import CallbackContext, ConversationHandler
+
+from services import (
+    BackendStatusError,
+    HistoryAction,
+    HistoryRecord,
+    build_calculation,
+    callback_registry,
+    current_tenant,
+    new_report_id,
+    submit_calculation,
+    traced,
+    traced_entry,
+)
+
+logger = logging.getLogger(__name__)
+
+# состояние ConversationHandler правки из истории: ждём новую длину забора;
+# вне значений CalcStates, чтобы /stats не принял правку за шаг расчёта
+HISTORY_LENGTH = 100
+
+
+def _button(text: str, record: HistoryRecord, action: str, value: int | None = None) -> InlineKeyboardButton:
+    return InlineKeyboardButton(text, callback_data=callback_registry.issue(HistoryAction(record.id, action, value)))
+
+
+def _when(record: HistoryRecord) -> str:
+    return time.strftime("%d.%m %H:%M", time.localtime(record.created_at))
+
+
+@traced_entry
+async def show_history(update: Update, context: CallbackContext):
+    records = current_tenant().history.recent(update.effective_user.id)
+    if not records:
+        await update.effective_message.reply_text("Расчётов пока нет. Начать: /calc или «Расчет».")
+        return
+
+    markup = InlineKeyboardMarkup([
+        [_button(f"{_when(record)} · {record.summary}"[:60], record, "open")] for record in records
+    ])
+    await update.effective_message.reply_text("Ваши последние расчёты:", reply_markup=markup)
+
+
+@traced
+async def handle_history_callback(update: Update, context: CallbackContext) -> int:
+    query = update.callback_query
+    await query.answer()
+
+    action = callback_registry.resolve(query.data)
+    record = None
+    if isinstance(action, HistoryAction):
+        record = current_tenant().history.get(action.calc_id, update.effective_user.id)
+    if record is None:
+        await query.message.reply_text("Список устарел, открываю заново.")
+        await show_history(update, context)
+        return ConversationHandler.END
+
+    match action.action:
+        case "open":
+            await _show_record(update, record)
+        case "send":
+            await _send_report(update, context, record)
+        case "repeat":
+            await _resubmit(update, context, record, dict(record.draft))
+        case "length":
+            context.user_data["history_edit"] = record.id
+            await query.message.reply_text(
+                f"Сейчас длина {record.draft.get('fence_length', 0):g} м. "
+                "Введите новую длину забора в метрах (или /cancel):"
+            )
+            return HISTORY_LENGTH
+        case "mounting" if action.value is None:
+            await _ask_mounting(update, record)
+        case "mounting":
+            draft = dict(record.draft, mounting_id=action.value)
+            draft.pop("mounting_name", None)
+            try:
+                # список монтажа только что показан — запись каталога в кэше
+                entry = await current_tenant().catalog.mountings()
+                names = {m["id"]: m["name"] for m in entry.items}
+                if action.value in names:
+                    draft["mounting_name"] = names[action.value]
+            except (aiohttp.ClientError, BackendStatusError) as e:
+                logger.warning(f"Mounting names are unavailable: {e}")
+            await _resubmit(update, context, record, draft)
+        case "automation":
+            draft = dict(record.draft, gate_automation=not record.draft.get("gate_automation", False))
+            await _resubmit(update, context, record, draft)
+    return ConversationHandler.END
+
+
+@traced
+async def save_history_length(update: Update, context: CallbackContext) -> int:
+    calc_id = context.user_data.pop("history_edit", None)
+    record = current_tenant().history.get(calc_id, update.effective_user.id) if calc_id is not None else None
+    if record is None:
+        await update.message.reply_text("Правка устарела. Откройте расчёт заново: «Мои расчёты».")
+        return ConversationHandler.END
+
+    try:
+        length = float(update.message.text.replace(",", "."))
+        if length <= 0:
+            raise ValueError("Length must be positive")
+    except ValueError:
+        context.user_data["history_edit"] = calc_id
+        await update.message.reply_text("Пожалуйста, введите положительное число, например 25.5")
+        return HISTORY_LENGTH
+
+    await _resubmit(update, context, record, dict(record.draft, fence_length=length))
+    return ConversationHandler.END
+
+
+async def cancel_history_edit(update: Update, context: CallbackContext) -> int:
+    context.user_data.pop("history_edit", None)
+    await update.message.reply_text("Правка отменена.")
+    return ConversationHandler.END
+
+
+async def _show_record(update: Update, record: HistoryRecord) -> None:
+    rows = [
+        [_button("Отправить отчёт", record, "send"), _button("Пересчитать", record, "repeat")],
+        [_button("Изменить длину", record, "length"), _button("Изменить монтаж", record, "mounting")],
+    ]
+    if record.draft.get("gate_variant_id"):
+        automation = "убрать" if record.draft.get("gate_automation") else "добавить"
+        rows.append([_button(f"Автоматика ворот: {automation}", record, "automation")])
+    await update.effective_message.reply_text(
+        f"Расчёт от {_when(record)}\n{record.summary}", reply_markup=InlineKeyboardMarkup(rows)
+    )
+
+
+async def _send_report(update: Update, context: CallbackContext, record: HistoryRecord) -> None:
+    tenant = current_tenant()
+    chat_id = update.effective_chat.id
+    if record.file_id:
+        try:
+            await context.bot.send_document(chat_id, document=record.file_id, caption=record.summary)
+            tenant.history.resent += 1
+            return
+        except BadRequest as e:
+            # file_id другого бота или устаревший — отправим заново с бэкенда
+            logger.warning(f"Cannot resend report {record.report_id} by file_id: {e}")
+
+    if record.report_id in tenant.pending_reports:
+        await update.effective_message.reply_text("Этот отчёт ещё формируется — пришлём, как только будет готов.")
+        return
+    try:
+        sent = await tenant.report_delivery.send_report(context.bot, record.report_id, chat_id, record.summary)
+    except aiohttp.ClientError as e:
+        logger.error(f"Network error while resending report {record.report_id}: {e}")
+        sent = False
+    if not sent:
+        await update.effective_message.reply_text("Отчёт сейчас недоступен. Можно пересчитать его заново.")
+
+
+async def _ask_mounting(update: Update, record: HistoryRecord) -> None:
+    try:
+        entry = await current_tenant().catalog.mountings()
+    except (aiohttp.ClientError, BackendStatusError) as e:
+        logger.error(f"Mountings are unavailable: {e}")
+        await update.effective_message.reply_text("Список монтажа сейчас недоступен. Попробуйте позже.")
+        return
+
+    markup = InlineKeyboardMarkup([
+        [_button(m["name"], record, "mounting", m["id"])] for m in entry.items
+    ])
+    await update.effective_message.reply_text("Выберите тип монтажа:", reply_markup=markup)
+
+
+async def _resubmit(update: Update, context: CallbackContext, record: HistoryRecord, draft: dict) -> None:
+    """Копия черновика уходит новым расчётом, минуя шаги диалога; исходный остаётся в истории."""
+    tenant = current_tenant()
+    user_id = update.effective_user.id
+    report_id = new_report_id(user_id)
+    try:
+        submitted = await submit_calculation(build_calculation(draft, report_id, user_id), tenant.backend)
+    except aiohttp.ClientError as e:
+        logger.error(f"Network error while resubmitting calculation {record.report_id}: {e}")
+        await update.effective_message.reply_text("Сетевая ошибка при сохранении. Попробуйте позже.")
+        return
+    if not submitted:
+        await update.effective_message.reply_text(
+            "Сервер не принял расчёт — возможно, каких-то позиций уже нет в каталоге. "
+            "Пройдите расчёт заново: /calc"
+        )
+        return
+
+    tenant.metrics.calculations += 1
+    tenant.history.resubmitted += 1
+    tenant.history.record(report_id, user_id, update.effective_chat.id, draft, parent_id=record.id)
+    await update.effective_message.reply_text("Расчёт отправлен. Отчёт придёт через несколько минут.")
+    if not tenant.report_delivery.deliver(context.bot, report_id, update.effective_chat.id):
+        await update.effective_message.reply_text("Сейчас очень много отчётов в работе — пришлём ваш чуть позже.")
@@ -0,0 +1,80 @@
+import logging
+from typing import Optional
+
+import aiohttp
+from telegram import (
+    Update,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+)
+from telegram.ext import CallbackContext
+from telegram.helpers import create_deep_linked_url
+
+from services import current_tenant, BackendStatusError, SearchItem, search_payload, parse_search_payload
+
+logger = logging.getLogger(__name__)
+
+KIND_LABELS = {
+    "fence": "Забор",
+    "gate": "Ворота",
+    "fence_accessory": "Аксессуар для забора",
+    "gate_accessory": "Аксессуар для ворот",
+}
+
+
+# (вид, id) позиции из поиска, которую подхватит её шаг расчёта: ворота и аксессуары выбираются после забора
+SEARCH_PICK_KEY = "search_pick"
+
+
+def find_search_pick(args: Optional[list[str]]) -> Optional[SearchItem]:
+    """Позиция из ссылки /start calc-<вид>-<id> под результатом поиска; None — расчёт начат не из поиска."""
+    picked = parse_search_payload(args[0]) if args else None
+    if picked is None:
+        return None
+    return current_tenant().catalog_search.index.find(*picked)
+
+
+def describe_search_item(item: SearchItem) -> str:
+    return f"{KIND_LABELS.get(item.kind, item.kind)}: {item.name}"
+
+
+def take_search_pick(user_data: dict, kind: str) -> Optional[int]:
+    """id отложенной позиции из поиска, если она этого вида; позиция используется один раз."""
+    picked = user_data.get(SEARCH_PICK_KEY)
+    if picked is None or picked[0] != kind:
+        return None
+    del user_data[SEARCH_PICK_KEY]
+    return picked[1]
+
+
+async def handle_inline_query(update: Update, context: CallbackContext):
+    query = update.inline_query
+    text = query.query.strip()
+
+    if not text:
+        await query.answer([], cache_time=300)
+        return
+
+    catalog_search = current_tenant().catalog_search
+    try:
+        index = await catalog_search.ensure_fresh()
+    except (aiohttp.ClientError, BackendStatusError) as e:
+        logger.error(f"Catalog refresh failed for inline search: {e}")
+        index = catalog_search.index
+
+    results = []
+    for item in index.search(text, limit=20):
+        label = KIND_LABELS.get(item.kind, item.kind)
+        # ссылка открывает личный чат с ботом и начинает расчёт с этой позицией
+        link = create_deep_linked_url(context.bot.username, search_payload(item))
+        results.append(InlineQueryResultArticle(
+            id=f"{item.kind}_{item.id}",
+            title=item.name,
+            description=label,
+            input_message_content=InputTextMessageContent(f"{label}: {item.name}"),
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Рассчитать", url=link)]]),
+        ))
+
+    await query.answer(results, cache_time=300)
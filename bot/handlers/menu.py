@@ -1,17 +1,32 @@
 # bot/handlers/menu.py
 import logging
+
+import aiohttp
 from .calculation_conversation import start_calculation
+from .history import show_history
 from telegram import Update, KeyboardButton, ReplyKeyboardMarkup
+from telegram.constants import ParseMode
 from telegram.ext import CallbackContext
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from services import (
+    current_tenant,
+    PriceListPage,
+    PRICE_FILE_CALLBACK,
+    PRICE_FILE_NAME,
+    BackendStatusError,
+    callback_registry,
+)
 
 logger = logging.getLogger(__name__)
 
 
 async def show_main_menu(update: Update, context: CallbackContext):
+    # ждущий в очереди на расчёт ушёл в меню — место в очереди ему больше не нужно
+    current_tenant().admission.leave_queue(update.effective_user.id)
     keyboard = [
         [KeyboardButton('Расчет'), KeyboardButton('О компании')],
-        [KeyboardButton('Заявка'), KeyboardButton('Цены')]
+        [KeyboardButton('Заявка'), KeyboardButton('Цены')],
+        [KeyboardButton('Мои расчёты')],
     ]
     reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
 
@@ -41,6 +56,8 @@ async def handle_main_menu_selection(update: Update, context: CallbackContext):
             await request_contact(update, context)
         case "Цены":
             await get_prices(update, context)
+        case "Мои расчёты":
+            await show_history(update, context)
         case _:
             if not update.callback_query:
                 await message.reply_text("Вы выбрали неизвестную опцию.")
@@ -57,4 +74,58 @@ async def request_contact(update: Update, context: CallbackContext):
 
 
 async def get_prices(update: Update, context: CallbackContext):
-    await update.message.reply_text("Get prices info...")
+    try:
+        rendered = await current_tenant().price_list.current()
+    except (aiohttp.ClientError, BackendStatusError) as e:
+        logger.error(f"Price list is unavailable: {e}")
+        await update.effective_message.reply_text("Прайс-лист временно недоступен. Попробуйте позже.")
+        return
+
+    await update.effective_message.reply_text(
+        rendered.pages[0],
+        reply_markup=rendered.markups[0],
+        parse_mode=ParseMode.HTML,
+    )
+
+
+async def handle_price_list_callback(update: Update, context: CallbackContext):
+    query = update.callback_query
+    await query.answer()
+
+    if query.data == PRICE_FILE_CALLBACK:
+        await send_price_list_file(update, context)
+        return
+
+    turn = callback_registry.resolve(query.data)
+    if not isinstance(turn, PriceListPage):
+        return
+
+    page = current_tenant().price_list.page(turn)
+    if page is None:
+        await query.message.reply_text("Прайс-лист обновился, откройте его заново.")
+        await get_prices(update, context)
+        return
+
+    text, markup = page
+    await query.message.edit_text(text, reply_markup=markup, parse_mode=ParseMode.HTML)
+
+
+async def send_price_list_file(update: Update, context: CallbackContext):
+    try:
+        rendered = await current_tenant().price_list.current()
+    except (aiohttp.ClientError, BackendStatusError) as e:
+        logger.error(f"Price list is unavailable: {e}")
+        await update.effective_message.reply_text("Прайс-лист временно недоступен. Попробуйте позже.")
+        return
+
+    file_id = rendered.file_ids.get(context.bot.id)
+    if file_id:
+        await update.effective_message.reply_document(document=file_id)
+        return
+
+    message = await update.effective_message.reply_document(
+        document=rendered.document,
+        filename=PRICE_FILE_NAME,
+        caption="Актуальный прайс-лист",
+    )
+    current_tenant().price_list.remember_file_id(rendered.version, context.bot.id, message.document.file_id)
@@ -0,0 +1,31 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from telegram import Update
+from telegram.ext import CallbackContext
+
+from services import activate_tenant
+
+# раньше проверки повторных нажатий и позже отметки о завершении
+TENANT_ENTER_GROUP = -2
+TENANT_EXIT_GROUP = 101
+
+_update_started: ContextVar[Optional[float]] = ContextVar("update_started", default=None)
+
+
+async def enter_tenant(update: Update, context: CallbackContext):
+    tenant = context.bot_data.get("tenant")
+    if tenant is None:
+        return
+    activate_tenant(tenant)
+    tenant.metrics.updates += 1
+    _update_started.set(time.perf_counter())
+
+
+async def leave_tenant(update: Update, context: CallbackContext):
+    tenant = context.bot_data.get("tenant")
+    started = _update_started.get()
+    if tenant is not None and started is not None:
+        tenant.metrics.latency.observe(time.perf_counter() - started)
+        _update_started.set(None)
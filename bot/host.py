@@ -0,0 +1,103 @@
+"""
+Несколько ботов (дилеры, регионы) в одном процессе: одно приложение на бота
+на общем event loop, общий кэш каталога и пул соединений для ботов на одном бэкенде.
+
+    python bot/host.py tenants.json
+
+tenants.json: [{"name": "msk", "token": "...", "backend_url": "https://api.example/"}, ...]
+Без backend_url бот работает с BASE_API_URL. Путь можно задать и через TENANTS_FILE.
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import signal
+from pathlib import Path
+
+from telegram.error import TelegramError
+from telegram.ext import Application
+
+from config import config
+from logging_config import setup_logging
+from main import build_application, close_process, finish_startup, start_tenant, stop_tenant
+from services import job_runner, load_tenants, Tenant
+
+logger = logging.getLogger(__name__)
+
+
+async def start_application(tenant: Tenant) -> Application:
+    application = build_application(tenant)
+    await application.initialize()
+    try:
+        await start_tenant(application)
+        await application.start()
+        await application.updater.start_polling()
+    except Exception:
+        await stop_tenant(application)
+        await application.shutdown()
+        raise
+    return application
+
+
+async def stop_application(application: Application) -> None:
+    try:
+        if application.updater.running:
+            await application.updater.stop()
+        if application.running:
+            await application.stop()
+        await stop_tenant(application)
+    finally:
+        await application.shutdown()
+
+
+async def run_host(tenants: list[Tenant]) -> None:
+    applications = []
+    try:
+        job_runner.start()
+        for tenant in tenants:
+            # бот с отозванным токеном не должен мешать остальным
+            try:
+                applications.append(await start_application(tenant))
+                logger.info(f"Tenant {tenant.name} started")
+            except (TelegramError, OSError) as e:
+                logger.error(f"Tenant {tenant.name} failed to start: {e}")
+    finally:
+        finish_startup()
+
+    if applications:
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stopping.set)
+        await stopping.wait()
+        logger.info(f"Stopping {len(applications)} tenants...")
+
+    for application in applications:
+        try:
+            await stop_application(application)
+        except Exception as e:
+            logger.error(f"Failed to stop tenant {application.bot_data['tenant'].name}: {e}")
+    await job_runner.shutdown()
+    await close_process(tenants)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("tenants", nargs="?", default=config.TENANTS_FILE)
+    args = parser.parse_args()
+    if not args.tenants:
+        parser.error("tenants file is required (argument or TENANTS_FILE)")
+
+    setup_logging(logging.INFO)
+    # сборщик мусора включается после старта всех ботов (main.finish_startup)
+    gc.disable()
+    try:
+        tenants = load_tenants(Path(args.tenants))
+        logger.info(f"Starting host with {len(tenants)} tenants...")
+        asyncio.run(run_host(tenants))
+    finally:
+        gc.enable()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+STORM_WINDOW_SECONDS = 60.0
+STORM_BURST = 5
+MAX_FINGERPRINTS = 1000
+
+# числа, id, адреса и строки в кавычках — то, чем отличаются сообщения об одной и той же ошибке
+_VOLATILE_RE = re.compile(r"0x[0-9a-f]+|\d+(?:[.:_/-]\d+)*|'[^']*'|\"[^\"]*\"", re.IGNORECASE)
+
+
+@dataclass(slots=True)
+class _Fingerprint:
+    key: str
+    sample: str
+    window_start: float
+    seen: int = 0
+    suppressed: int = 0
+
+
+class LogStormFilter(logging.Filter):
+    """
+    Пропускает первые `burst` записей WARNING+ с одинаковым отпечатком за окно,
+    остальные считает и по окончании окна пишет одну сводку
+    «N occurrences of X in the last 60s». Отпечатков хранится не больше max_fingerprints.
+
+    Фильтр вешается на хэндлеры (а не на логгер), поэтому решение по записи
+    кэшируется на ней самой — иначе файл и консоль посчитали бы её дважды.
+    """
+
+    def __init__(
+            self,
+            window: float = STORM_WINDOW_SECONDS,
+            burst: int = STORM_BURST,
+            max_fingerprints: int = MAX_FINGERPRINTS,
+            level: int = logging.WARNING,
+            clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.max_fingerprints = max_fingerprints
+        self.level = level
+        self._clock = clock
+        self._fingerprints: OrderedDict[str, _Fingerprint] = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = clock()
+        self._summary_logger = logging.getLogger("log_storm")
+        self.suppressed_total = 0
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        decision = getattr(record, "_storm_allowed", None)
+        if decision is not None:
+            return decision
+
+        allowed = True
+        summaries: list[_Fingerprint] = []
+        now = self._clock()
+        storm_check = record.levelno >= self.level and not getattr(record, "storm_summary", False)
+
+        with self._lock:
+            if now - self._last_sweep >= self.window:
+                summaries += self._sweep(now)
+            if storm_check:
+                allowed = self._count(self.fingerprint(record), record, now, summaries)
+
+        record._storm_allowed = allowed
+        for fp in summaries:
+            self._emit_summary(fp)
+        return allowed
+
+    def flush(self) -> None:
+        with self._lock:
+            summaries = []
+            for fp in self._fingerprints.values():
+                if fp.suppressed:
+                    summaries.append(_Fingerprint(fp.key, fp.sample, fp.window_start, fp.seen, fp.suppressed))
+                    fp.seen = fp.suppressed = 0
+        for fp in summaries:
+            self._emit_summary(fp)
+
+    @staticmethod
+    def fingerprint(record: logging.LogRecord) -> str:
+        if record.exc_info and record.exc_info[1] is not None:
+            exc = record.exc_info[1]
+            tb = exc.__traceback__
+            where = ""
+            if tb is not None:
+                while tb.tb_next is not None:
+                    tb = tb.tb_next
+                where = f"{tb.tb_frame.f_code.co_filename}:{tb.tb_lineno}"
+            return f"{record.name}:{type(exc).__name__}:{where}"
+        return f"{record.name}:{record.levelno}:{_VOLATILE_RE.sub('#', record.getMessage())[:200]}"
+
+    def _count(self, key: str, record: logging.LogRecord, now: float, summaries: list) -> bool:
+        fp = self._fingerprints.get(key)
+        if fp is None:
+            fp = _Fingerprint(key, record.getMessage()[:300], now)
+            self._fingerprints[key] = fp
+            if len(self._fingerprints) > self.max_fingerprints:
+                _, evicted = self._fingerprints.popitem(last=False)
+                if evicted.suppressed:
+                    summaries.append(evicted)
+        else:
+            self._fingerprints.move_to_end(key)
+            if now - fp.window_start >= self.window:
+                if fp.suppressed:
+                    summaries.append(_Fingerprint(fp.key, fp.sample, fp.window_start, fp.seen, fp.suppressed))
+                fp.window_start, fp.seen, fp.suppressed = now, 0, 0
+
+        fp.seen += 1
+        if fp.seen <= self.burst:
+            return True
+        fp.suppressed += 1
+        self.suppressed_total += 1
+        return False
+
+    def _sweep(self, now: float) -> list[_Fingerprint]:
+        self._last_sweep = now
+        summaries = []
+        for key in [key for key, fp in self._fingerprints.items() if now - fp.window_start >= self.window]:
+            fp = self._fingerprints.pop(key)
+            if fp.suppressed:
+                summaries.append(fp)
+        return summaries
+
+    def _emit_summary(self, fp: _Fingerprint) -> None:
+        self._summary_logger.warning(
+            f"{fp.seen} occurrences of «{fp.sample}» in the last {self.window:.0f}s "
+            f"({fp.suppressed} suppressed)",
+            extra={"storm_summary": True},
+        )
+
+
+log_storm = LogStormFilter()
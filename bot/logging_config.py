@@ -2,6 +2,8 @@ import logging
 import os
 from pathlib import Path
 
+from log_storm import log_storm
+
 
 def setup_logging(level=logging.DEBUG):
     base_dir = Path(__file__).parent.parent
@@ -10,12 +12,17 @@ def setup_logging(level=logging.DEBUG):
 
     log_file = log_dir / 'bot.log'
 
+    handlers = [
+        logging.FileHandler(log_file, mode="a"),
+        logging.StreamHandler(),
+    ]
+    # одинаковые ошибки от всех пользователей сразу сворачиваются в сводки
+    for handler in handlers:
+        handler.addFilter(log_storm)
+
     logging.basicConfig(
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         level=level,
-        handlers=[
-            logging.FileHandler(log_file, mode="a"),
-            logging.StreamHandler(),
-        ]
+        handlers=handlers
     )
     return logging.getLogger(__name__)
@@ -1,3 +1,5 @@
+import functools
+import gc
 import logging
 from telegram.ext import (
     Application,
@@ -5,36 +7,56 @@ from telegram.ext import (
     MessageHandler,
     CallbackQueryHandler,
     ConversationHandler,
+    InlineQueryHandler,
+    TypeHandler,
     filters
 )
+from telegram import Update
 from logging_config import setup_logging
-from config import config
+from log_storm import log_storm
 from handlers.calculation_conversation import (
     start_calculation,
-    choose_fence_type,
-    ask_fence_popular_specs,
-    choose_fence_variant,
-    save_fence_variant,
-    ask_fence_length,
-    handle_fence_accessory,
-    handle_fence_accessory_quantity,
-    handle_gate_accessory_spec_choice,
-    handle_fence_accessory_spec_choice,
-    handle_need_gates,
-    handle_gate_type,
-    handle_chosen_gate_variant,
-    handle_gate_size_choice,
-    handle_gate_automation_choice,
-    handle_gate_accessory,
-    handle_gate_accessory_quantity,
-    handle_mounting_type
+    calculation_flow,
+    notify_admitted,
+    CALC_START_CALLBACK
+)
+from services import (
+    tracer,
+    profiler,
+    job_runner,
+    is_price_list_callback,
+    is_history_callback,
+    current_tenant,
+    default_tenant,
+    backend_stacks,
+    register_send_queue,
+    Tenant,
+    SEARCH_PAYLOAD_PREFIX,
 )
-from handlers.calculation_states import CalcStates
 from handlers import (
     start,
     handle_contact,
     show_main_menu,
     handle_main_menu_selection,
+    handle_price_list_callback,
+    handle_inline_query,
+    profile_command,
+    stats_command,
+    broadcast_command,
+    handle_bulk_quote_file,
+    show_history,
+    handle_history_callback,
+    save_history_length,
+    cancel_history_edit,
+    HISTORY_LENGTH,
+    suppress_duplicate_press,
+    mark_press_done,
+    PRESS_GUARD_GROUP,
+    PRESS_DONE_GROUP,
+    enter_tenant,
+    leave_tenant,
+    TENANT_ENTER_GROUP,
+    TENANT_EXIT_GROUP,
     error_handler
 )
 
@@ -43,64 +65,38 @@ def main():
     logger = setup_logging(logging.INFO)
     logger.info('Starting bot...')
 
-    application = Application.builder().token(config.BOT_TOKEN).build()
+    # сборка и старт создают объекты, которые живут до конца процесса; проходы сборщика мусора
+    # только перебирали бы их — он включается в on_startup, а при сбое старта — здесь
+    gc.disable()
+    try:
+        application = build_application(
+            default_tenant,
+            Application.builder()
+            .post_init(on_startup)
+            .post_stop(on_stop)
+            .post_shutdown(on_shutdown)
+        )
+        application.run_polling()
+    finally:
+        gc.enable()
+
+
+def build_application(tenant: Tenant, builder=None) -> Application:
+    """Приложение одного бота; в хосте (host.py) таких несколько на одном event loop."""
+    builder = builder if builder is not None else Application.builder()
+    # все исходящие запросы бота идут через бюджет отправки: рассылка не теснит диалоги
+    application = builder.token(tenant.token).rate_limiter(tenant.broadcasts.limiter).build()
+    application.bot_data["tenant"] = tenant
 
     calc_handler = ConversationHandler(
         entry_points=[
             CommandHandler("calc", start_calculation),
             MessageHandler(filters.Text("Расчет"), start_calculation),
+            CallbackQueryHandler(start_calculation, pattern=f"^{CALC_START_CALLBACK}$"),
+            # «Рассчитать» под результатом инлайн-поиска: /start calc-<вид>-<id>
+            CommandHandler("start", start_calculation, filters.Regex(f"^/start {SEARCH_PAYLOAD_PREFIX}")),
         ],
-        states={
-            CalcStates.FENCE_TYPE.value: [
-                CallbackQueryHandler(choose_fence_type),
-            ],
-            CalcStates.FENCE_POPULAR_SPECS.value: [
-                CallbackQueryHandler(ask_fence_popular_specs),
-            ],
-            CalcStates.FENCE_VARIANTS.value: [
-                CallbackQueryHandler(choose_fence_variant),
-            ],
-            CalcStates.FENCE_LENGTH.value: [
-                CallbackQueryHandler(save_fence_variant),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, ask_fence_length)
-            ],
-            CalcStates.FENCE_ACCESSORIES.value: [
-                CallbackQueryHandler(handle_fence_accessory),
-            ],
-            CalcStates.FENCE_ACCESSORY_SPECS.value: [
-                CallbackQueryHandler(handle_fence_accessory_spec_choice),
-            ],
-            CalcStates.FENCE_ACCESSORIES_QUANTITY.value: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_fence_accessory_quantity),
-            ],
-            CalcStates.NEED_GATES.value: [
-                CallbackQueryHandler(handle_need_gates),
-            ],
-            CalcStates.GATE_TYPE.value: [
-                CallbackQueryHandler(handle_gate_type),
-            ],
-            CalcStates.GATE_POPULAR_SPECS.value: [
-                CallbackQueryHandler(handle_gate_size_choice),
-            ],
-            CalcStates.GATE_VARIANTS.value: [
-                CallbackQueryHandler(handle_chosen_gate_variant),
-            ],
-            CalcStates.GATE_AUTOMATION.value: [
-                CallbackQueryHandler(handle_gate_automation_choice),
-            ],
-            CalcStates.GATE_ACCESSORIES.value: [
-                CallbackQueryHandler(handle_gate_accessory),
-            ],
-            CalcStates.GATE_ACCESSORY_SPECS.value: [
-                CallbackQueryHandler(handle_gate_accessory_spec_choice),
-            ],
-            CalcStates.GATE_ACCESSORIES_QUANTITY.value: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_gate_accessory_quantity),
-            ],
-            CalcStates.MOUNTING_TYPE.value: [
-                CallbackQueryHandler(handle_mounting_type),
-            ]
-        },
+        states=calculation_flow.compile(),
         fallbacks=[
             CommandHandler("cancel", cancel_dialog),
             MessageHandler(filters.Text("Главное меню"), cancel_dialog),
@@ -108,22 +104,111 @@ def main():
         allow_reentry=True,
     )
 
+    application.add_handler(TypeHandler(Update, enter_tenant), group=TENANT_ENTER_GROUP)
+    application.add_handler(TypeHandler(Update, suppress_duplicate_press), group=PRESS_GUARD_GROUP)
+    application.add_handler(TypeHandler(Update, mark_press_done), group=PRESS_DONE_GROUP)
+    application.add_handler(TypeHandler(Update, leave_tenant), group=TENANT_EXIT_GROUP)
+
+    # правка расчёта из истории: кнопки истории и ввод новой длины, без шагов calc_handler
+    history_handler = ConversationHandler(
+        entry_points=[CallbackQueryHandler(handle_history_callback, pattern=is_history_callback)],
+        states={
+            HISTORY_LENGTH: [
+                MessageHandler(filters.Regex(r"^\s*\d+([.,]\d+)?\s*$"), save_history_length),
+                CallbackQueryHandler(handle_history_callback, pattern=is_history_callback),
+            ],
+        },
+        fallbacks=[CommandHandler("cancel", cancel_history_edit)],
+        allow_reentry=True,
+    )
+
     application.add_handler(calc_handler)
+    application.add_handler(history_handler)
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(MessageHandler(filters.CONTACT, handle_contact))
+    application.add_handler(MessageHandler(
+        filters.Document.FileExtension("csv") | filters.Document.FileExtension("xlsx"),
+        handle_bulk_quote_file
+    ))
     application.add_handler(CommandHandler("menu", show_main_menu))
+    application.add_handler(CommandHandler("history", show_history))
+    application.add_handler(CommandHandler("profile", profile_command))
+    application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(CommandHandler("broadcast", broadcast_command))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_main_menu_selection))
+    application.add_handler(CallbackQueryHandler(handle_price_list_callback, pattern=is_price_list_callback))
     application.add_handler(CallbackQueryHandler(handle_main_menu_selection))
+    application.add_handler(InlineQueryHandler(handle_inline_query))
 
     application.add_error_handler(error_handler)
+    return application
+
+
+async def start_tenant(application: Application):
+    tenant = application.bot_data["tenant"]
+    await tenant.report_delivery.resume(application.bot)
+    await tenant.broadcasts.resume(application.bot)
+    register_send_queue(f"рассылка {tenant.name}", tenant.broadcasts.remaining)
+    tenant.admission.start(functools.partial(notify_admitted, application.bot))
+
+
+async def stop_tenant(application: Application):
+    tenant = application.bot_data["tenant"]
+    await tenant.admission.stop()
+    tenant.report_delivery.stop()
+    # позиция сохранится, и после рестарта рассылка продолжится с неё
+    await tenant.broadcasts.suspend()
+
+
+def finish_startup() -> None:
+    """
+    Конец старта из точки входа (main, host.main), выключившей сборщик мусора: объекты, созданные
+    при импорте и сборке, уходят в постоянное поколение, и сборщик их больше не обходит. Если сборщик
+    не выключали (приложение запущено не через точку входа), постоянное поколение не трогаем.
+    """
+    if gc.isenabled():
+        return
+    gc.freeze()
+    gc.enable()
+
+
+async def close_process(tenants: list[Tenant]):
+    for stack in backend_stacks(tenants):
+        await stack.client.close()
+    for tenant in tenants:
+        tenant.history.close()
+    tracer.close()
+    if profiler.enabled:
+        profiler.stop()
+        profiler.dump()
+    log_storm.flush()
+
+
+async def on_startup(application: Application):
+    try:
+        job_runner.start()
+        await start_tenant(application)
+    finally:
+        finish_startup()
+
+
+async def on_stop(application: Application):
+    await stop_tenant(application)
+    await job_runner.shutdown()
+
 
-    application.run_polling()
+async def on_shutdown(application: Application):
+    await close_process([application.bot_data["tenant"]])
 
 
-def cancel_dialog(update, context):
+async def cancel_dialog(update, context):
     context.user_data.clear()
-    update.message.reply_text("Диалог отменён. Возвращаемся в главное меню.")
+    current_tenant().admission.release(update.effective_user.id)
+    current_tenant().admission.leave_queue(update.effective_user.id)
+    current_tenant().speculation.discard(update.effective_user.id)
+    calculation_flow.track(update.effective_user.id, ConversationHandler.END)
+    await update.message.reply_text("Диалог отменён. Возвращаемся в главное меню.")
     return ConversationHandler.END
 
 
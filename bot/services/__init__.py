@@ -0,0 +1,144 @@
+from .callback_registry import (
+    callback_registry,
+    CallbackRegistry,
+    FenceSpecChoice,
+    GateSpecChoice,
+    AccessorySpecChoice,
+)
+from .backend import (
+    backend,
+    BackendClient,
+    BackendStatusError,
+    CatalogDelta,
+    ConditionalList,
+)
+from .catalog import (
+    catalog,
+    Catalog,
+    CatalogChanges,
+    CatalogEntry,
+)
+from .snapshot import (
+    CatalogSnapshot,
+)
+from .accessory_specs import (
+    accessory_specs,
+    AccessorySpecIndex,
+    AccessorySpecs,
+)
+from .keyboards import (
+    keyboard_pager,
+    KeyboardPager,
+    PageTurn,
+    is_page_turn,
+)
+from .search import (
+    catalog_search,
+    CatalogSearch,
+    SearchIndex,
+    SearchItem,
+    search_payload,
+    parse_search_payload,
+    SEARCH_PAYLOAD_PREFIX,
+)
+from .price_list import (
+    price_list,
+    PriceListService,
+    PriceListPage,
+    PRICE_FILE_CALLBACK,
+    PRICE_FILE_NAME,
+    is_price_list_callback,
+)
+from .tracing import (
+    tracer,
+    traced,
+    traced_entry,
+    current_trace_id,
+    TRACE_HEADER,
+)
+from .profiling import (
+    profiler,
+    SamplingProfiler,
+)
+from .metrics import (
+    LatencyWindow,
+    register_send_queue,
+    send_queues,
+    step_latency,
+    observe_step,
+    DialogSteps,
+)
+from .jobs import (
+    job_runner,
+    JobRunner,
+    JobQueueFull,
+)
+from .history import (
+    CalculationHistory,
+    HistoryAction,
+    HistoryRecord,
+    is_history_callback,
+)
+from .reports import (
+    calculation_history,
+    pending_reports,
+    PendingReports,
+    report_delivery,
+    ReportDelivery,
+)
+from .users import (
+    users,
+    UserRegistry,
+    Recipient,
+)
+from .broadcast import (
+    Broadcaster,
+    BroadcastError,
+    BroadcastState,
+    SendBudget,
+    describe_broadcast,
+)
+from .recording import (
+    BackendRecorder,
+    load_fixtures,
+    fixture_body,
+)
+from .calculations import (
+    SPECULATIVE_HEADER,
+    new_report_id,
+    draft_from,
+    build_calculation,
+    submit_calculation,
+)
+from .speculation import (
+    speculative_reports,
+    SpeculativeReports,
+)
+from .bulk_quote import (
+    BulkQuoteError,
+    BulkRow,
+    ProgressThrottle,
+    parse_table,
+    run_bulk_quote,
+    summary_csv,
+)
+from .admission import (
+    admission,
+    AdmissionController,
+)
+from .dedup import (
+    press_guard,
+    PressGuard,
+)
+from .tenants import (
+    current_tenant,
+    activate_tenant,
+    all_tenants,
+    build_tenants,
+    load_tenants,
+    backend_stacks,
+    default_tenant,
+    BackendStack,
+    Tenant,
+    TenantMetrics,
+)
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import aiohttp
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from .backend import BackendClient, BackendStatusError, backend
+from .callback_registry import AccessorySpecChoice, callback_registry
+from .catalog import CATALOG_TTL_SECONDS, Catalog, CatalogChanges, catalog
+
+logger = logging.getLogger(__name__)
+
+BUILD_PARALLELISM = 8
+
+
+@dataclass(frozen=True, slots=True)
+class AccessorySpecs:
+    id: int
+    name: str
+    specs: tuple[AccessorySpecChoice, ...]
+
+
+@dataclass(slots=True)
+class _KindIndex:
+    version: int
+    built_at: float
+    accessories: dict[int, AccessorySpecs]
+    # id аксессуара -> (токены кнопок, клавиатура характеристик)
+    keyboards: dict[int, tuple[tuple[str, ...], InlineKeyboardMarkup]] = field(default_factory=dict)
+    # False — индекс ещё строится, здесь только аксессуары, догруженные по нажатию
+    complete: bool = True
+
+
+class AccessorySpecIndex:
+    """
+    Характеристики всех аксессуаров одной линии (fence, gate), собранные разом
+    по записи каталога accessories?accessoriableType=..., и готовые клавиатуры
+    выбора характеристики. Если список уже содержит specs, бэкенд не трогаем;
+    иначе они догружаются пачкой accessories/{id} при построении индекса,
+    а не на каждое нажатие.
+
+    Индекс перестраивается при смене версии записи каталога или раз в max_age;
+    пока идёт перестройка, отдаётся прежний. Если запись каталога знает, какие
+    позиции изменились (CatalogEntry.changes), заново берутся только они.
+    """
+
+    def __init__(
+            self,
+            source: Catalog,
+            client: BackendClient,
+            parallelism: int = BUILD_PARALLELISM,
+            max_age: float = CATALOG_TTL_SECONDS,
+    ):
+        self._catalog = source
+        self._client = client
+        self._parallelism = parallelism
+        self._max_age = max_age
+        self._indexes: dict[str, _KindIndex] = {}
+        self._building: dict[str, asyncio.Task] = {}
+        self.builds = 0
+        self.build_requests = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return sum(len(index.accessories) for index in self._indexes.values())
+
+    async def get(self, kind: str, wait: bool = True) -> dict[int, AccessorySpecs]:
+        entry = await self._catalog.accessories(kind)
+        current = self._indexes.get(kind)
+        fresh = current is not None and time.monotonic() - current.built_at < self._max_age
+        if fresh and current.version == entry.version:
+            return current.accessories
+
+        # известно, какие позиции изменились с версии текущего индекса — остальное берём из него
+        changes = entry.changes
+        base = current if fresh and changes is not None and changes.previous_version == current.version else None
+
+        task = self._building.get(kind)
+        if task is None:
+            task = asyncio.create_task(self._build(kind, entry.version, entry.items, base, changes))
+            self._building[kind] = task
+            task.add_done_callback(lambda _: self._building.pop(kind, None))
+
+        if current is not None and (current.complete or not wait):
+            return current.accessories
+        if not wait:
+            return {}
+        return await asyncio.shield(task)
+
+    async def lookup(self, kind: str, accessory_id: int) -> AccessorySpecs:
+        """Характеристики аксессуара; запрос к бэкенду — только если индекс его ещё не знает."""
+        accessories = await self.get(kind, wait=False)
+        found = accessories.get(accessory_id)
+        if found is not None:
+            self.hits += 1
+            return found
+
+        self.misses += 1
+        data = await self._client.get_json(f"accessories/{accessory_id}")
+        found = _accessory_specs(accessory_id, data.get("data", {}))
+        # пока шёл запрос, индекс мог достроиться — кладём в тот, что актуален сейчас
+        index = self._indexes.get(kind)
+        if index is None:
+            index = self._indexes[kind] = _KindIndex(-1, time.monotonic(), {}, complete=False)
+        index.accessories[accessory_id] = found
+        return found
+
+    def keyboard(self, kind: str, accessory: AccessorySpecs) -> InlineKeyboardMarkup:
+        index = self._indexes.get(kind)
+        cached = index.keyboards.get(accessory.id) if index is not None else None
+        # токен мог вытесниться из реестра — тогда кнопка вела бы в «устарела»
+        if cached is not None and all(callback_registry.resolve(token) is not None for token in cached[0]):
+            return cached[1]
+
+        tokens, markup = _spec_keyboard(accessory)
+        if index is not None and index.accessories.get(accessory.id) is accessory:
+            index.keyboards[accessory.id] = (tokens, markup)
+        return markup
+
+    async def _build(
+            self,
+            kind: str,
+            version: int,
+            items: list[dict],
+            base: Optional[_KindIndex] = None,
+            changes: Optional[CatalogChanges] = None,
+    ) -> dict[int, AccessorySpecs]:
+        started = time.perf_counter()
+        accessories: dict[int, AccessorySpecs] = {}
+        keyboards = {}
+        missing = []
+        for item in items:
+            if base is not None and item["id"] not in changes.upserted and item["id"] in base.accessories:
+                accessories[item["id"]] = base.accessories[item["id"]]
+                if item["id"] in base.keyboards:
+                    keyboards[item["id"]] = base.keyboards[item["id"]]
+            elif "specs" in item:
+                accessories[item["id"]] = _accessory_specs(item["id"], item)
+            else:
+                missing.append(item)
+
+        semaphore = asyncio.Semaphore(self._parallelism)
+
+        async def fetch(item: dict) -> None:
+            async with semaphore:
+                self.build_requests += 1
+                try:
+                    data = await self._client.get_json(f"accessories/{item['id']}")
+                except (aiohttp.ClientError, asyncio.TimeoutError, BackendStatusError) as e:
+                    # такой аксессуар догрузится по нажатию
+                    logger.warning(f"Failed to load specs of accessory {item['id']}: {e}")
+                    return
+            accessories[item["id"]] = _accessory_specs(item["id"], {"name": item["name"], **data.get("data", {})})
+
+        await asyncio.gather(*(fetch(item) for item in missing))
+
+        partial = self._indexes.get(kind)
+        if partial is not None and not partial.complete:
+            # догруженное по нажатию во время сборки не теряем; своё, только что полученное, новее
+            for accessory_id, accessory in partial.accessories.items():
+                if accessories.setdefault(accessory_id, accessory) is accessory and accessory_id in partial.keyboards:
+                    keyboards[accessory_id] = partial.keyboards[accessory_id]
+
+        index = _KindIndex(version, base.built_at if base is not None else time.monotonic(), accessories, keyboards)
+        for accessory in accessories.values():
+            if len(accessory.specs) > 1 and accessory.id not in keyboards:
+                keyboards[accessory.id] = _spec_keyboard(accessory)
+        self._indexes[kind] = index
+        self.builds += 1
+        logger.info(
+            f"Accessory spec index for {kind} v{version}: {len(accessories)}/{len(items)} accessories, "
+            f"{len(missing)} fetched, {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return accessories
+
+
+def _accessory_specs(accessory_id: int, data: dict) -> AccessorySpecs:
+    return AccessorySpecs(
+        accessory_id,
+        data.get("name", "неизвестный аксессуар"),
+        tuple(AccessorySpecChoice(spec["spec_id"], spec["dimension"]) for spec in data.get("specs") or ()),
+    )
+
+
+def _spec_keyboard(accessory: AccessorySpecs) -> tuple[tuple[str, ...], InlineKeyboardMarkup]:
+    tokens = tuple(callback_registry.issue(spec) for spec in accessory.specs)
+    markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton(spec.dimension, callback_data=token)]
+        for spec, token in zip(accessory.specs, tokens)
+    ])
+    return tokens, markup
+
+
+accessory_specs = AccessorySpecIndex(catalog, backend)
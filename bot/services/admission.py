@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from config import config
+
+from .backend import BackendClient, backend
+
+logger = logging.getLogger(__name__)
+
+SESSION_IDLE_SECONDS = 15 * 60
+RESERVATION_SECONDS = 3 * 60
+TICK_SECONDS = 5
+RECENT_REQUESTS = 200
+
+# chat_id -> корутина, которая сообщает пользователю, что можно начинать
+AdmitNotifier = Callable[[int], Awaitable[None]]
+
+
+@dataclass(slots=True)
+class Waiting:
+    user_id: int
+    chat_id: int
+    queued_at: float
+
+
+class AdmissionController:
+    """
+    Ограничивает число одновременно идущих расчётов. Предел снижается, когда
+    бэкенд тормозит (p95 по последним запросам выше цели) или перегружен запросами
+    в полёте; лишние /calc встают в очередь и допускаются по мере освобождения мест.
+    """
+
+    def __init__(
+            self,
+            client: BackendClient,
+            max_active: int,
+            max_queue: int,
+            latency_target: float,
+            max_in_flight: int,
+            min_active: int = 5,
+    ):
+        self._client = client
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.latency_target = latency_target
+        self.max_in_flight = max_in_flight
+        self.min_active = min(min_active, max_active)
+
+        # user_id -> когда место освободится само: через SESSION_IDLE_SECONDS без активности,
+        # а у допущенных из очереди — если не начали расчёт за RESERVATION_SECONDS
+        self._active: dict[int, float] = {}
+        self._queue: OrderedDict[int, Waiting] = OrderedDict()
+        self._notify: Optional[AdmitNotifier] = None
+        self._ticker: Optional[asyncio.Task] = None
+        self.admitted_total = 0
+        self.queued_total = 0
+        self.rejected_total = 0
+
+    @property
+    def active(self) -> int:
+        return len(self._active)
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def capacity(self) -> int:
+        limit = self.max_active
+        (p95,) = self._client.latency.percentiles(0.95, last=RECENT_REQUESTS)
+        if p95 > self.latency_target:
+            limit = max(self.min_active, int(self.max_active * self.latency_target / p95))
+        if self._client.in_flight >= self.max_in_flight:
+            # бэкенд захлёбывается — новых не пускаем, пока не разгребёт
+            limit = min(limit, len(self._active))
+        return limit
+
+    def try_admit(self, user_id: int, chat_id: int) -> Optional[int]:
+        """None — можно начинать; иначе номер в очереди (0 — очередь переполнена)."""
+        now = time.monotonic()
+        if user_id in self._active:
+            self._active[user_id] = now + SESSION_IDLE_SECONDS
+            return None
+
+        if user_id in self._queue:
+            return self.position(user_id)
+
+        if not self._queue and len(self._active) < self.capacity():
+            self._active[user_id] = now + SESSION_IDLE_SECONDS
+            self.admitted_total += 1
+            return None
+
+        if len(self._queue) >= self.max_queue:
+            self.rejected_total += 1
+            return 0
+
+        self._queue[user_id] = Waiting(user_id, chat_id, now)
+        self.queued_total += 1
+        return len(self._queue)
+
+    def position(self, user_id: int) -> Optional[int]:
+        for index, waiting_id in enumerate(self._queue, start=1):
+            if waiting_id == user_id:
+                return index
+        return None
+
+    def touch(self, user_id: int) -> None:
+        self._active[user_id] = time.monotonic() + SESSION_IDLE_SECONDS
+
+    def release(self, user_id: int) -> None:
+        if self._active.pop(user_id, None) is not None:
+            self._promote()
+
+    def leave_queue(self, user_id: int) -> None:
+        self._queue.pop(user_id, None)
+
+    def start(self, notify: AdmitNotifier) -> None:
+        self._notify = notify
+        if self._ticker is None:
+            self._ticker = asyncio.create_task(self._tick_forever())
+
+    async def stop(self) -> None:
+        if self._ticker is not None:
+            self._ticker.cancel()
+            self._ticker = None
+
+    async def _tick_forever(self) -> None:
+        while True:
+            await asyncio.sleep(TICK_SECONDS)
+            self._expire(time.monotonic())
+            self._promote()
+
+    def _expire(self, now: float) -> None:
+        for user_id in [user_id for user_id, expires in self._active.items() if expires <= now]:
+            del self._active[user_id]
+
+    def _promote(self) -> None:
+        limit = self.capacity()
+        while self._queue and len(self._active) < limit:
+            _, waiting = self._queue.popitem(last=False)
+            self._active[waiting.user_id] = time.monotonic() + RESERVATION_SECONDS
+            self.admitted_total += 1
+            logger.info(f"Admitted queued user {waiting.user_id} after {time.monotonic() - waiting.queued_at:.0f}s")
+            if self._notify is not None:
+                task = asyncio.create_task(self._notify(waiting.chat_id))
+                task.add_done_callback(_log_notify_error)
+
+
+def _log_notify_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Failed to notify admitted user: {task.exception()}")
+
+
+admission = AdmissionController(
+    backend,
+    max_active=config.ADMISSION_MAX_ACTIVE,
+    max_queue=config.ADMISSION_MAX_QUEUE,
+    latency_target=config.ADMISSION_LATENCY_TARGET,
+    max_in_flight=config.ADMISSION_MAX_IN_FLIGHT,
+)
@@ -0,0 +1,178 @@
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Optional
+from urllib.parse import quote
+
+import aiohttp
+from config import config
+
+from . import codec
+from .metrics import LatencyWindow
+from .profiling import profiler
+from .recording import BackendRecorder, recorder_from_path
+from .tracing import tracer, trace_headers
+
+try:
+    import brotli  # noqa: F401
+except ImportError:  # без пакета brotli aiohttp не умеет распаковывать br
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+_ID_SEGMENT_RE = re.compile(r"/[^/?]*\d[^/?]*")
+
+CURSOR_HEADER = "X-Catalog-Cursor"
+
+ACCEPT_ENCODING = "br, gzip, deflate" if brotli is not None else "gzip, deflate"
+
+
+class BackendStatusError(Exception):
+    def __init__(self, status: int, path: str):
+        super().__init__(f"Backend returned {status} for {path}")
+        self.status = status
+        self.path = path
+
+
+@dataclass(slots=True)
+class ConditionalList:
+    """Результат условного GET: items is None, если сервер ответил 304."""
+    items: Optional[list]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    # курсор для последующего запроса изменений (см. get_changes), если бэкенд его выдаёт
+    cursor: Optional[str] = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.items is None
+
+
+@dataclass(slots=True)
+class CatalogDelta:
+    """Изменения списка с момента cursor: новые и изменённые позиции целиком, удалённые — по id."""
+    upserted: list
+    deleted: list
+    cursor: str
+
+
+def route_name(path: str) -> str:
+    return _ID_SEGMENT_RE.sub("/{id}", "/" + path.split("?", 1)[0]).lstrip("/")
+
+
+class BackendClient:
+    def __init__(self, base_url: str, recorder: Optional[BackendRecorder] = None):
+        self.base_url = base_url
+        self.recorder = recorder
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.in_flight = 0
+        self.requests_total = 0
+        self.bytes_received = 0
+        self.latency = LatencyWindow()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    @asynccontextmanager
+    async def request(self, method: str, path: str, **kwargs: Any) -> AsyncIterator[aiohttp.ClientResponse]:
+        headers = {"Accept-Encoding": ACCEPT_ENCODING, **trace_headers(), **kwargs.pop("headers", {})}
+        session = self._get_session()
+        self.in_flight += 1
+        self.requests_total += 1
+        started = time.perf_counter()
+        try:
+            with tracer.span(f"{method} {route_name(path)}", kind="http", path=path) as span:
+                async with session.request(method, f"{self.base_url}{path}", headers=headers, **kwargs) as response:
+                    span["status"] = response.status
+                    # Content-Length — размер на проводе, т.е. уже сжатый
+                    self.bytes_received += response.content_length or 0
+                    if self.recorder is not None:
+                        # записываем до передачи ответа: вызывающий может упасть на разборе ошибки,
+                        # а прочитанное здесь тело aiohttp отдаст ему повторно из буфера
+                        await response.read()
+                        await self.recorder.record(
+                            method, path, kwargs.get("json"), response, time.perf_counter() - started
+                        )
+                    yield response
+        finally:
+            self.in_flight -= 1
+            self.latency.observe(time.perf_counter() - started)
+
+    async def get_json(self, path: str) -> Any:
+        async with self.request("GET", path) as response:
+            if response.status != 200:
+                raise BackendStatusError(response.status, path)
+            if profiler.should_sample():
+                return await profiler.run(f"backend:{route_name(path)}", self._decode, response)
+            return await self._decode(response)
+
+    async def get_list(self, path: str, key: str = "data") -> list:
+        async with self.request("GET", path) as response:
+            if response.status != 200:
+                raise BackendStatusError(response.status, path)
+            if profiler.should_sample():
+                return await profiler.run(f"backend:{route_name(path)}", self._decode_list, response, key)
+            return await self._decode_list(response, key)
+
+    async def get_list_conditional(
+            self,
+            path: str,
+            etag: Optional[str] = None,
+            last_modified: Optional[str] = None,
+            key: str = "data",
+    ) -> ConditionalList:
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        async with self.request("GET", path, headers=headers) as response:
+            if response.status == 304:
+                return ConditionalList(None, etag, last_modified)
+            if response.status != 200:
+                raise BackendStatusError(response.status, path)
+            if profiler.should_sample():
+                items = await profiler.run(f"backend:{route_name(path)}", self._decode_list, response, key)
+            else:
+                items = await self._decode_list(response, key)
+            return ConditionalList(
+                items,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+                response.headers.get(CURSOR_HEADER),
+            )
+
+    async def get_changes(self, path: str, cursor: str) -> Optional[CatalogDelta]:
+        """
+        GET path?since=cursor -> {"upserted": [...], "deleted": [id, ...], "cursor": "..."}.
+        None — курсор устарел (410), нужен полный список.
+        """
+        separator = "&" if "?" in path else "?"
+        delta_path = f"{path}{separator}since={quote(cursor, safe='')}"
+        async with self.request("GET", delta_path) as response:
+            if response.status == 410:
+                return None
+            if response.status != 200:
+                raise BackendStatusError(response.status, delta_path)
+            data = await self._decode(response)
+        return CatalogDelta(data.get("upserted", []), data.get("deleted", []), data["cursor"])
+
+    @staticmethod
+    async def _decode(response: aiohttp.ClientResponse) -> Any:
+        return codec.loads(await response.read())
+
+    @staticmethod
+    async def _decode_list(response: aiohttp.ClientResponse, key: str) -> list:
+        return codec.loads(await response.read()).get(key, [])
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+backend = BackendClient(config.BASE_API_URL, recorder_from_path(config.BACKEND_RECORD_FILE))
@@ -0,0 +1,379 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Optional
+
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
+from telegram.ext import BaseRateLimiter
+
+from config import config
+
+from .bulk_quote import ProgressThrottle
+from .jobs import Job, JobQueueFull, JobRunner
+from .users import Recipient, UserRegistry
+
+logger = logging.getLogger(__name__)
+
+# общий предел Telegram на отправку сообщений одним ботом
+TELEGRAM_GLOBAL_RATE = 30
+# столько сообщений в секунду рассылка оставляет под всплески обычных ответов
+NORMAL_TRAFFIC_RESERVE = 5
+RATE_WINDOW_SECONDS = 1.0
+BROADCAST_CONCURRENCY = 16
+BROADCAST_MAX_ATTEMPTS = 5
+CHECKPOINT_SECONDS = 2.0
+# столько ждём завершения уже начатых отправок при остановке, потом отменяем
+SUSPEND_SECONDS = 10.0
+PROGRESS_SECONDS = 5.0
+
+# rate_limit_args, которым рассылка помечает свои запросы
+BROADCAST = "broadcast"
+
+
+class BroadcastError(Exception):
+    pass
+
+
+class SendBudget(BaseRateLimiter):
+    """
+    Через него идут все запросы бота к Telegram. Обычные ответы в диалогах уходят
+    без задержки и только учитываются в окне за последнюю секунду; запросы рассылки
+    (rate_limit_args=BROADCAST) идут равномерно, с темпом, который остаётся от общего
+    предела после обычного трафика и запаса под него. Пачками слать нельзя: на границе
+    окон две пачки складываются и Telegram отвечает 429. После 429 на любом запросе
+    рассылка стоит retry_after секунд.
+    """
+
+    def __init__(
+            self,
+            broadcast_rate: float = config.BROADCAST_RATE,
+            global_rate: float = TELEGRAM_GLOBAL_RATE,
+            reserve: float = NORMAL_TRAFFIC_RESERVE,
+    ):
+        if broadcast_rate <= 0 or global_rate - reserve <= 0:
+            raise ValueError(
+                f"Broadcast rate must be positive: BROADCAST_RATE={broadcast_rate}, "
+                f"global {global_rate} minus reserve {reserve}"
+            )
+        self.broadcast_rate = broadcast_rate
+        self.global_rate = global_rate
+        self.reserve = reserve
+        # время обычных запросов за последние RATE_WINDOW_SECONDS, старые срезаются на каждом запросе
+        self._normal: deque[float] = deque()
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self.throttled = 0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args) -> Any:
+        if rate_limit_args == BROADCAST:
+            await self._acquire()
+        else:
+            now = time.monotonic()
+            self._prune(now)
+            self._normal.append(now)
+        try:
+            return await callback(*args, **kwargs)
+        except RetryAfter as e:
+            self.throttled += 1
+            self.pause(retry_seconds(e))
+            raise
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"Telegram flood control, broadcast paused for {seconds:.0f}s")
+
+    def _prune(self, now: float) -> None:
+        while self._normal and self._normal[0] <= now - RATE_WINDOW_SECONDS:
+            self._normal.popleft()
+
+    def _limit(self) -> float:
+        self._prune(time.monotonic())
+        return min(self.broadcast_rate, self.global_rate - self.reserve - len(self._normal))
+
+    async def _acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            limit = self._limit()
+            if limit <= 0:
+                # весь предел занят диалогами — ждём, пока самый старый ответ выйдет из окна
+                oldest = self._normal[0] if self._normal else now
+                await asyncio.sleep(max(0.0, oldest + RATE_WINDOW_SECONDS - now))
+                continue
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1 / limit
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            if time.monotonic() >= self._paused_until:
+                return
+
+
+@dataclass(slots=True)
+class BroadcastState:
+    broadcast_id: str
+    text: str
+    admin_chat_id: int
+    # рассылка идёт до этого места в реестре; зарегистрированные позже её не получат
+    until: int
+    total: int
+    started_at: float
+    offset: int = 0
+    sent: int = 0
+    blocked: int = 0
+    failed: int = 0
+    retried: int = 0
+    # время отправки без учёта простоя между рестартами — для честной скорости
+    elapsed: float = 0.0
+    status_message_id: Optional[int] = None
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.blocked + self.failed
+
+    @property
+    def rate(self) -> float:
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+
+class Broadcaster:
+    """
+    Рассылка всем из реестра пользователей на фоновом JobRunner. Получатели читаются
+    потоком, отправка — через SendBudget бота, так что обычные диалоги не ждут рассылку.
+    Позиция в реестре сохраняется в файл, и после рестарта рассылка продолжается
+    с неё; повторно сообщение могут получить только те, кому оно отправлялось в момент остановки.
+    """
+
+    def __init__(
+            self,
+            registry: UserRegistry,
+            runner: JobRunner,
+            path: Optional[Path],
+            limiter: Optional[SendBudget] = None,
+            concurrency: int = BROADCAST_CONCURRENCY,
+    ):
+        self._registry = registry
+        self._runner = runner
+        self._path = path
+        self.limiter = limiter if limiter is not None else SendBudget()
+        self._concurrency = concurrency
+        self.active: Optional[BroadcastState] = None
+        self._job: Optional[Job] = None
+        self._stopping = False
+        self._halting = False
+
+    def remaining(self) -> int:
+        return self.active.total - self.active.done if self.active is not None else 0
+
+    def start(self, bot: Bot, text: str, admin_chat_id: int) -> BroadcastState:
+        if self.active is not None:
+            raise BroadcastError("Рассылка уже идёт. Остановить: /broadcast stop")
+        state = BroadcastState(
+            uuid.uuid4().hex[:8], text, admin_chat_id, self._registry.size, len(self._registry), time.time()
+        )
+        self._schedule(bot, state)
+        self._save(state)
+        return state
+
+    async def stop(self) -> bool:
+        """Отменяет рассылку совсем — в отличие от suspend, после рестарта она не продолжится."""
+        if self.active is None:
+            return False
+        self._stopping = True
+        await self.suspend()
+        self._stopping = False
+        return True
+
+    async def suspend(self, timeout: float = SUSPEND_SECONDS) -> None:
+        """
+        Останавливает отправку, сохранив позицию (перед остановкой бота). Новым получателям
+        не пишем, а начатые отправки дожидаемся, чтобы после рестарта никто не получил сообщение дважды.
+        """
+        job = self._job
+        if job is None or self.active is None:
+            return
+        self._halting = True
+        try:
+            if job.task is None:
+                # ещё стоит в очереди JobRunner
+                self._runner.cancel(job.key)
+            else:
+                done, _ = await asyncio.wait({job.task}, timeout=timeout)
+                if not done:
+                    logger.warning(f"Broadcast {self.active.broadcast_id} did not stop in {timeout}s, cancelling")
+                    self._runner.cancel(job.key)
+                    await asyncio.gather(job.task, return_exceptions=True)
+        finally:
+            self._halting = False
+        self._job = None
+        if self._stopping and self.active is not None:
+            logger.info(f"Broadcast {self.active.broadcast_id} stopped at {self.active.done}/{self.active.total}")
+            self._finish()
+
+    async def resume(self, bot: Bot) -> None:
+        if self._path is None or not self._path.exists():
+            return
+        try:
+            state = BroadcastState(**json.loads(self._path.read_text(encoding="utf-8")))
+        except (OSError, ValueError, TypeError) as e:
+            logger.error(f"Failed to load broadcast checkpoint from {self._path}: {e}")
+            return
+        logger.info(f"Resuming broadcast {state.broadcast_id}: {state.done}/{state.total} done")
+        try:
+            self._schedule(bot, state)
+        except BroadcastError as e:
+            logger.error(f"Cannot resume broadcast {state.broadcast_id}: {e}")
+
+    def _schedule(self, bot: Bot, state: BroadcastState) -> None:
+        try:
+            self._job = self._runner.submit(
+                f"broadcast:{state.broadcast_id}",
+                lambda: self._run(bot, state),
+                key=f"broadcast:{state.broadcast_id}",
+            )
+        except JobQueueFull as e:
+            raise BroadcastError("Очередь фоновых задач переполнена, попробуйте позже.") from e
+        self.active = state
+
+    async def _run(self, bot: Bot, state: BroadcastState) -> None:
+        progress = ProgressThrottle(lambda done, total: self._show_progress(bot, state), PROGRESS_SECONDS)
+        slots = asyncio.Semaphore(self._concurrency)
+        # (смещение после получателя, отправка) в порядке реестра: позиция сдвигается
+        # только за непрерывно завершённое начало, чтобы после рестарта никого не пропустить
+        pending: deque[tuple[int, asyncio.Task]] = deque()
+        started = time.monotonic()
+        elapsed_before = state.elapsed
+        last_checkpoint = started
+
+        def advance() -> None:
+            # отменённая отправка могла не дойти — с неё и продолжим
+            while pending and pending[0][1].done() and not pending[0][1].cancelled():
+                state.offset = pending.popleft()[0]
+
+        try:
+            for recipient in self._registry.stream(state.offset, state.until):
+                await slots.acquire()
+                if self._halting:
+                    slots.release()
+                    break
+                task = asyncio.create_task(self._deliver(bot, state, recipient))
+                task.add_done_callback(lambda _: slots.release())
+                pending.append((recipient.next_offset, task))
+                advance()
+                if time.monotonic() - last_checkpoint >= CHECKPOINT_SECONDS:
+                    last_checkpoint = time.monotonic()
+                    state.elapsed = elapsed_before + last_checkpoint - started
+                    self._save(state)
+                    await progress(state.done, state.total)
+            await asyncio.gather(*(task for _, task in pending))
+            advance()
+        except asyncio.CancelledError:
+            for _, task in pending:
+                task.cancel()
+            await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+            advance()
+            state.elapsed = elapsed_before + time.monotonic() - started
+            if not self._stopping:
+                self._save(state)
+            raise
+
+        state.elapsed = elapsed_before + time.monotonic() - started
+        if self._halting:
+            if not self._stopping:
+                self._save(state)
+            return
+        state.offset = state.until
+        logger.info(
+            f"Broadcast {state.broadcast_id} finished: {state.sent} sent, {state.blocked} blocked, "
+            f"{state.failed} failed, {state.retried} retried after 429, {state.rate:.1f} msg/s"
+        )
+        self._finish()
+        try:
+            await bot.send_message(state.admin_chat_id, "Рассылка завершена.\n" + describe_broadcast(state))
+        except TelegramError as e:
+            logger.warning(f"Failed to report broadcast {state.broadcast_id} result: {e}")
+
+    async def _deliver(self, bot: Bot, state: BroadcastState, recipient: Recipient) -> None:
+        for attempt in range(BROADCAST_MAX_ATTEMPTS):
+            try:
+                await bot.send_message(
+                    recipient.chat_id, state.text, parse_mode="HTML", rate_limit_args=BROADCAST
+                )
+                state.sent += 1
+                return
+            except RetryAfter:
+                # пауза уже выставлена в SendBudget — следующая попытка её дождётся
+                state.retried += 1
+            except Forbidden:
+                self._registry.block(recipient.user_id)
+                state.blocked += 1
+                return
+            except BadRequest as e:
+                logger.warning(f"Broadcast to chat {recipient.chat_id} rejected: {e}")
+                break
+            except NetworkError as e:
+                logger.warning(f"Broadcast to chat {recipient.chat_id} failed, attempt {attempt + 1}: {e}")
+                await asyncio.sleep(2 ** attempt)
+            except TelegramError as e:
+                logger.warning(f"Broadcast to chat {recipient.chat_id} failed: {e}")
+                break
+        state.failed += 1
+
+    async def _show_progress(self, bot: Bot, state: BroadcastState) -> None:
+        text = "Рассылка идёт.\n" + describe_broadcast(state)
+        try:
+            if state.status_message_id is None:
+                message = await bot.send_message(state.admin_chat_id, text)
+                state.status_message_id = message.message_id
+            else:
+                await bot.edit_message_text(text, state.admin_chat_id, state.status_message_id)
+        except TelegramError as e:
+            logger.warning(f"Failed to update broadcast progress: {e}")
+
+    def _finish(self) -> None:
+        self.active = None
+        self._job = None
+        if self._path is not None:
+            try:
+                self._path.unlink(missing_ok=True)
+            except OSError as e:
+                logger.error(f"Failed to remove broadcast checkpoint {self._path}: {e}")
+
+    def _save(self, state: BroadcastState) -> None:
+        if self._path is None:
+            return
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(asdict(state), ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self._path)
+        except OSError as e:
+            logger.error(f"Failed to save broadcast checkpoint to {self._path}: {e}")
+
+
+def describe_broadcast(state: BroadcastState) -> str:
+    return (
+        f"Отправлено {state.sent} из {state.total}, заблокировали бота {state.blocked}, "
+        f"ошибок {state.failed}, повторов после 429: {state.retried}\n"
+        f"Скорость {state.rate:.1f} сообщ./с, время {timedelta(seconds=round(state.elapsed))}"
+    )
+
+
+def retry_seconds(error: RetryAfter) -> float:
+    value = error.retry_after
+    return value.total_seconds() if isinstance(value, timedelta) else float(value)
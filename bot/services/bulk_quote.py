@@ -0,0 +1,341 @@
+import asyncio
+import csv
+import io
+import logging
+import time
+import zipfile
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+import aiohttp
+
+from .accessory_specs import AccessorySpecIndex, accessory_specs
+from .backend import BackendClient, BackendStatusError, backend
+from .calculations import build_calculation, new_report_id, submit_calculation
+from .catalog import Catalog, catalog
+
+logger = logging.getLogger(__name__)
+
+BULK_PARALLELISM = 8
+MAX_BULK_ROWS = 5000
+CSV_ENCODINGS = ("utf-8-sig", "cp1251")
+
+COLUMNS = (
+    "fence_type", "height", "fence_variant", "length", "accessories",
+    "gate_type", "gate_size", "gate_variant", "gate_automation", "gate_accessories",
+    "mounting",
+)
+
+# Русские заголовки, которые дилеры пишут в шаблоне
+COLUMN_ALIASES = {
+    "тип забора": "fence_type",
+    "высота": "height",
+    "вариант забора": "fence_variant",
+    "длина": "length",
+    "аксессуары": "accessories",
+    "тип ворот": "gate_type",
+    "размер ворот": "gate_size",
+    "модель ворот": "gate_variant",
+    "автоматика": "gate_automation",
+    "аксессуары ворот": "gate_accessories",
+    "монтаж": "mounting",
+}
+
+_YES = {"да", "yes", "1", "true", "+"}
+_NO = {"", "нет", "no", "0", "false", "-"}
+
+
+class BulkQuoteError(Exception):
+    pass
+
+
+@dataclass(slots=True)
+class BulkRow:
+    number: int
+    values: dict[str, str]
+    draft: Optional[dict] = None
+    errors: list[str] = field(default_factory=list)
+    report_id: Optional[str] = None
+    status: str = "pending"
+
+
+def parse_table(filename: str, content: bytes) -> list[BulkRow]:
+    name = filename.lower()
+    if name.endswith(".csv"):
+        records = _read_csv(content)
+    elif name.endswith(".xlsx"):
+        records = _read_xlsx(content)
+    else:
+        raise BulkQuoteError("Поддерживаются только файлы .csv и .xlsx")
+
+    if not records:
+        raise BulkQuoteError("Файл пустой")
+
+    header = [COLUMN_ALIASES.get(h.strip().lower(), h.strip().lower()) for h in records[0]]
+    missing = {"fence_type", "height", "fence_variant", "length", "mounting"} - set(header)
+    if missing:
+        raise BulkQuoteError(f"Нет обязательных колонок: {', '.join(sorted(missing))}")
+
+    rows = []
+    for number, record in enumerate(records[1:], start=2):
+        values = {col: (record[i].strip() if i < len(record) and record[i] is not None else "")
+                  for i, col in enumerate(header) if col in COLUMNS}
+        if not any(values.values()):
+            continue
+        rows.append(BulkRow(number, values))
+
+    if len(rows) > MAX_BULK_ROWS:
+        raise BulkQuoteError(f"Слишком много строк: {len(rows)}, максимум {MAX_BULK_ROWS}")
+    return rows
+
+
+def _read_csv(content: bytes) -> list[list[str]]:
+    # Excel под Windows сохраняет CSV в cp1251
+    for encoding in CSV_ENCODINGS:
+        try:
+            text = content.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise BulkQuoteError("Не удалось прочитать CSV: сохраните файл в кодировке UTF-8")
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    try:
+        return [row for row in csv.reader(io.StringIO(text), dialect)]
+    except csv.Error as e:
+        raise BulkQuoteError(f"Не удалось разобрать CSV: {e}")
+
+
+def _read_xlsx(content: bytes) -> list[list[str]]:
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise BulkQuoteError("Для .xlsx не установлен openpyxl, пришлите файл в формате .csv")
+    try:
+        workbook = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        try:
+            sheet = workbook.active
+            if sheet is None:
+                raise BulkQuoteError("В книге нет листов")
+            return [["" if cell is None else str(cell) for cell in row] for row in sheet.iter_rows(values_only=True)]
+        finally:
+            workbook.close()
+    except (zipfile.BadZipFile, InvalidFileException, KeyError, ValueError) as e:
+        logger.warning(f"Failed to read xlsx for bulk quote: {e}")
+        raise BulkQuoteError("Не удалось открыть .xlsx: файл повреждён или это не книга Excel")
+
+
+def _number(value: str) -> float:
+    return float(value.replace(",", "."))
+
+
+def _match(items: list[dict], value: str, what: str) -> dict:
+    if value.isdigit():
+        for item in items:
+            if item["id"] == int(value):
+                return item
+    wanted = value.casefold()
+    for item in items:
+        if item["name"].casefold() == wanted:
+            return item
+    raise BulkQuoteError(f"{what} «{value}» не найден в каталоге")
+
+
+class BulkQuoteValidator:
+    """Проверяет строки по кэшу каталога и собирает из них черновики расчётов."""
+
+    def __init__(self, source: Catalog, specs: AccessorySpecIndex):
+        self._catalog = source
+        self._specs = specs
+
+    async def validate(self, row: BulkRow) -> None:
+        try:
+            row.draft = await self._build_draft(row.values)
+            row.status = "valid"
+        except BulkQuoteError as e:
+            row.errors.append(str(e))
+            row.status = "invalid"
+        except ValueError:
+            row.errors.append("Неверное число в строке")
+            row.status = "invalid"
+
+    async def _build_draft(self, values: dict[str, str]) -> dict:
+        fence_type = _match((await self._catalog.fence_types()).items, values["fence_type"], "Тип забора")
+
+        height_mm = round(_number(values["height"]) * 1000)
+        specs = (await self._catalog.fence_popular_specs(fence_type["id"])).items
+        spec = next((s for s in specs if round(s["height"]) == height_mm), None)
+        if spec is None:
+            raise BulkQuoteError(f"Высота {values['height']} м недоступна для «{fence_type['name']}»")
+        height_m = spec["height"] / 1000.0
+
+        variants = (await self._catalog.fence_variants(fence_type["id"], height_m)).items
+        variant = _match(variants, values["fence_variant"], "Вариант забора")
+
+        length = _number(values["length"])
+        if length <= 0:
+            raise BulkQuoteError("Длина должна быть положительной")
+
+        draft = {
+            "fence_type_id": fence_type["id"],
+            "fence_spec_id": spec["spec_id"],
+            "fence_height": height_m,
+            "fence_variant_id": variant["id"],
+            "fence_variant_name": variant["name"],
+            "fence_length": length,
+            "fence_accessories_chosen": await self._accessories("fence", values.get("accessories", "")),
+            "need_gates": False,
+            "gate_automation": False,
+            "gate_accessories_chosen": [],
+        }
+
+        if values.get("gate_type"):
+            await self._fill_gate(draft, values)
+
+        mounting = _match((await self._catalog.mountings()).items, values["mounting"], "Монтаж")
+        draft["mounting_id"] = mounting["id"]
+        draft["mounting_name"] = mounting["name"]
+        return draft
+
+    async def _fill_gate(self, draft: dict, values: dict[str, str]) -> None:
+        gate_type = _match((await self._catalog.gate_types()).items, values["gate_type"], "Тип ворот")
+        try:
+            h_str, w_str = values.get("gate_size", "").lower().replace("х", "x").split("x")
+        except ValueError:
+            raise BulkQuoteError("Размер ворот укажите как ВЫСОТАxШИРИНА в метрах, например 2x4")
+        h_mm, w_mm = round(_number(h_str) * 1000), round(_number(w_str) * 1000)
+
+        specs = (await self._catalog.gate_popular_specs(gate_type["id"])).items
+        spec = next((s for s in specs if round(s["height"]) == h_mm and round(s["width"]) == w_mm), None)
+        if spec is None:
+            raise BulkQuoteError(f"Размер ворот {values['gate_size']} недоступен для «{gate_type['name']}»")
+        h_m, w_m = spec["height"] / 1000.0, spec["width"] / 1000.0
+
+        variants = (await self._catalog.gate_variants(gate_type["id"], h_m, w_m)).items
+        variant = _match(variants, values.get("gate_variant", ""), "Модель ворот")
+
+        automation = values.get("gate_automation", "").lower()
+        if automation not in _YES | _NO:
+            raise BulkQuoteError(f"Автоматика: ожидается «да» или «нет», получено «{automation}»")
+
+        draft.update({
+            "need_gates": True,
+            "gate_type_id": gate_type["id"],
+            "gate_spec_id": spec["spec_id"],
+            "gate_height": h_m,
+            "gate_width": w_m,
+            "gate_variant_id": variant["id"],
+            "gate_variant_name": variant["name"],
+            "gate_automation": automation in _YES,
+            "gate_accessories_chosen": await self._accessories("gate", values.get("gate_accessories", "")),
+        })
+
+    async def _accessories(self, kind: str, value: str) -> list[dict]:
+        """Формат: «Название[/характеристика]*количество; ...»"""
+        if not value:
+            return []
+        catalog_items = (await self._catalog.accessories(kind)).items
+        await self._specs.get(kind)
+        chosen = []
+        for part in filter(None, (p.strip() for p in value.split(";"))):
+            name_part, _, qty_part = part.rpartition("*")
+            if not name_part:
+                name_part, qty_part = qty_part, "1"
+            name, _, dimension = name_part.partition("/")
+            accessory = _match(catalog_items, name.strip(), "Аксессуар")
+            quantity = int(qty_part)
+            if quantity <= 0:
+                raise BulkQuoteError(f"Количество для «{name.strip()}» должно быть положительным")
+            chosen.append({
+                "id": accessory["id"],
+                "spec_id": await self._accessory_spec(kind, accessory, dimension.strip()),
+                "quantity": quantity,
+            })
+        return chosen
+
+    async def _accessory_spec(self, kind: str, accessory: dict, dimension: str) -> Optional[int]:
+        specs = (await self._specs.lookup(kind, accessory["id"])).specs
+
+        if not specs:
+            return None
+        if not dimension:
+            if len(specs) == 1:
+                return specs[0].spec_id
+            raise BulkQuoteError(f"Для «{accessory['name']}» укажите характеристику через /")
+        for spec in specs:
+            if spec.dimension.casefold() == dimension.casefold():
+                return spec.spec_id
+        raise BulkQuoteError(f"У «{accessory['name']}» нет характеристики «{dimension}»")
+
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+async def run_bulk_quote(
+        rows: list[BulkRow],
+        user_id: int,
+        parallelism: int = BULK_PARALLELISM,
+        progress: Optional[ProgressCallback] = None,
+        source: Catalog = catalog,
+        client: BackendClient = backend,
+        specs: Optional[AccessorySpecIndex] = None,
+) -> list[BulkRow]:
+    if specs is None:
+        specs = accessory_specs if source is catalog else AccessorySpecIndex(source, client)
+    validator = BulkQuoteValidator(source, specs)
+    for row in rows:
+        await validator.validate(row)
+
+    valid = [row for row in rows if row.draft is not None]
+    semaphore = asyncio.Semaphore(parallelism)
+    completed = 0
+
+    async def submit(row: BulkRow) -> None:
+        nonlocal completed
+        async with semaphore:
+            row.report_id = f"{new_report_id(user_id)}_{row.number}"
+            try:
+                ok = await submit_calculation(build_calculation(row.draft, row.report_id, user_id), client)
+                row.status = "submitted" if ok else "failed"
+                if not ok:
+                    row.errors.append("Сервер отклонил расчёт")
+            except (aiohttp.ClientError, BackendStatusError, asyncio.TimeoutError) as e:
+                row.status = "failed"
+                row.errors.append(f"Сетевая ошибка: {e}")
+        completed += 1
+        if progress is not None:
+            await progress(completed, len(valid))
+
+    await asyncio.gather(*(submit(row) for row in valid))
+    return rows
+
+
+def summary_csv(rows: list[BulkRow]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";")
+    writer.writerow(["Строка", "Статус", "Номер отчёта", "Ошибки", *COLUMNS])
+    for row in rows:
+        writer.writerow([
+            row.number, row.status, row.report_id or "", " | ".join(row.errors),
+            *(row.values.get(col, "") for col in COLUMNS),
+        ])
+    return buffer.getvalue().encode("utf-8-sig")
+
+
+class ProgressThrottle:
+    """Не чаще раза в interval секунд, плюс обязательно на последнем шаге."""
+
+    def __init__(self, callback: Callable[[int, int], Awaitable[Any]], interval: float = 2.0):
+        self._callback = callback
+        self._interval = interval
+        self._last = 0.0
+
+    async def __call__(self, done: int, total: int) -> None:
+        now = time.monotonic()
+        if done == total or now - self._last >= self._interval:
+            self._last = now
+            await self._callback(done, total)
@@ -0,0 +1,90 @@
+import datetime
+import logging
+import secrets
+from collections import OrderedDict
+from typing import Any, Mapping
+
+from .backend import BackendClient, backend
+
+logger = logging.getLogger(__name__)
+
+MAX_REMEMBERED_SUBMISSIONS = 10_000
+# расчёт отправлен заранее, до выбора пользователя, и может оказаться невостребованным
+SPECULATIVE_HEADER = "X-Speculative"
+
+# report_id уже принятых расчётов: повторная отправка того же черновика не доходит до бэкенда
+_submitted: OrderedDict[str, None] = OrderedDict()
+
+
+def new_report_id(user_id: int) -> str:
+    # случайный хвост: два расчёта одного пользователя в одну секунду больше не совпадают
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H:%M:%S")
+    return f"{user_id}_{timestamp}_{secrets.token_hex(4)}"
+
+
+# ключи user_data, из которых build_calculation собирает тело запроса
+DRAFT_KEYS = (
+    "fence_type_id", "fence_spec_id", "fence_variant_id", "fence_length", "fence_accessories_chosen",
+    "need_gates", "gate_spec_id", "gate_type_id", "gate_variant_id", "gate_automation",
+    "gate_accessories_chosen", "mounting_id",
+)
+
+
+def draft_from(user_data: Mapping[str, Any]) -> dict:
+    """Черновик без служебных ключей диалога (карты вариантов, report_id) плюс названия для истории."""
+    draft = {key: user_data[key] for key in DRAFT_KEYS if key in user_data}
+    names = (
+        ("fence_variant_name", "fence_variants_map", "fence_variant_id"),
+        ("gate_variant_name", "gate_variants_map", "gate_variant_id"),
+        ("mounting_name", "mountings_map", "mounting_id"),
+    )
+    for name_key, map_key, id_key in names:
+        name = user_data.get(map_key, {}).get(user_data.get(id_key))
+        if name is not None:
+            draft[name_key] = name
+    return draft
+
+
+def build_calculation(draft: Mapping[str, Any], report_id: str, user_id: int) -> dict:
+    """Собирает тело POST calculations из черновика (ключи те же, что в user_data диалога)."""
+    return {
+        "fence": {
+            "typeId": draft.get("fence_type_id"),
+            "specId": draft.get("fence_spec_id"),
+            "variantId": draft.get("fence_variant_id"),
+            "length": draft.get("fence_length"),
+            "accessories": draft.get("fence_accessories_chosen", []),
+        },
+        "gates": {
+            "needGates": draft.get("need_gates"),
+            "specId": draft.get("gate_spec_id"),
+            "typeId": draft.get("gate_type_id"),
+            "variantId": draft.get("gate_variant_id"),
+            "automation": draft.get("gate_automation", False),
+            "accessories": draft.get("gate_accessories_chosen", []),
+        },
+        "mountingId": draft.get("mounting_id"),
+        "report_id": report_id,
+        "user_id": user_id,
+    }
+
+
+async def submit_calculation(post_data: dict, client: BackendClient = backend, speculative: bool = False) -> bool:
+    """report_id служит ключом идемпотентности: бэкенд получает его в Idempotency-Key."""
+    report_id = post_data["report_id"]
+    if report_id in _submitted:
+        logger.info(f"Calculation {report_id} was already submitted, skipping duplicate")
+        return True
+
+    logger.info(post_data)
+    headers = {"Idempotency-Key": report_id}
+    if speculative:
+        headers[SPECULATIVE_HEADER] = "1"
+    async with client.request("POST", "calculations", json=post_data, headers=headers) as response:
+        accepted = response.status == 200
+
+    if accepted:
+        _submitted[report_id] = None
+        while len(_submitted) > MAX_REMEMBERED_SUBMISSIONS:
+            _submitted.popitem(last=False)
+    return accepted
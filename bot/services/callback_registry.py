@@ -0,0 +1,93 @@
+import itertools
+import secrets
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable, Optional
+
+TOKEN_PREFIX = "~"
+
+_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+@dataclass(frozen=True, slots=True)
+class FenceSpecChoice:
+    spec_id: int
+    height: float
+
+
+@dataclass(frozen=True, slots=True)
+class GateSpecChoice:
+    spec_id: int
+    height: float
+    width: float
+
+
+@dataclass(frozen=True, slots=True)
+class AccessorySpecChoice:
+    spec_id: int
+    dimension: str
+
+
+def _base36(number: int) -> str:
+    if number == 0:
+        return "0"
+    digits = []
+    while number:
+        number, rem = divmod(number, 36)
+        digits.append(_ALPHABET[rem])
+    return "".join(reversed(digits))
+
+
+class CallbackRegistry:
+    """
+    Выдаёт короткие непрозрачные токены для callback_data и хранит
+    соответствующие им payload'ы в ограниченной LRU-таблице.
+
+    Токен содержит эпоху процесса, поэтому кнопки, выданные до рестарта,
+    никогда не совпадут с новыми и попадут в ветку «кнопка устарела».
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        self._maxsize = maxsize
+        self._payloads: OrderedDict[str, Hashable] = OrderedDict()
+        self._tokens: dict[Hashable, str] = {}
+        self._counter = itertools.count()
+        self._epoch = TOKEN_PREFIX + secrets.token_hex(2) + "."
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def issue(self, payload: Hashable) -> str:
+        token = self._tokens.get(payload)
+        if token is not None:
+            self._payloads.move_to_end(token)
+            return token
+
+        token = self._epoch + _base36(next(self._counter))
+        self._payloads[token] = payload
+        self._tokens[payload] = token
+
+        if len(self._payloads) > self._maxsize:
+            _, evicted = self._payloads.popitem(last=False)
+            del self._tokens[evicted]
+        return token
+
+    def is_expired(self, data: object) -> bool:
+        """Токен реестра, которого в нём уже нет: вытеснен или выдан до рестарта."""
+        return isinstance(data, str) and data.startswith(TOKEN_PREFIX) and data not in self._payloads
+
+    def carries(self, kind: type) -> Callable[[object], bool]:
+        """Фильтр для CallbackQueryHandler: живой токен, за которым стоит payload типа kind."""
+        def check(data: object) -> bool:
+            return isinstance(data, str) and isinstance(self._payloads.get(data), kind)
+
+        return check
+
+    def resolve(self, token: str) -> Optional[Hashable]:
+        payload = self._payloads.get(token)
+        if payload is not None:
+            self._payloads.move_to_end(token)
+        return payload
+
+
+callback_registry = CallbackRegistry()
@@ -0,0 +1,343 @@
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+import aiohttp
+from config import config
+
+from .backend import BackendClient, BackendStatusError, CatalogDelta, backend
+from .snapshot import CatalogSnapshot, encode_items
+
+logger = logging.getLogger(__name__)
+
+CATALOG_TTL_SECONDS = 300
+# пока бэкенд недоступен, устаревшую запись отдаём без повторных попыток столько секунд
+DEGRADED_RETRY_SECONDS = 30
+SNAPSHOT_DEBOUNCE_SECONDS = 5
+
+# на эти ответы бэкенд не умеет отдавать изменения — больше не спрашиваем
+_NO_DELTA_STATUSES = frozenset({400, 404, 405, 501})
+
+# общий счётчик: (key, version) однозначен, даже если каталогов несколько (по одному на бэкенд)
+_versions = itertools.count(1)
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogChanges:
+    """Чем версия записи отличается от previous_version: id изменённых/новых и удалённых позиций."""
+    previous_version: int
+    upserted: frozenset
+    deleted: frozenset
+
+
+@dataclass(slots=True)
+class CatalogEntry:
+    key: str
+    version: int
+    fetched_at: float
+    items: Any
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    cursor: Optional[str] = None
+    # None — изменения неизвестны (первая загрузка, позиции без id), перестраивать всё
+    changes: Optional[CatalogChanges] = None
+
+
+class Catalog:
+    """
+    Кэш справочников бэкенда (типы, популярные размеры, варианты, аксессуары, монтаж).
+
+    Каждая запись получает номер версии; версия меняется только тогда,
+    когда после обновления данные действительно отличаются, поэтому всё,
+    что построено по записи (клавиатуры, страницы), можно кэшировать по (key, version).
+
+    С snapshot каталог после рестарта сразу отдаёт записи из снимка на диске
+    (и обновляет их в фоне), а пока бэкенд лежит — работает на последних данных.
+
+    Если бэкенд выдал курсор, обновление запрашивает только изменения с него
+    (BackendClient.get_changes); иначе полный список сравнивается с прежним по id.
+    В обоих случаях новая версия несёт changes, чтобы построенное по записи
+    можно было обновить точечно.
+    """
+
+    def __init__(
+            self,
+            client: BackendClient,
+            ttl: float = CATALOG_TTL_SECONDS,
+            snapshot: Optional[CatalogSnapshot] = None,
+    ):
+        self._client = client
+        self._ttl = ttl
+        self._snapshot = snapshot
+        self._entries: dict[str, CatalogEntry] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._background: set[asyncio.Task] = set()
+        self._snapshot_task: Optional[asyncio.Task] = None
+        self._snapshot_dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.delta_syncs = 0
+        self.snapshot_hits = 0
+        self.degraded: set[str] = set()
+        self._no_delta: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> CatalogEntry:
+        entry = self._entries.get(key)
+        if entry is None and self._snapshot is not None:
+            entry = self._from_snapshot(key)
+            if entry is not None:
+                self.snapshot_hits += 1
+                self._refresh_in_background(key)
+                return entry
+
+        if entry is not None and time.monotonic() - entry.fetched_at < self._ttl:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.fetched_at < self._ttl:
+                return entry
+            return await self._refresh(key, entry)
+
+    async def _refresh(self, key: str, previous: CatalogEntry | None) -> CatalogEntry:
+        try:
+            entry = None
+            if previous is not None and previous.cursor and key not in self._no_delta:
+                entry = await self._sync_changes(key, previous)
+            if entry is None:
+                entry = await self._fetch(key, previous)
+        except (aiohttp.ClientError, asyncio.TimeoutError, BackendStatusError) as e:
+            if previous is None or (isinstance(e, BackendStatusError) and e.status < 500):
+                raise
+            if key not in self.degraded:
+                logger.warning(f"Backend unavailable for {key}, serving stale catalog: {e}")
+                self.degraded.add(key)
+            previous.fetched_at = time.monotonic() - self._ttl + DEGRADED_RETRY_SECONDS
+            return previous
+
+        if key in self.degraded:
+            self.degraded.discard(key)
+            logger.info(f"Backend is back for {key}")
+        return entry
+
+    async def _sync_changes(self, key: str, previous: CatalogEntry) -> Optional[CatalogEntry]:
+        """Новая запись по изменениям с курсора; None — нужен полный список."""
+        try:
+            delta = await self._client.get_changes(key, previous.cursor)
+        except BackendStatusError as e:
+            if e.status not in _NO_DELTA_STATUSES:
+                raise
+            logger.info(f"Backend has no change feed for {key} ({e.status}), using full refresh")
+            self._no_delta.add(key)
+            return None
+        if delta is None:
+            logger.info(f"Change cursor for {key} expired, using full refresh")
+            return None
+
+        self.delta_syncs += 1
+        previous.fetched_at = time.monotonic()
+        if not delta.upserted and not delta.deleted:
+            previous.cursor = delta.cursor
+            return previous
+
+        items = _apply_delta(previous.items, delta)
+        if items is None:
+            return None
+        changes = CatalogChanges(
+            previous.version,
+            frozenset(item["id"] for item in delta.upserted),
+            frozenset(delta.deleted),
+        )
+        return self._install(key, items, previous.etag, previous.last_modified, delta.cursor, changes)
+
+    async def _fetch(self, key: str, previous: CatalogEntry | None) -> CatalogEntry:
+        if previous is None:
+            result = await self._client.get_list_conditional(key)
+        else:
+            result = await self._client.get_list_conditional(key, previous.etag, previous.last_modified)
+        now = time.monotonic()
+
+        # 304 — данные не изменились, просто продлеваем запись
+        if result.not_modified:
+            self.not_modified += 1
+            previous.fetched_at = now
+            return previous
+
+        if previous is not None and previous.items == result.items:
+            previous.fetched_at = now
+            validators = (result.etag, result.last_modified, result.cursor)
+            if (previous.etag, previous.last_modified, previous.cursor) != validators:
+                previous.etag, previous.last_modified, previous.cursor = validators
+                self._schedule_snapshot()
+            return previous
+
+        changes = _diff(previous, result.items) if previous is not None else None
+        return self._install(key, result.items, result.etag, result.last_modified, result.cursor, changes)
+
+    def _install(
+            self,
+            key: str,
+            items: list,
+            etag: Optional[str],
+            last_modified: Optional[str],
+            cursor: Optional[str],
+            changes: Optional[CatalogChanges],
+    ) -> CatalogEntry:
+        entry = CatalogEntry(key, next(_versions), time.monotonic(), items, etag, last_modified, cursor, changes)
+        self._entries[key] = entry
+        if changes is None:
+            logger.info(f"Catalog entry {key} refreshed to version {entry.version}")
+        else:
+            logger.info(
+                f"Catalog entry {key} refreshed to version {entry.version}: "
+                f"{len(changes.upserted)} changed, {len(changes.deleted)} deleted"
+            )
+        self._schedule_snapshot()
+        return entry
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+
+    def expire(self) -> None:
+        """В отличие от invalidate, записи остаются базой для запроса изменений."""
+        for entry in self._entries.values():
+            entry.fetched_at = float("-inf")
+
+    def _from_snapshot(self, key: str) -> Optional[CatalogEntry]:
+        loaded = self._snapshot.section(key)
+        if loaded is None:
+            return None
+        section, items = loaded
+        # запись сразу считается устаревшей: первым делом её перепроверят условным GET
+        entry = CatalogEntry(
+            key, next(_versions), float("-inf"), items, section.etag, section.last_modified, section.cursor
+        )
+        self._entries[key] = entry
+        return entry
+
+    def _refresh_in_background(self, key: str) -> None:
+        task = asyncio.create_task(self._background_refresh(key))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _background_refresh(self, key: str) -> None:
+        try:
+            await self.get(key)
+        except (aiohttp.ClientError, asyncio.TimeoutError, BackendStatusError) as e:
+            logger.warning(f"Background refresh of {key} failed: {e}")
+
+    def _schedule_snapshot(self) -> None:
+        if self._snapshot is None or self._snapshot.path is None:
+            return
+        self._snapshot_dirty = True
+        if self._snapshot_task is None or self._snapshot_task.done():
+            self._snapshot_task = asyncio.create_task(self._write_snapshots())
+
+    async def _write_snapshots(self) -> None:
+        # пачка обновлений подряд даёт одну запись файла
+        while self._snapshot_dirty:
+            await asyncio.sleep(SNAPSHOT_DEBOUNCE_SECONDS)
+            self._snapshot_dirty = False
+            await self._write_snapshot()
+
+    async def _write_snapshot(self) -> None:
+        entries = list(self._entries.values())
+        started = time.perf_counter()
+        try:
+            size = await asyncio.to_thread(
+                self._snapshot.write,
+                ((e.key, e.etag, e.last_modified, e.cursor, encode_items(e.items)) for e in entries),
+            )
+        except OSError as e:
+            logger.error(f"Failed to write catalog snapshot: {e}")
+            return
+        logger.info(
+            f"Catalog snapshot written: {len(entries)} sections, {size / 1024:.0f} KB "
+            f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+
+    async def fence_types(self) -> CatalogEntry:
+        return await self.get("fences/types")
+
+    async def fence_popular_specs(self, type_id: int) -> CatalogEntry:
+        return await self.get(f"fences/popular-specs?typeId={type_id}")
+
+    async def all_fences(self) -> CatalogEntry:
+        return await self.get("fences")
+
+    async def fence_variants(self, type_id: int, height: float) -> CatalogEntry:
+        return await self.get(f"fences?typeId={type_id}&height={height}")
+
+    async def accessories(self, accessoriable_type: str) -> CatalogEntry:
+        return await self.get(f"accessories?accessoriableType={accessoriable_type}")
+
+    async def gate_types(self) -> CatalogEntry:
+        return await self.get("gates/types")
+
+    async def all_gates(self) -> CatalogEntry:
+        return await self.get("gates")
+
+    async def gate_popular_specs(self, type_id: int) -> CatalogEntry:
+        return await self.get(f"gates/popular-specs?typeId={type_id}")
+
+    async def gate_variants(self, type_id: int, height: float, width: float) -> CatalogEntry:
+        return await self.get(f"gates?typeId={type_id}&height={height}&width={width}")
+
+    async def mountings(self) -> CatalogEntry:
+        return await self.get("mountings")
+
+
+def _ids(items: list) -> Optional[list]:
+    if not all(isinstance(item, dict) and "id" in item for item in items):
+        return None
+    return [item["id"] for item in items]
+
+
+def _apply_delta(items: list, delta: CatalogDelta) -> Optional[list]:
+    """Прежний список с применёнными изменениями; новые позиции — в конец. None — позиции без id."""
+    if _ids(items) is None or _ids(delta.upserted) is None:
+        return None
+    upserted = {item["id"]: item for item in delta.upserted}
+    deleted = set(delta.deleted)
+    result = []
+    for item in items:
+        if item["id"] in deleted:
+            continue
+        result.append(upserted.pop(item["id"], item))
+    result.extend(item for item in delta.upserted if item["id"] in upserted)
+    return result
+
+
+def _diff(previous: CatalogEntry, items: list) -> Optional[CatalogChanges]:
+    old_ids, new_ids = _ids(previous.items), _ids(items)
+    if old_ids is None or new_ids is None:
+        return None
+    old = dict(zip(old_ids, previous.items))
+    upserted = frozenset(item["id"] for item in items if old.get(item["id"]) != item)
+    return CatalogChanges(previous.version, upserted, frozenset(old.keys() - set(new_ids)))
+
+
+def snapshot_path(variant: str = "") -> Optional[Path]:
+    """variant отличает снимки каталогов разных бэкендов в одном процессе."""
+    if config.CATALOG_SNAPSHOT_FILE == "":
+        return None
+    if config.CATALOG_SNAPSHOT_FILE:
+        path = Path(config.CATALOG_SNAPSHOT_FILE)
+    else:
+        path = Path(__file__).parent.parent.parent / "data" / "catalog.snapshot"
+    return path.with_name(f"{path.stem}.{variant}{path.suffix}") if variant else path
+
+
+catalog = Catalog(backend, snapshot=CatalogSnapshot(snapshot_path()))
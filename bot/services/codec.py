@@ -0,0 +1,15 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен, stdlib json всегда доступен
+    orjson = None
+
+CODEC_NAME = "orjson" if orjson is not None else "json"
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,56 @@
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+PRESS_WINDOW_SECONDS = 5.0
+STUCK_PRESS_SECONDS = 60.0
+MAX_TRACKED_PRESSES = 10_000
+
+
+class PressGuard:
+    """
+    Отсекает повторные нажатия одной и той же кнопки: пока первое нажатие
+    обрабатывается и ещё window секунд после — повтор считается дублем.
+    Нажатие, которое так и не завершилось (исключение), через stuck_after
+    секунд перестаёт блокировать кнопку.
+    """
+
+    def __init__(
+            self,
+            window: float = PRESS_WINDOW_SECONDS,
+            stuck_after: float = STUCK_PRESS_SECONDS,
+            max_entries: int = MAX_TRACKED_PRESSES,
+    ):
+        self.window = window
+        self.stuck_after = stuck_after
+        self.max_entries = max_entries
+        # ключ нажатия -> (начало, конец или None пока в обработке)
+        self._presses: OrderedDict[Hashable, tuple[float, Optional[float]]] = OrderedDict()
+        self.suppressed = 0
+
+    def __len__(self) -> int:
+        return len(self._presses)
+
+    def begin(self, key: Hashable) -> bool:
+        now = time.monotonic()
+        press = self._presses.get(key)
+        if press is not None:
+            started, finished = press
+            busy = finished is None and now - started < self.stuck_after
+            if busy or (finished is not None and now - finished < self.window):
+                self.suppressed += 1
+                return False
+
+        self._presses[key] = (now, None)
+        self._presses.move_to_end(key)
+        while len(self._presses) > self.max_entries:
+            self._presses.popitem(last=False)
+        return True
+
+    def end(self, key: Hashable) -> None:
+        press = self._presses.get(key)
+        if press is not None and press[1] is None:
+            self._presses[key] = (press[0], time.monotonic())
+
+
+press_guard = PressGuard()
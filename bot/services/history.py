@@ -0,0 +1,156 @@
+import json
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from .callback_registry import callback_registry
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PER_USER = 50
+RECENT_LIMIT = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calculations (
+    id INTEGER PRIMARY KEY,
+    report_id TEXT NOT NULL UNIQUE,
+    user_id INTEGER NOT NULL,
+    chat_id INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    summary TEXT NOT NULL,
+    draft TEXT NOT NULL,
+    file_id TEXT,
+    parent_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS calculations_by_user ON calculations (user_id, created_at DESC);
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class HistoryAction:
+    """Кнопка в истории расчётов: open, send, repeat, length, mounting, automation."""
+    calc_id: int
+    action: str
+    value: Optional[int] = None
+
+
+@dataclass(frozen=True, slots=True)
+class HistoryRecord:
+    id: int
+    report_id: str
+    user_id: int
+    chat_id: int
+    created_at: float
+    summary: str
+    draft: dict
+    file_id: Optional[str]
+    # расчёт, копией которого этот является (правка из истории)
+    parent_id: Optional[int]
+
+
+class CalculationHistory:
+    """
+    Отправленные расчёты пользователя: черновик, report_id и file_id доставленного PDF.
+    Хранится в SQLite с индексом по (user_id, created_at), так что список последних
+    расчётов — один запрос по индексу, а повторная отправка отчёта по file_id
+    не трогает ни бэкенд, ни генерацию PDF. На пользователя хранится HISTORY_PER_USER записей.
+    """
+
+    def __init__(self, path: Optional[Path], per_user: int = HISTORY_PER_USER):
+        self._path = path
+        self._per_user = per_user
+        self._db: Optional[sqlite3.Connection] = None
+        self.resent = 0
+        self.resubmitted = 0
+
+    def record(
+            self,
+            report_id: str,
+            user_id: int,
+            chat_id: int,
+            draft: dict,
+            parent_id: Optional[int] = None,
+    ) -> Optional[int]:
+        try:
+            with self._connect() as db:
+                cursor = db.execute(
+                    "INSERT OR IGNORE INTO calculations "
+                    "(report_id, user_id, chat_id, created_at, summary, draft, parent_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (report_id, user_id, chat_id, time.time(), summarize(draft),
+                     json.dumps(draft, ensure_ascii=False), parent_id),
+                )
+                db.execute(
+                    "DELETE FROM calculations WHERE user_id = ? AND id NOT IN "
+                    "(SELECT id FROM calculations WHERE user_id = ? ORDER BY created_at DESC LIMIT ?)",
+                    (user_id, user_id, self._per_user),
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Failed to record calculation {report_id} in history: {e}")
+            return None
+        return cursor.lastrowid
+
+    def remember_file_id(self, report_id: str, file_id: str) -> None:
+        try:
+            with self._connect() as db:
+                db.execute("UPDATE calculations SET file_id = ? WHERE report_id = ?", (file_id, report_id))
+        except sqlite3.Error as e:
+            logger.error(f"Failed to save file_id of report {report_id}: {e}")
+
+    def recent(self, user_id: int, limit: int = RECENT_LIMIT) -> list[HistoryRecord]:
+        rows = self._connect().execute(
+            "SELECT * FROM calculations WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+            (user_id, limit),
+        ).fetchall()
+        return [_record(row) for row in rows]
+
+    def get(self, calc_id: int, user_id: int) -> Optional[HistoryRecord]:
+        """Только свой расчёт: чужой id даёт None."""
+        row = self._connect().execute(
+            "SELECT * FROM calculations WHERE id = ? AND user_id = ?", (calc_id, user_id)
+        ).fetchone()
+        return _record(row) if row is not None else None
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM calculations").fetchone()[0]
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            if self._path is not None:
+                self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self._path) if self._path is not None else ":memory:")
+            self._db.row_factory = sqlite3.Row
+            # WAL: запись в журнал без fsync на каждую транзакцию, читатели не ждут писателя
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+
+def _record(row: sqlite3.Row) -> HistoryRecord:
+    return HistoryRecord(
+        row["id"], row["report_id"], row["user_id"], row["chat_id"], row["created_at"],
+        row["summary"], json.loads(row["draft"]), row["file_id"], row["parent_id"],
+    )
+
+
+def summarize(draft: dict[str, Any]) -> str:
+    parts = [f"{draft.get('fence_variant_name', 'Забор')}, {draft.get('fence_length', 0):g} м"]
+    if draft.get("gate_variant_id"):
+        gate = f"ворота {draft.get('gate_variant_name', '')}".rstrip()
+        parts.append(gate + (" с автоматикой" if draft.get("gate_automation") else ""))
+    if draft.get("mounting_name"):
+        parts.append(draft["mounting_name"].lower())
+    return ", ".join(parts)
+
+
+def is_history_callback(data: object) -> bool:
+    return isinstance(data, str) and isinstance(callback_registry.resolve(data), HistoryAction)
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from config import config
+
+from .metrics import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+SHUTDOWN_DRAIN_SECONDS = 15
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+@dataclass(slots=True, eq=False)
+class Job:
+    name: str
+    factory: Callable[[], Awaitable[Any]]
+    timeout: Optional[float]
+    key: Optional[str]
+    submitted_at: float
+    task: Optional[asyncio.Task] = None
+    cancelled: bool = False
+
+
+class JobRunner:
+    """
+    Фоновые задачи (доставка отчётов и т.п.) на фиксированном пуле воркеров
+    с ограниченной очередью, таймаутом на задачу и отменой по ключу,
+    чтобы хэндлер мог сразу вернуть управление пользователю.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self._queue: asyncio.Queue[Job] = asyncio.Queue(queue_size)
+        self._worker_tasks: list[asyncio.Task] = []
+        self._by_key: dict[str, Job] = {}
+        self._accepting = True
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self.wait_latency = LatencyWindow(512)
+        self.run_latency = LatencyWindow(512)
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def accepting(self) -> bool:
+        return self._accepting
+
+    def start(self) -> None:
+        if self._worker_tasks:
+            return
+        self._accepting = True
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(
+            self,
+            name: str,
+            factory: Callable[[], Awaitable[Any]],
+            timeout: Optional[float] = None,
+            key: Optional[str] = None,
+    ) -> Job:
+        if not self._accepting:
+            raise JobQueueFull("Job runner is shutting down")
+        job = Job(name, factory, timeout, key, time.monotonic())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Job queue is full ({self._queue.maxsize})")
+        if key is not None:
+            self._by_key[key] = job
+        return job
+
+    def cancel(self, key: str) -> bool:
+        job = self._by_key.get(key)
+        if job is None:
+            return False
+        job.cancelled = True
+        if job.task is not None:
+            job.task.cancel()
+        return True
+
+    def is_cancelled(self, key: str) -> bool:
+        """Задачу с этим ключом отменили через cancel, а не по таймауту."""
+        job = self._by_key.get(key)
+        return job is not None and job.cancelled
+
+    async def shutdown(self, timeout: float = SHUTDOWN_DRAIN_SECONDS) -> None:
+        self._accepting = False
+        if not self._worker_tasks:
+            return
+        if self.running or self.queued:
+            logger.info(f"Draining {self.running} running and {self.queued} queued jobs")
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"{self.running} jobs still running after {timeout}s, cancelling")
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                if not job.cancelled:
+                    await self._run(job)
+                else:
+                    self.cancelled += 1
+            finally:
+                if job.key is not None and self._by_key.get(job.key) is job:
+                    del self._by_key[job.key]
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        started = time.monotonic()
+        self.wait_latency.observe(started - job.submitted_at)
+        self.running += 1
+        job.task = asyncio.create_task(job.factory(), name=job.name)
+        try:
+            await asyncio.wait_for(job.task, job.timeout)
+            self.completed += 1
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            logger.warning(f"Job {job.name} timed out after {job.timeout}s")
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise  # останавливают сам воркер
+            self.cancelled += 1
+            logger.info(f"Job {job.name} was cancelled")
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Job {job.name} failed: {e}", exc_info=e)
+        finally:
+            self.running -= 1
+            self.run_latency.observe(time.monotonic() - started)
+
+
+job_runner = JobRunner(config.JOB_WORKERS, config.JOB_QUEUE_SIZE)
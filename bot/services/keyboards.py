@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from .callback_registry import TOKEN_PREFIX, callback_registry
+
+PAGE_SIZE = 8
+PAGE_NOOP = "page_noop"
+
+ButtonRows = list[list[InlineKeyboardButton]]
+
+
+@dataclass(frozen=True, slots=True)
+class PageTurn:
+    key: str
+    version: int
+    page: int
+
+
+def is_page_turn(data: object) -> bool:
+    if data == PAGE_NOOP:
+        return True
+    return isinstance(data, str) and isinstance(callback_registry.resolve(data), PageTurn)
+
+
+class KeyboardPager:
+    """
+    Разбивает длинные списки кнопок на страницы и кэширует готовые
+    InlineKeyboardMarkup по (key, version) записи каталога. Страницы, чьи токены
+    вытеснены из реестра, из кэша выбрасываются: их кнопки вели бы в «устарела».
+    """
+
+    def __init__(self, page_size: int = PAGE_SIZE, max_lists: int = 512):
+        self._page_size = page_size
+        self._max_lists = max_lists
+        # (key, version) -> (страницы, токены реестра на их кнопках)
+        self._pages: OrderedDict[tuple[str, int], tuple[tuple[InlineKeyboardMarkup, ...], tuple[str, ...]]] = \
+            OrderedDict()
+
+    def pages(
+            self,
+            key: str,
+            version: int,
+            build_rows: Callable[[], ButtonRows],
+            footer: Sequence[Sequence[InlineKeyboardButton]] = (),
+    ) -> tuple[InlineKeyboardMarkup, ...]:
+        cache_key = (key, version)
+        cached = self._live(cache_key)
+        if cached is not None:
+            self._pages.move_to_end(cache_key)
+            return cached
+
+        rows = build_rows()
+        chunks = [rows[i:i + self._page_size] for i in range(0, len(rows), self._page_size)] or [[]]
+        total = len(chunks)
+
+        markups = []
+        for number, chunk in enumerate(chunks):
+            keyboard = list(chunk)
+            if total > 1:
+                keyboard.append(self._nav_row(key, version, number, total))
+            keyboard.extend(list(row) for row in footer)
+            markups.append(InlineKeyboardMarkup(keyboard))
+
+        result = tuple(markups)
+        tokens = tuple(
+            button.callback_data
+            for markup in result for row in markup.inline_keyboard for button in row
+            if isinstance(button.callback_data, str) and button.callback_data.startswith(TOKEN_PREFIX)
+        )
+        self._pages[cache_key] = (result, tokens)
+        if len(self._pages) > self._max_lists:
+            self._pages.popitem(last=False)
+        return result
+
+    def first_page(self, *args, **kwargs) -> InlineKeyboardMarkup:
+        return self.pages(*args, **kwargs)[0]
+
+    def page(self, turn: PageTurn) -> Optional[InlineKeyboardMarkup]:
+        pages = self._live((turn.key, turn.version))
+        if pages is None or not 0 <= turn.page < len(pages):
+            return None
+        return pages[turn.page]
+
+    def _live(self, cache_key: tuple[str, int]) -> Optional[tuple[InlineKeyboardMarkup, ...]]:
+        cached = self._pages.get(cache_key)
+        if cached is None:
+            return None
+        pages, tokens = cached
+        if not all(callback_registry.resolve(token) is not None for token in tokens):
+            del self._pages[cache_key]
+            return None
+        return pages
+
+    @staticmethod
+    def _nav_row(key: str, version: int, number: int, total: int) -> list[InlineKeyboardButton]:
+        row = []
+        if number > 0:
+            row.append(InlineKeyboardButton(
+                "◀️", callback_data=callback_registry.issue(PageTurn(key, version, number - 1))
+            ))
+        row.append(InlineKeyboardButton(f"{number + 1}/{total}", callback_data=PAGE_NOOP))
+        if number < total - 1:
+            row.append(InlineKeyboardButton(
+                "▶️", callback_data=callback_registry.issue(PageTurn(key, version, number + 1))
+            ))
+        return row
+
+
+keyboard_pager = KeyboardPager()
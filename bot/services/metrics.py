@@ -0,0 +1,96 @@
+import time
+from array import array
+from collections import Counter
+from typing import Callable, Optional
+
+# брошенный диалог перестаёт считаться, как и место в допуске (admission.SESSION_IDLE_SECONDS)
+DIALOG_IDLE_SECONDS = 15 * 60
+
+
+class LatencyWindow:
+    """
+    Кольцевой буфер последних замеров в предвыделенном array('d'):
+    запись — одно присваивание по индексу, без блокировок и аллокаций.
+    """
+
+    def __init__(self, size: int = 2048):
+        self._size = size
+        self._values = array("d", bytes(8 * size))
+        self._index = 0
+        self._count = 0
+
+    def observe(self, seconds: float) -> None:
+        self._values[self._index] = seconds
+        self._index = (self._index + 1) % self._size
+        if self._count < self._size:
+            self._count += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def percentiles(self, *quantiles: float, last: Optional[int] = None) -> list[float]:
+        """last — считать только по последним N замерам (свежая картина, а не вся история окна)."""
+        count = self._count if last is None else min(last, self._count)
+        if not count:
+            return [0.0 for _ in quantiles]
+        if count == self._count:
+            values = self._values[:count]
+        else:
+            start = (self._index - count) % self._size
+            values = self._values[start:start + count] if start + count <= self._size else \
+                self._values[start:] + self._values[:self._index]
+        ordered = sorted(values)
+        top = count - 1
+        return [ordered[min(top, int(round(q * top)))] for q in quantiles]
+
+
+# Источники глубины исходящих очередей: имя -> функция, возвращающая текущую длину.
+send_queues: dict[str, Callable[[], int]] = {}
+
+
+def register_send_queue(name: str, depth: Callable[[], int]) -> None:
+    send_queues[name] = depth
+
+
+# Время обработки по шагам диалога расчёта: имя шага -> окно замеров.
+step_latency: dict[str, LatencyWindow] = {}
+
+
+def observe_step(name: str, seconds: float) -> None:
+    window = step_latency.get(name)
+    if window is None:
+        window = step_latency[name] = LatencyWindow(512)
+    window.observe(seconds)
+
+
+class DialogSteps:
+    """
+    Текущий шаг диалога расчёта по пользователям — для /stats. Переходы записывает
+    Flow, так что внутренние структуры ConversationHandler читать не нужно.
+    """
+
+    def __init__(self, idle_seconds: float = DIALOG_IDLE_SECONDS):
+        self._idle_seconds = idle_seconds
+        # user_id -> шаг и user_id -> когда на него перешёл: два словаря вместо кортежа (шаг, время),
+        # переход на шаг не собирает кортеж, а перезаписывает значения по ключу
+        self._steps: dict[int, str] = {}
+        self._entered_at: dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._steps)
+
+    def enter(self, user_id: int, step: str) -> None:
+        self._steps[user_id] = step
+        self._entered_at[user_id] = time.monotonic()
+
+    def leave(self, user_id: int) -> None:
+        self._steps.pop(user_id, None)
+        self._entered_at.pop(user_id, None)
+
+    def counts(self) -> Counter:
+        now = time.monotonic()
+        expired = [user_id for user_id, at in self._entered_at.items() if now - at > self._idle_seconds]
+        for user_id in expired:
+            del self._steps[user_id]
+            del self._entered_at[user_id]
+        return Counter(self._steps.values())
@@ -0,0 +1,184 @@
+import asyncio
+import csv
+import html
+import io
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from .callback_registry import callback_registry
+from .catalog import Catalog, CATALOG_TTL_SECONDS, catalog
+
+logger = logging.getLogger(__name__)
+
+PAGE_CHARS = 3500
+PRICE_FILE_CALLBACK = "price_list_file"
+PRICE_NOOP_CALLBACK = "price_list_noop"
+PRICE_FILE_NAME = "prices.csv"
+
+
+@dataclass(frozen=True, slots=True)
+class PriceListPage:
+    version: tuple[int, ...]
+    page: int
+
+
+@dataclass(slots=True)
+class RenderedPriceList:
+    version: tuple[int, ...]
+    pages: tuple[str, ...]
+    markups: tuple[Optional[InlineKeyboardMarkup], ...]
+    document: bytes
+    # file_id свой у каждого бота, а прайс-лист общий для всех ботов на бэкенде
+    file_ids: dict[int, str] = field(default_factory=dict)
+
+
+def _format_price(item: dict) -> str:
+    price = item.get("price")
+    if price is None:
+        return f"• {html.escape(item['name'])}"
+    return f"• {html.escape(item['name'])} — {price} ₽"
+
+
+def _paginate(lines: list[str], limit: int = PAGE_CHARS) -> list[str]:
+    pages, current, size = [], [], 0
+    for line in lines:
+        if current and size + len(line) + 1 > limit:
+            pages.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        pages.append("\n".join(current))
+    return pages or ["Прайс-лист пока пуст."]
+
+
+class PriceListService:
+    """
+    Прайс-лист из кэша каталога: рендерится один раз на версию каталога,
+    запросы пользователей обслуживаются из готовых страниц без обращений к бэкенду.
+    """
+
+    def __init__(self, source: Catalog, ttl: float = CATALOG_TTL_SECONDS):
+        self._catalog = source
+        self._ttl = ttl
+        self._rendered: Optional[RenderedPriceList] = None
+        self._rendered_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        # key записи каталога -> (версия, строки раздела, строки CSV, id -> номер позиции);
+        # неизменённые разделы и позиции не форматируем заново
+        self._sections: dict[str, tuple[int, list[str], list[list], dict]] = {}
+
+    async def current(self) -> RenderedPriceList:
+        if self._rendered is None:
+            await self.refresh()
+        elif time.monotonic() - self._rendered_at >= self._ttl and self._refreshing is None:
+            self._refreshing = asyncio.create_task(self._background_refresh())
+        return self._rendered
+
+    def page(self, turn: PriceListPage) -> Optional[tuple[str, Optional[InlineKeyboardMarkup]]]:
+        rendered = self._rendered
+        if rendered is None or rendered.version != turn.version or not 0 <= turn.page < len(rendered.pages):
+            return None
+        return rendered.pages[turn.page], rendered.markups[turn.page]
+
+    def remember_file_id(self, version: tuple[int, ...], bot_id: int, file_id: str) -> None:
+        if self._rendered is not None and self._rendered.version == version:
+            self._rendered.file_ids[bot_id] = file_id
+
+    async def refresh(self) -> RenderedPriceList:
+        sections = (
+            ("Заборы", await self._catalog.all_fences()),
+            ("Ворота", await self._catalog.all_gates()),
+            ("Аксессуары для забора", await self._catalog.accessories("fence")),
+            ("Аксессуары для ворот", await self._catalog.accessories("gate")),
+            ("Монтаж", await self._catalog.mountings()),
+        )
+        version = tuple(entry.version for _, entry in sections)
+        self._rendered_at = time.monotonic()
+
+        if self._rendered is not None and self._rendered.version == version:
+            return self._rendered
+
+        self._rendered = self._render(version, sections)
+        logger.info(f"Price list rendered: version {version}, {len(self._rendered.pages)} pages")
+        return self._rendered
+
+    async def _background_refresh(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error(f"Price list refresh failed: {e}")
+        finally:
+            self._refreshing = None
+
+    def _section(self, title: str, entry) -> tuple[list[str], list[list]]:
+        cached = self._sections.get(entry.key)
+        if cached is not None and cached[0] == entry.version:
+            return cached[1], cached[2]
+
+        changes = entry.changes
+        reuse = cached is not None and changes is not None and cached[0] == changes.previous_version
+        lines, rows, positions = [], [], {}
+        for item in entry.items:
+            item_id = item.get("id")
+            old = cached[3].get(item_id) if reuse and item_id not in changes.upserted else None
+            if old is not None:
+                lines.append(cached[1][old])
+                rows.append(cached[2][old])
+            else:
+                lines.append(_format_price(item))
+                rows.append([title, item["name"], item.get("price", "")])
+            if item_id is not None:
+                positions[item_id] = len(lines) - 1
+        self._sections[entry.key] = (entry.version, lines, rows, positions)
+        return lines, rows
+
+    def _render(self, version: tuple[int, ...], sections) -> RenderedPriceList:
+        lines = []
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=";")
+        writer.writerow(["Раздел", "Наименование", "Цена, ₽"])
+
+        for title, entry in sections:
+            if not entry.items:
+                continue
+            section_lines, rows = self._section(title, entry)
+            lines.append(f"\n<b>{title}</b>" if lines else f"<b>{title}</b>")
+            lines.extend(section_lines)
+            writer.writerows(rows)
+
+        pages = _paginate(lines)
+        total = len(pages)
+        markups = []
+        for number in range(total):
+            row = []
+            if number > 0:
+                row.append(InlineKeyboardButton(
+                    "◀️", callback_data=callback_registry.issue(PriceListPage(version, number - 1))
+                ))
+            if total > 1:
+                row.append(InlineKeyboardButton(f"{number + 1}/{total}", callback_data=PRICE_NOOP_CALLBACK))
+            if number < total - 1:
+                row.append(InlineKeyboardButton(
+                    "▶️", callback_data=callback_registry.issue(PriceListPage(version, number + 1))
+                ))
+            keyboard = [row] if row else []
+            keyboard.append([InlineKeyboardButton("📄 Скачать прайс", callback_data=PRICE_FILE_CALLBACK)])
+            markups.append(InlineKeyboardMarkup(keyboard))
+
+        # BOM, чтобы Excel правильно распознал кириллицу
+        document = buffer.getvalue().encode("utf-8-sig")
+        return RenderedPriceList(version, tuple(pages), tuple(markups), document)
+
+
+def is_price_list_callback(data: object) -> bool:
+    if data in (PRICE_FILE_CALLBACK, PRICE_NOOP_CALLBACK):
+        return True
+    return isinstance(data, str) and isinstance(callback_registry.resolve(data), PriceListPage)
+
+
+price_list = PriceListService(catalog)
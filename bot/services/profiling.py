@@ -0,0 +1,107 @@
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_RATE = 0.1
+DEFAULT_INTERVAL = 0.005
+PROFILES_DIR = Path(__file__).parent.parent.parent / "logs" / "profiles"
+
+
+class SamplingProfiler:
+    """
+    Сэмплирующий профайлер для хэндлеров.
+
+    Выбранная доля вызовов выполняется через run(); фоновый поток периодически
+    снимает стек главного потока и, если внутри стека есть кадр run(),
+    относит сэмпл к его метке. Результат — folded stacks для flamegraph.pl / speedscope.
+    Когда профайлер выключен, хэндлеры платят только за проверку флага.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, output_dir: Path = PROFILES_DIR):
+        self.enabled = False
+        self.sample_rate = DEFAULT_SAMPLE_RATE
+        self._interval = interval
+        self._output_dir = output_dir
+        self._stacks: dict[str, Counter] = defaultdict(Counter)
+        self._invocations: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._target_thread_id: Optional[int] = None
+        self._started_at = 0.0
+
+    def should_sample(self) -> bool:
+        return self.enabled and random.random() < self.sample_rate
+
+    async def run(self, label: str, func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        self._invocations[label] += 1
+        return await func(*args, **kwargs)
+
+    def start(self, sample_rate: Optional[float] = None) -> None:
+        if sample_rate is not None:
+            self.sample_rate = max(0.0, min(1.0, sample_rate))
+        if self.enabled:
+            return
+        self._target_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._started_at = time.time()
+        self._thread = threading.Thread(target=self._sample_loop, name="handler-profiler", daemon=True)
+        self._thread.start()
+        self.enabled = True
+        logger.info(f"Profiler started, sample rate {self.sample_rate}")
+
+    def stop(self) -> None:
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        self._thread = None
+        logger.info("Profiler stopped")
+
+    def summary(self) -> list[tuple[str, int, int]]:
+        labels = set(self._stacks) | set(self._invocations)
+        rows = [(label, self._invocations[label], sum(self._stacks[label].values())) for label in labels]
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return rows
+
+    def dump(self, reset: bool = True) -> Optional[Path]:
+        if not self._stacks:
+            return None
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        path = self._output_dir / f"handlers-{time.strftime('%Y%m%d-%H%M%S')}.folded"
+        with path.open("w", encoding="utf-8") as fh:
+            for label, stacks in sorted(self._stacks.items()):
+                for stack, count in stacks.most_common():
+                    fh.write(f"{label};{stack} {count}\n")
+        if reset:
+            self._stacks.clear()
+            self._invocations.clear()
+        logger.info(f"Profile dumped to {path}")
+        return path
+
+    def _sample_loop(self) -> None:
+        run_code = SamplingProfiler.run.__code__
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._target_thread_id)
+            stack = []
+            label = None
+            while frame is not None:
+                if frame.f_code is run_code:
+                    label = frame.f_locals.get("label")
+                    break
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if label is not None and stack:
+                self._stacks[label][";".join(reversed(stack))] += 1
+
+
+profiler = SamplingProfiler()
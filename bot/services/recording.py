@@ -0,0 +1,65 @@
+import base64
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class BackendRecorder:
+    """
+    Записывает каждый запрос к бэкенду и ответ на него в JSON Lines файл —
+    эти фикстуры потом отдаёт backend_replay.py.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+
+    async def record(
+            self,
+            method: str,
+            path: str,
+            payload: Any,
+            response: aiohttp.ClientResponse,
+            elapsed: float,
+    ) -> None:
+        body = await response.read()
+        entry = {
+            "method": method,
+            "path": path,
+            "request": payload,
+            "status": response.status,
+            "content_type": response.content_type,
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "recorded_at": time.time(),
+        }
+        try:
+            entry["body"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["body_b64"] = base64.b64encode(body).decode("ascii")
+
+        try:
+            with self._path.open("a", encoding="utf-8") as fh:
+                fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.error(f"Failed to record backend traffic to {self._path}: {e}")
+
+
+def load_fixtures(path: Path) -> list[dict]:
+    with path.open(encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def fixture_body(entry: dict) -> bytes:
+    if "body_b64" in entry:
+        return base64.b64decode(entry["body_b64"])
+    return entry.get("body", "").encode("utf-8")
+
+
+def recorder_from_path(path: Optional[str]) -> Optional[BackendRecorder]:
+    return BackendRecorder(Path(path)) if path else None
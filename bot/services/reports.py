@@ -0,0 +1,297 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+import aiohttp
+from telegram import Bot
+from telegram.error import RetryAfter
+
+from . import codec
+from .backend import BackendClient, backend
+from .history import CalculationHistory
+from .jobs import JobQueueFull, JobRunner, job_runner
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+REPORT_DEADLINE_SECONDS = 300
+REPORT_POLL_INTERVAL = 10
+# одна задача — один опрос статуса, при готовности со скачиванием и отправкой PDF
+REPORT_POLL_TIMEOUT = 60
+# очередь задач переполнена — постановка повторяется с растущей паузой
+REPORT_RETRY_SECONDS = 5
+REPORT_RETRY_MAX_SECONDS = 60
+# изменения списка ожидающих отчётов копятся и пишутся в файл не чаще раза в секунду
+PENDING_SAVE_DEBOUNCE_SECONDS = 1.0
+
+
+@dataclass(slots=True)
+class PendingReport:
+    report_id: str
+    chat_id: int
+    started_at: float
+    # отсчитывается с первого опроса: ожидание в очереди задач дедлайн не съедает
+    deadline: Optional[float] = None
+
+
+class PendingReports:
+    """
+    Отчёты, которые ещё не доставлены пользователю. Хранятся в JSON-файле,
+    чтобы после рестарта доставку можно было продолжить. Файл переписывается
+    в фоне пачками; flush при остановке дописывает последние изменения.
+    """
+
+    def __init__(self, path: Optional[Path], deadline_seconds: float = REPORT_DEADLINE_SECONDS):
+        self._path = path
+        self._deadline_seconds = deadline_seconds
+        self._reports: dict[str, PendingReport] = {}
+        self._save_task: Optional[asyncio.Task] = None
+        self._dirty = False
+        # запись в потоке может закончиться позже flush — версия не даёт затереть файл старым списком
+        self._version = 0
+        self._written_version = 0
+        self._write_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._reports)
+
+    def __contains__(self, report_id: str) -> bool:
+        return report_id in self._reports
+
+    def __iter__(self):
+        return iter(list(self._reports.values()))
+
+    def track(self, report_id: str, chat_id: int) -> PendingReport:
+        report = PendingReport(report_id, chat_id, time.time())
+        self._reports[report_id] = report
+        self._save()
+        return report
+
+    def start_deadline(self, report: PendingReport) -> None:
+        report.deadline = time.time() + self._deadline_seconds
+        self._save()
+
+    def done(self, report_id: str) -> None:
+        if self._reports.pop(report_id, None) is not None:
+            self._save()
+
+    def ages(self) -> list[tuple[str, float]]:
+        now = time.time()
+        return sorted(
+            ((report.report_id, now - report.started_at) for report in self._reports.values()),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+
+    def load(self) -> None:
+        if self._path is None or not self._path.exists():
+            return
+        try:
+            raw = json.loads(self._path.read_text(encoding="utf-8"))
+            self._reports = {item["report_id"]: PendingReport(**item) for item in raw}
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.error(f"Failed to load pending reports from {self._path}: {e}")
+
+    def flush(self) -> None:
+        """Сразу записывает несохранённые изменения; вызывается при остановке."""
+        if self._dirty:
+            self._dirty = False
+            self._write(*self._dump())
+
+    def _save(self) -> None:
+        if self._path is None:
+            return
+        self._dirty = True
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._write_batches())
+
+    async def _write_batches(self) -> None:
+        # пачка изменений подряд даёт одну запись файла
+        while self._dirty:
+            await asyncio.sleep(PENDING_SAVE_DEBOUNCE_SECONDS)
+            if not self._dirty:
+                break
+            self._dirty = False
+            await asyncio.to_thread(self._write, *self._dump())
+
+    def _dump(self) -> tuple[int, str]:
+        self._version += 1
+        return self._version, json.dumps([asdict(r) for r in self._reports.values()])
+
+    def _write(self, version: int, payload: str) -> None:
+        with self._write_lock:
+            if version <= self._written_version:
+                return
+            try:
+                self._path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self._path.with_suffix(".tmp")
+                tmp.write_text(payload, encoding="utf-8")
+                os.replace(tmp, self._path)
+                self._written_version = version
+            except OSError as e:
+                logger.error(f"Failed to save pending reports to {self._path}: {e}")
+
+
+class ReportDelivery:
+    """
+    Опрашивает статус отчёта и отправляет PDF в фоне; переживает рестарт через PendingReports.
+    Каждый опрос — отдельная короткая задача JobRunner, между опросами отчёт ждёт на таймере
+    и воркер не занимает. file_id отправленного PDF запоминается в истории расчётов
+    для мгновенной повторной отправки.
+    """
+
+    def __init__(
+            self,
+            client: BackendClient,
+            pending: PendingReports,
+            runner: JobRunner,
+            history: Optional[CalculationHistory] = None,
+    ):
+        self._client = client
+        self._pending = pending
+        self._runner = runner
+        self._history = history
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._retry_delays: dict[str, float] = {}
+        self._stopped = False
+
+    def deliver(self, bot: Bot, report_id: str, chat_id: int) -> bool:
+        """
+        Ставит доставку в очередь и сразу возвращает управление. False — очередь переполнена,
+        доставка встанет в неё позже сама.
+        """
+        if report_id in self._pending:
+            logger.info(f"Report {report_id} is already being delivered")
+            return True
+        report = self._pending.track(report_id, chat_id)
+        return self._schedule(bot, report)
+
+    async def resume(self, bot: Bot) -> None:
+        self._stopped = False
+        self._pending.load()
+        now = time.time()
+        for report in self._pending:
+            if report.deadline is not None and report.deadline <= now:
+                logger.warning(f"Dropping expired pending report {report.report_id}")
+                self._pending.done(report.report_id)
+                continue
+            logger.info(f"Resuming delivery of report {report.report_id}")
+            self._schedule(bot, report)
+
+    def stop(self) -> None:
+        """Снимает отложенные опросы; недоставленные отчёты остаются в файле до следующего старта."""
+        self._stopped = True
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._retry_delays.clear()
+        self._pending.flush()
+
+    def _schedule(self, bot: Bot, report: PendingReport) -> bool:
+        report_id = report.report_id
+        self._timers.pop(report_id, None)
+        if self._stopped or report_id not in self._pending:
+            return False
+        try:
+            self._runner.submit(
+                f"report:{report_id}",
+                lambda: self._poll(bot, report),
+                timeout=REPORT_POLL_TIMEOUT,
+                key=report_id,
+            )
+        except JobQueueFull as e:
+            if not self._runner.accepting:
+                # остановка: отчёт остаётся в файле и будет доставлен после рестарта
+                logger.info(f"Delivery of report {report_id} postponed until restart: {e}")
+                return False
+            delay = min(self._retry_delays.get(report_id, REPORT_RETRY_SECONDS / 2) * 2, REPORT_RETRY_MAX_SECONDS)
+            self._retry_delays[report_id] = delay
+            logger.warning(f"Cannot schedule delivery of report {report_id}, retrying in {delay:.0f}s: {e}")
+            self._schedule_later(bot, report, delay)
+            return False
+        self._retry_delays.pop(report_id, None)
+        return True
+
+    def _schedule_later(self, bot: Bot, report: PendingReport, delay: float) -> None:
+        if self._stopped:
+            return
+        loop = asyncio.get_running_loop()
+        self._timers[report.report_id] = loop.call_later(delay, self._schedule, bot, report)
+
+    async def _poll(self, bot: Bot, report: PendingReport) -> None:
+        if report.deadline is None:
+            self._pending.start_deadline(report)
+        try:
+            if await self._poll_once(bot, report):
+                self._pending.done(report.report_id)
+                return
+        except asyncio.CancelledError:
+            if self._runner.is_cancelled(report.report_id):
+                logger.info(f"Delivery of report {report.report_id} was cancelled")
+                self._pending.done(report.report_id)
+            elif self._runner.accepting:
+                # таймаут опроса; при остановке отчёт остаётся в файле
+                self._poll_again(bot, report)
+            raise
+        except RetryAfter as e:
+            # отчёт готов, Telegram просит подождать — дедлайн готовности тут уже ни при чём
+            logger.warning(f"Flood control while sending report {report.report_id}, retry in {e.retry_after}")
+            delay = e.retry_after
+            self._schedule_later(bot, report, delay.total_seconds() if isinstance(delay, timedelta) else delay)
+            return
+        except aiohttp.ClientError as e:
+            logger.error(f"Network error in check_report_status: {e}")
+        except Exception as e:
+            logger.error(f"Unexpected error in check_report_status: {e}")
+            self._pending.done(report.report_id)
+            return
+
+        self._poll_again(bot, report)
+
+    def _poll_again(self, bot: Bot, report: PendingReport) -> None:
+        if time.time() >= report.deadline:
+            logger.warning(f"Report {report.report_id} was not ready before the deadline")
+            self._pending.done(report.report_id)
+            return
+        self._schedule_later(bot, report, REPORT_POLL_INTERVAL)
+
+    async def _poll_once(self, bot: Bot, report: PendingReport) -> bool:
+        """Один опрос статуса; True — отчёт готов и отправлен."""
+        report_id = report.report_id
+        async with self._client.request("GET", f"reports/{report_id}/status") as response:
+            if response.status == 200:
+                status_data = codec.loads(await response.read())
+                return status_data["status"] == "success" and await self.send_report(bot, report_id, report.chat_id)
+            if response.status != 202:
+                logger.warning(f"Unexpected status code {response.status}")
+        return False
+
+    async def send_report(self, bot: Bot, report_id: str, chat_id: int, caption: str = "Ваш отчет готов!") -> bool:
+        """Скачивает готовый PDF и отправляет его; False — бэкенд его не отдал."""
+        async with self._client.request("GET", f"calculations/{report_id}/download-report") as pdf_response:
+            if pdf_response.status != 200:
+                return False
+            pdf_file = await pdf_response.read()
+        with tracer.span("report.delivery", report_id=report_id):
+            message = await bot.send_document(
+                chat_id=chat_id,
+                document=pdf_file,
+                filename="report.pdf",
+                caption=caption,
+            )
+        if self._history is not None and message.document is not None:
+            self._history.remember_file_id(report_id, message.document.file_id)
+        return True
+
+
+pending_reports = PendingReports(DATA_DIR / "pending_reports.json")
+calculation_history = CalculationHistory(DATA_DIR / "history.sqlite3")
+report_delivery = ReportDelivery(backend, pending_reports, job_runner, calculation_history)
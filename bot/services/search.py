@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import re
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from .catalog import Catalog, catalog
+
+logger = logging.getLogger(__name__)
+
+MAX_PREFIX_TERMS = 256
+MAX_FUZZY_TERMS = 8
+FUZZY_THRESHOLD = 0.5
+# payload ссылки t.me/<бот>?start=...: расчёт, начатый с результата инлайн-поиска
+SEARCH_PAYLOAD_PREFIX = "calc-"
+
+_WORD_RE = re.compile(r"[0-9a-zа-я]+")
+
+# Упрощённый стеммер: отрезаем одно самое длинное окончание,
+# префиксный поиск по индексу компенсирует неточности.
+_ENDINGS = sorted((
+    "ыми", "ими", "ого", "его", "ому", "ему", "иями", "ями", "ами",
+    "ая", "яя", "ое", "ее", "ые", "ие", "ый", "ий", "ой", "ую", "юю",
+    "ам", "ям", "ах", "ях", "ов", "ев", "ом", "ем", "ей", "ию", "ия", "ью",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+), key=len, reverse=True)
+
+
+@dataclass(frozen=True, slots=True)
+class SearchItem:
+    # fence, gate, fence_accessory, gate_accessory: id уникален только в пределах вида
+    kind: str
+    id: int
+    name: str
+
+
+def search_payload(item: SearchItem) -> str:
+    return f"{SEARCH_PAYLOAD_PREFIX}{item.kind}-{item.id}"
+
+
+def parse_search_payload(payload: str) -> Optional[tuple[str, int]]:
+    if not payload.startswith(SEARCH_PAYLOAD_PREFIX):
+        return None
+    kind, _, item_id = payload[len(SEARCH_PAYLOAD_PREFIX):].rpartition("-")
+    if not kind or not item_id.isdigit():
+        return None
+    return kind, int(item_id)
+
+
+def normalize(text: str) -> list[str]:
+    return _WORD_RE.findall(text.lower().replace("ё", "е"))
+
+
+def stem(word: str) -> str:
+    if len(word) <= 4 or word.isdigit():
+        return word
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            return word[:-len(ending)]
+    return word
+
+
+def trigrams(term: str) -> set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    Неизменяемый индекс по названиям позиций каталога: префиксный поиск
+    по отсортированному словарю основ и триграммы для опечаток.
+    """
+
+    def __init__(self, items: Iterable[SearchItem]):
+        self._items: list[SearchItem] = []
+        self._item_terms: list[frozenset[str]] = []
+        self._by_key: dict[tuple[str, int], SearchItem] = {}
+        postings: dict[str, list[int]] = {}
+
+        for item in items:
+            # повтор позиции в каталоге дал бы одинаковые id результатов, и Telegram отверг бы весь ответ
+            if (item.kind, item.id) in self._by_key:
+                continue
+            self._by_key[item.kind, item.id] = item
+            doc_id = len(self._items)
+            terms = frozenset(stem(word) for word in normalize(item.name))
+            self._items.append(item)
+            self._item_terms.append(terms)
+            for term in terms:
+                postings.setdefault(term, []).append(doc_id)
+
+        self._postings = postings
+        self._terms = sorted(postings)
+        self._trigrams: dict[str, list[str]] = {}
+        for term in self._terms:
+            for gram in trigrams(term):
+                self._trigrams.setdefault(gram, []).append(term)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def find(self, kind: str, item_id: int) -> Optional[SearchItem]:
+        return self._by_key.get((kind, item_id))
+
+    def search(self, query: str, limit: int = 20) -> list[SearchItem]:
+        tokens = [stem(word) for word in normalize(query)]
+        if not tokens:
+            return []
+
+        groups = []
+        for token in tokens:
+            terms = self._prefix_terms(token) or self._fuzzy_terms(token)
+            if not terms:
+                return []
+            groups.append(terms)
+
+        groups.sort(key=lambda terms: sum(len(self._postings[t]) for t in terms))
+        lead, rest = groups[0], [set(terms) for terms in groups[1:]]
+
+        results = []
+        seen = set()
+        for term in lead:
+            for doc_id in self._postings[term]:
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                doc_terms = self._item_terms[doc_id]
+                if all(not doc_terms.isdisjoint(other) for other in rest):
+                    results.append(self._items[doc_id])
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    def _prefix_terms(self, token: str) -> list[str]:
+        # точное совпадение основы оказывается первым в отсортированном словаре
+        start = bisect_left(self._terms, token)
+        found = []
+        for term in self._terms[start:start + MAX_PREFIX_TERMS]:
+            if not term.startswith(token):
+                break
+            found.append(term)
+        return found
+
+    def _fuzzy_terms(self, token: str) -> list[str]:
+        if len(token) < 3:
+            return []
+        grams = trigrams(token)
+        counts = Counter()
+        for gram in grams:
+            counts.update(self._trigrams.get(gram, ()))
+
+        scored = []
+        for term, common in counts.items():
+            similarity = 2 * common / (len(grams) + len(term) + 1)
+            if similarity >= FUZZY_THRESHOLD:
+                scored.append((similarity, term))
+        scored.sort(reverse=True)
+        return [term for _, term in scored[:MAX_FUZZY_TERMS]]
+
+
+class CatalogSearch:
+    """Держит актуальный SearchIndex и перестраивает его при смене версий каталога."""
+
+    def __init__(self, source: Catalog):
+        self._catalog = source
+        self._versions: tuple[int, ...] = ()
+        self._lock = asyncio.Lock()
+        self.index = SearchIndex(())
+
+    async def ensure_fresh(self) -> SearchIndex:
+        async with self._lock:
+            return await self._rebuild_if_changed()
+
+    async def _rebuild_if_changed(self) -> SearchIndex:
+        entries = (
+            await self._catalog.all_fences(),
+            await self._catalog.all_gates(),
+            await self._catalog.accessories("fence"),
+            await self._catalog.accessories("gate"),
+        )
+        versions = tuple(entry.version for entry in entries)
+        if versions != self._versions:
+            fences, gates, fence_accessories, gate_accessories = (entry.items for entry in entries)
+            items = [SearchItem("fence", item["id"], item["name"]) for item in fences]
+            items += [SearchItem("gate", item["id"], item["name"]) for item in gates]
+            items += [SearchItem("fence_accessory", item["id"], item["name"]) for item in fence_accessories]
+            items += [SearchItem("gate_accessory", item["id"], item["name"]) for item in gate_accessories]
+            self.index = await asyncio.to_thread(SearchIndex, items)
+            self._versions = versions
+            logger.info(f"Search index rebuilt: {len(self.index)} items")
+        return self.index
+
+
+catalog_search = CatalogSearch(catalog)
@@ -0,0 +1,133 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from . import codec
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ZCAT"
+FORMAT_VERSION = 1
+
+# magic, версия формата, число секций, время записи
+_HEADER = struct.Struct("<4sHId")
+# смещение, длина, crc32 данных секции; затем длина и сам JSON с метаданными
+_SECTION = struct.Struct("<QQII")
+
+
+@dataclass(slots=True)
+class SnapshotSection:
+    key: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    cursor: Optional[str]
+    offset: int
+    length: int
+    crc: int
+
+
+class CatalogSnapshot:
+    """
+    Снимок каталога на диске:
+
+        [header][index: секция = (offset, length, crc32, meta)][данные секций]
+
+    Данные секции — это JSON списка позиций. При чтении файл отображается через
+    mmap и разбирается только индекс; сама секция декодируется при первом
+    обращении, так что старт не зависит от размера каталога.
+    """
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self._mmap: Optional[mmap.mmap] = None
+        self._sections: Optional[dict[str, SnapshotSection]] = None
+        self.written_at: Optional[float] = None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index()
+
+    def __len__(self) -> int:
+        return len(self._index())
+
+    def section(self, key: str) -> Optional[tuple[SnapshotSection, list]]:
+        section = self._index().get(key)
+        if section is None:
+            return None
+        data = self._mmap[section.offset:section.offset + section.length]
+        if zlib.crc32(data) != section.crc:
+            logger.error(f"Catalog snapshot section {key} is corrupted, ignoring it")
+            del self._sections[key]
+            return None
+        return section, codec.loads(data)
+
+    def _index(self) -> dict[str, SnapshotSection]:
+        if self._sections is None:
+            self._sections = {}
+            if self.path is not None:
+                try:
+                    self._sections = self._load_index()
+                except (OSError, ValueError, struct.error, UnicodeDecodeError) as e:
+                    logger.error(f"Failed to open catalog snapshot {self.path}: {e}")
+        return self._sections
+
+    def _load_index(self) -> dict[str, SnapshotSection]:
+        if not self.path.exists() or self.path.stat().st_size < _HEADER.size:
+            return {}
+        with self.path.open("rb") as fh:
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, written_at = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            logger.warning(f"Catalog snapshot {self.path} has unsupported format {magic!r} v{version}")
+            return {}
+        self.written_at = written_at
+
+        sections = {}
+        position = _HEADER.size
+        for _ in range(count):
+            offset, length, crc, meta_length = _SECTION.unpack_from(self._mmap, position)
+            position += _SECTION.size
+            meta = json.loads(self._mmap[position:position + meta_length].decode("utf-8"))
+            position += meta_length
+            sections[meta["key"]] = SnapshotSection(
+                meta["key"], meta.get("etag"), meta.get("last_modified"), meta.get("cursor"), offset, length, crc
+            )
+        logger.info(f"Catalog snapshot {self.path}: {count} sections from {time.ctime(written_at)}")
+        return sections
+
+    def write(self, entries: Iterable[tuple[str, Optional[str], Optional[str], Optional[str], bytes]]) -> int:
+        """entries: (key, etag, last_modified, cursor, JSON позиций). Возвращает размер файла."""
+        entries = list(entries)
+        metas = [
+            json.dumps(
+                {"key": key, "etag": etag, "last_modified": last_modified, "cursor": cursor}, ensure_ascii=False
+            ).encode()
+            for key, etag, last_modified, cursor, _ in entries
+        ]
+        offset = _HEADER.size + sum(_SECTION.size + len(meta) for meta in metas)
+
+        index = []
+        for (*_, data), meta in zip(entries, metas):
+            index.append(_SECTION.pack(offset, len(data), zlib.crc32(data), len(meta)) + meta)
+            offset += len(data)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("wb") as fh:
+            fh.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(entries), time.time()))
+            fh.writelines(index)
+            fh.writelines(data for *_, data in entries)
+        # уже отображённый старый файл остаётся валидным: replace меняет только имя
+        os.replace(tmp, self.path)
+        return offset
+
+
+def encode_items(items: Any) -> bytes:
+    return json.dumps(items, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
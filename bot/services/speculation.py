@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional
+
+import aiohttp
+
+from config import config
+
+from .backend import BackendClient, backend
+from .calculations import DRAFT_KEYS, build_calculation, new_report_id, submit_calculation
+from .jobs import JobQueueFull, JobRunner, job_runner
+from .reports import PendingReports, pending_reports
+
+logger = logging.getLogger(__name__)
+
+SPECULATIVE_SUBMIT_TIMEOUT = 30
+# дольше выбранный вариант не ждём — отправляем расчёт обычным путём
+PROMOTE_WAIT_SECONDS = 10
+# пользователь так и не выбрал монтаж — заготовки забываются
+SPECULATION_TTL_SECONDS = 900
+
+
+@dataclass(slots=True)
+class Guess:
+    report_id: str
+    key: str
+    # результат POST calculations: True — бэкенд принял расчёт
+    accepted: asyncio.Future
+
+
+@dataclass(slots=True)
+class Speculation:
+    draft: dict
+    guesses: dict[int, Guess]
+    started_at: float
+
+
+class SpeculativeReports:
+    """
+    Расчёты «на опережение»: пока пользователь выбирает монтаж, черновик с самыми частыми
+    вариантами монтажа уже отправлен на бэкенд, и отчёт по выбранному начинает
+    формироваться раньше. Выбранный вариант становится настоящим расчётом (его report_id
+    уже в submit_calculation, повторного POST нет), остальные отменяются или просто
+    не доставляются — отменить расчёт на бэкенде нельзя. Нагрузка ограничена
+    per_user вариантами на пользователя и max_in_flight отчётами в работе всего:
+    неразобранные заготовки плюс настоящие отчёты, которые ещё формируются.
+    """
+
+    def __init__(
+            self,
+            client: BackendClient,
+            runner: JobRunner,
+            pending: PendingReports,
+            per_user: int = config.SPECULATIVE_MOUNTINGS,
+            max_in_flight: int = config.SPECULATIVE_MAX_IN_FLIGHT,
+    ):
+        self._client = client
+        self._runner = runner
+        self._pending = pending
+        self._per_user = per_user
+        self._max_in_flight = max_in_flight
+        self._speculations: dict[int, Speculation] = {}
+        # какие монтажи выбирают чаще — их и отправляем заранее
+        self._choices: Counter[int] = Counter()
+        self.submitted = 0
+        self.promoted = 0
+        self.missed = 0
+        self.skipped = 0
+        # приняты бэкендом, но не пригодились
+        self.wasted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._per_user > 0
+
+    @property
+    def in_flight(self) -> int:
+        return sum(len(speculation.guesses) for speculation in self._speculations.values())
+
+    def start(self, user_id: int, user_data: Mapping[str, Any], mounting_ids: list[int]) -> int:
+        """Отправляет черновик с вероятными вариантами монтажа; возвращает, сколько отправлено."""
+        self.discard(user_id)
+        if not self.enabled:
+            return 0
+        self._expire(time.monotonic())
+        budget = min(self._per_user, self._max_in_flight - self.in_flight - len(self._pending))
+        # фоновые задачи уже ждут в очереди — лишняя нагрузка сейчас ни к чему
+        if budget <= 0 or self._runner.queued:
+            self.skipped += 1
+            return 0
+
+        draft = _draft(user_data)
+        speculation = Speculation(draft, {}, time.monotonic())
+        loop = asyncio.get_running_loop()
+        for mounting_id in self._likely(mounting_ids)[:budget]:
+            report_id = new_report_id(user_id)
+            post_data = build_calculation(dict(draft, mounting_id=mounting_id), report_id, user_id)
+            guess = Guess(report_id, f"speculative:{report_id}", loop.create_future())
+            try:
+                self._runner.submit(
+                    guess.key,
+                    lambda post_data=post_data, guess=guess: self._submit(post_data, guess),
+                    timeout=SPECULATIVE_SUBMIT_TIMEOUT,
+                    key=guess.key,
+                )
+            except JobQueueFull as e:
+                logger.warning(f"Speculative calculation for user {user_id} was not scheduled: {e}")
+                break
+            speculation.guesses[mounting_id] = guess
+            self.submitted += 1
+
+        if speculation.guesses:
+            self._speculations[user_id] = speculation
+        return len(speculation.guesses)
+
+    async def promote(self, user_id: int, user_data: Mapping[str, Any]) -> Optional[str]:
+        """
+        report_id заранее отправленного расчёта с выбранным монтажом; None — заготовки нет
+        или бэкенд её не принял, и расчёт отправляется обычным путём. Остальные варианты сбрасываются.
+        """
+        mounting_id = user_data.get("mounting_id")
+        self._choices[mounting_id] += 1
+        speculation = self._speculations.pop(user_id, None)
+        if speculation is None:
+            return None
+
+        guess = speculation.guesses.pop(mounting_id, None)
+        self._drop(speculation.guesses.values())
+        if guess is None or speculation.draft != _draft(user_data):
+            if guess is not None:
+                self._drop([guess])
+            self.missed += 1
+            return None
+
+        try:
+            accepted = await asyncio.wait_for(asyncio.shield(guess.accepted), PROMOTE_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            self._runner.cancel(guess.key)
+            accepted = False
+        if not accepted:
+            self.missed += 1
+            return None
+        self.promoted += 1
+        return guess.report_id
+
+    def discard(self, user_id: int) -> None:
+        speculation = self._speculations.pop(user_id, None)
+        if speculation is not None:
+            self._drop(speculation.guesses.values())
+
+    def _likely(self, mounting_ids: list[int]) -> list[int]:
+        # сортировка устойчивая: без статистики — в порядке списка монтажа
+        return sorted(mounting_ids, key=lambda mounting_id: -self._choices[mounting_id])
+
+    def _drop(self, guesses) -> None:
+        for guess in guesses:
+            if guess.accepted.done() and guess.accepted.result():
+                self.wasted += 1
+            else:
+                self._runner.cancel(guess.key)
+
+    def _expire(self, now: float) -> None:
+        expired = [
+            user_id for user_id, speculation in self._speculations.items()
+            if now - speculation.started_at > SPECULATION_TTL_SECONDS
+        ]
+        for user_id in expired:
+            self.discard(user_id)
+
+    async def _submit(self, post_data: dict, guess: Guess) -> None:
+        accepted = False
+        try:
+            accepted = await submit_calculation(post_data, self._client, speculative=True)
+        except aiohttp.ClientError as e:
+            logger.warning(f"Speculative calculation {guess.report_id} failed: {e}")
+        finally:
+            # отмена и таймаут тоже дают ответ тому, кто ждёт в promote
+            if not guess.accepted.done():
+                guess.accepted.set_result(accepted)
+
+
+def _draft(user_data: Mapping[str, Any]) -> dict:
+    return {key: user_data[key] for key in DRAFT_KEYS if key in user_data and key != "mounting_id"}
+
+
+speculative_reports = SpeculativeReports(backend, job_runner, pending_reports)
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from config import config
+
+from .accessory_specs import AccessorySpecIndex, accessory_specs
+from .admission import AdmissionController, admission
+from .backend import BackendClient, backend
+from .broadcast import Broadcaster
+from .catalog import Catalog, catalog, snapshot_path
+from .jobs import job_runner
+from .metrics import DialogSteps, LatencyWindow
+from .price_list import PriceListService, price_list
+from .history import CalculationHistory
+from .reports import DATA_DIR, PendingReports, ReportDelivery, calculation_history, report_delivery, pending_reports
+from .search import CatalogSearch, catalog_search
+from .snapshot import CatalogSnapshot
+from .speculation import SpeculativeReports, speculative_reports
+from .users import UserRegistry, users
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class BackendStack:
+    """
+    Всё, что зависит только от адреса бэкенда: клиент с пулом соединений,
+    кэш каталога и построенные по нему индексы. Боты на одном бэкенде делят один стек.
+    """
+    url: str
+    client: BackendClient
+    catalog: Catalog
+    accessory_specs: AccessorySpecIndex
+    catalog_search: CatalogSearch
+    price_list: PriceListService
+
+    @classmethod
+    def create(cls, url: str) -> "BackendStack":
+        client = BackendClient(url, backend.recorder)
+        variant = hashlib.blake2b(url.encode(), digest_size=4).hexdigest()
+        source = Catalog(client, snapshot=CatalogSnapshot(snapshot_path(variant)))
+        return cls(
+            url, client, source, AccessorySpecIndex(source, client), CatalogSearch(source), PriceListService(source)
+        )
+
+
+@dataclass(slots=True)
+class TenantMetrics:
+    updates: int = 0
+    errors: int = 0
+    calculations: int = 0
+    latency: LatencyWindow = field(default_factory=lambda: LatencyWindow(512))
+    # на каком шаге расчёта сейчас пользователи этого бота
+    steps: DialogSteps = field(default_factory=DialogSteps)
+
+
+@dataclass(slots=True)
+class Tenant:
+    """Один бот (дилер, регион): свой токен, свой допуск и доставка отчётов, общий с соседями стек."""
+    name: str
+    token: Optional[str]
+    stack: BackendStack
+    admission: AdmissionController
+    report_delivery: ReportDelivery
+    pending_reports: PendingReports
+    users: UserRegistry
+    broadcasts: Broadcaster
+    history: CalculationHistory
+    speculation: SpeculativeReports
+    metrics: TenantMetrics = field(default_factory=TenantMetrics)
+
+    @property
+    def backend(self) -> BackendClient:
+        return self.stack.client
+
+    @property
+    def catalog(self) -> Catalog:
+        return self.stack.catalog
+
+    @property
+    def accessory_specs(self) -> AccessorySpecIndex:
+        return self.stack.accessory_specs
+
+    @property
+    def catalog_search(self) -> CatalogSearch:
+        return self.stack.catalog_search
+
+    @property
+    def price_list(self) -> PriceListService:
+        return self.stack.price_list
+
+
+default_stack = BackendStack(config.BASE_API_URL, backend, catalog, accessory_specs, catalog_search, price_list)
+default_tenant = Tenant(
+    "default", config.BOT_TOKEN, default_stack, admission, report_delivery, pending_reports,
+    users, Broadcaster(users, job_runner, DATA_DIR / "broadcast.json"), calculation_history,
+    speculative_reports,
+)
+
+_current_tenant: ContextVar[Tenant] = ContextVar("tenant", default=default_tenant)
+_tenants: list[Tenant] = []
+
+
+def current_tenant() -> Tenant:
+    """Бот, чьё обновление сейчас обрабатывается; в одиночном режиме — default_tenant."""
+    return _current_tenant.get()
+
+
+def activate_tenant(tenant: Tenant) -> None:
+    _current_tenant.set(tenant)
+
+
+def all_tenants() -> list[Tenant]:
+    return list(_tenants) or [default_tenant]
+
+
+def build_tenants(specs: list[dict]) -> list[Tenant]:
+    """specs: [{"name", "token", "backend_url"}, ...]; backend_url по умолчанию — BASE_API_URL."""
+    stacks = {default_stack.url: default_stack}
+    tenants = []
+    for spec in specs:
+        name = spec["name"]
+        if any(tenant.name == name for tenant in tenants):
+            raise ValueError(f"Tenant {name} is defined twice")
+        url = spec.get("backend_url") or config.BASE_API_URL
+        stack = stacks.get(url)
+        if stack is None:
+            stack = stacks[url] = BackendStack.create(url)
+
+        pending = PendingReports(DATA_DIR / f"pending_reports.{name}.json")
+        registry = UserRegistry(DATA_DIR / f"users.{name}.jsonl")
+        history = CalculationHistory(DATA_DIR / f"history.{name}.sqlite3")
+        tenants.append(Tenant(
+            name,
+            spec["token"],
+            stack,
+            AdmissionController(
+                stack.client,
+                max_active=config.ADMISSION_MAX_ACTIVE,
+                max_queue=config.ADMISSION_MAX_QUEUE,
+                latency_target=config.ADMISSION_LATENCY_TARGET,
+                max_in_flight=config.ADMISSION_MAX_IN_FLIGHT,
+            ),
+            ReportDelivery(stack.client, pending, job_runner, history),
+            pending,
+            registry,
+            Broadcaster(registry, job_runner, DATA_DIR / f"broadcast.{name}.json"),
+            history,
+            SpeculativeReports(stack.client, job_runner, pending),
+        ))
+    logger.info(f"{len(tenants)} tenants on {len(backend_stacks(tenants))} backends")
+    _tenants[:] = tenants
+    return tenants
+
+
+def load_tenants(path: Path) -> list[Tenant]:
+    return build_tenants(json.loads(path.read_text(encoding="utf-8")))
+
+
+def backend_stacks(tenants: list[Tenant]) -> list[BackendStack]:
+    unique = {}
+    for tenant in tenants:
+        unique.setdefault(id(tenant.stack), tenant.stack)
+    return list(unique.values())
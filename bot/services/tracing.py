@@ -0,0 +1,173 @@
+import functools
+import json
+import logging
+import os
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from config import config
+
+from .profiling import profiler
+
+logger = logging.getLogger(__name__)
+
+TRACE_HEADER = "X-Trace-Id"
+
+_current_trace: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("span_id", default=None)
+
+
+def new_trace_id() -> str:
+    return secrets.token_hex(8)
+
+
+def current_trace_id() -> Optional[str]:
+    return _current_trace.get()
+
+
+def trace_headers() -> dict[str, str]:
+    trace_id = _current_trace.get()
+    return {TRACE_HEADER: trace_id} if trace_id else {}
+
+
+class Tracer:
+    """
+    Пишет спаны в JSON Lines файл (по одному объекту на строку).
+    Спаны буферизуются и пачками уходят в отдельный поток записи: event loop на файловом
+    вводе-выводе не блокируется. Файл больше max_bytes переименовывается в .1.
+    """
+
+    def __init__(
+            self,
+            path: Optional[Path],
+            flush_every: int = 100,
+            flush_interval: float = 5.0,
+            max_bytes: int = config.TRACE_MAX_BYTES,
+    ):
+        self._path = path
+        self._flush_every = flush_every
+        self._flush_interval = flush_interval
+        self._max_bytes = max_bytes
+        self._buffer: list[str] = []
+        self._last_flush = time.monotonic()
+        # один поток — пачки ложатся в файл по порядку; создаётся при первой записи
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tracer")
+
+    @property
+    def enabled(self) -> bool:
+        return self._path is not None
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attrs: Any) -> Iterator[dict[str, Any]]:
+        if not self.enabled:
+            yield attrs
+            return
+
+        span_id = secrets.token_hex(4)
+        parent_id = _current_span.get()
+        token = _current_span.set(span_id)
+        started_at = time.time()
+        started = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs["error"] = repr(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self._emit({
+                "trace_id": _current_trace.get(),
+                "span_id": span_id,
+                "parent_id": parent_id,
+                "name": name,
+                "kind": kind,
+                "start": started_at,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                "attrs": attrs,
+            })
+
+    def _emit(self, record: dict[str, Any]) -> None:
+        self._buffer.append(json.dumps(record, ensure_ascii=False, default=str))
+        if len(self._buffer) >= self._flush_every or time.monotonic() - self._last_flush >= self._flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._buffer or self._path is None:
+            return
+        lines, self._buffer = self._buffer, []
+        self._writer.submit(self._write, lines)
+
+    def close(self) -> None:
+        """Сбрасывает буфер и ждёт, пока поток записи допишет файл."""
+        self.flush()
+        self._writer.shutdown(wait=True)
+
+    def _write(self, lines: list[str]) -> None:
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            if self._max_bytes and self._path.exists() and self._path.stat().st_size >= self._max_bytes:
+                os.replace(self._path, self._path.with_name(self._path.name + ".1"))
+            with self._path.open("a", encoding="utf-8") as fh:
+                fh.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logger.error(f"Failed to write traces to {self._path}: {e}")
+
+
+def _user_id(update) -> Optional[int]:
+    user = getattr(update, "effective_user", None)
+    return user.id if user else None
+
+
+def traced(func):
+    """Оборачивает хэндлер в спан, продолжая трассу, сохранённую в user_data."""
+
+    @functools.wraps(func)
+    async def wrapper(update, context, *args, **kwargs):
+        user_data = context.user_data if context.user_data is not None else {}
+        trace_id = user_data.get("trace_id") or _current_trace.get() or new_trace_id()
+        token = _current_trace.set(trace_id)
+        try:
+            with tracer.span(func.__name__, kind="handler", user_id=_user_id(update)):
+                if profiler.should_sample():
+                    return await profiler.run(func.__name__, func, update, context, *args, **kwargs)
+                return await func(update, context, *args, **kwargs)
+        finally:
+            _current_trace.reset(token)
+
+    return wrapper
+
+
+def traced_entry(func):
+    """Как traced, но начинает новую трассу и сохраняет её id в user_data для следующих шагов."""
+
+    @functools.wraps(func)
+    async def wrapper(update, context, *args, **kwargs):
+        trace_id = new_trace_id()
+        token = _current_trace.set(trace_id)
+        try:
+            with tracer.span(func.__name__, kind="handler", user_id=_user_id(update)):
+                if profiler.should_sample():
+                    return await profiler.run(func.__name__, func, update, context, *args, **kwargs)
+                return await func(update, context, *args, **kwargs)
+        finally:
+            context.user_data["trace_id"] = trace_id
+            _current_trace.reset(token)
+
+    return wrapper
+
+
+def _trace_path() -> Optional[Path]:
+    if not config.TRACING_ENABLED:
+        return None
+    if config.TRACE_FILE:
+        return Path(config.TRACE_FILE)
+    return Path(__file__).parent.parent.parent / "logs" / "traces.jsonl"
+
+
+tracer = Tracer(_trace_path())
@@ -0,0 +1,139 @@
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+from .reports import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Recipient:
+    user_id: int
+    chat_id: int
+    # смещение в файле сразу после записи — по нему рассылка продолжается после рестарта
+    next_offset: int
+
+
+class UserRegistry:
+    """
+    Пользователи, которые поделились контактом (handle_contact), — получатели рассылок.
+    Хранятся построчно в JSONL-файле, который только дописывается: рассылка читает его
+    потоком с сохранённого смещения, не собирая всех получателей в памяти.
+
+    Действует последняя строка пользователя: повторная регистрация или пометка
+    «заблокировал бота» просто дописываются, а более ранние строки при чтении пропускаются.
+    """
+
+    def __init__(self, path: Optional[Path]):
+        self._path = path
+        # user_id -> смещение его последней строки; None — файл ещё не прочитан
+        self._latest: Optional[dict[int, int]] = None
+        self._blocked: set[int] = set()
+        self._size = 0
+
+    def __len__(self) -> int:
+        self._load()
+        return len(self._latest) - len(self._blocked)
+
+    def __contains__(self, user_id: int) -> bool:
+        self._load()
+        return user_id in self._latest and user_id not in self._blocked
+
+    def register(self, user_id: int, chat_id: int) -> bool:
+        """False — пользователь уже получает рассылки."""
+        if user_id in self:
+            return False
+        self._append({"id": user_id, "chat_id": chat_id, "at": int(time.time())}, user_id)
+        self._blocked.discard(user_id)
+        return True
+
+    def block(self, user_id: int) -> None:
+        """Пользователь заблокировал бота — больше ему не пишем, пока снова не поделится контактом."""
+        if user_id not in self:
+            return
+        self._append({"id": user_id, "blocked": True, "at": int(time.time())}, user_id)
+        self._blocked.add(user_id)
+
+    def stream(self, offset: int = 0, until: Optional[int] = None) -> Iterator[Recipient]:
+        """Действующие получатели по порядку регистрации, начиная с offset и до until (размер файла)."""
+        self._load()
+        if self._path is None or not self._path.exists():
+            return
+        with self._path.open("rb") as fh:
+            fh.seek(offset)
+            while until is None or offset < until:
+                line = fh.readline()
+                if not line:
+                    break
+                line_offset, offset = offset, offset + len(line)
+                record = _parse(line)
+                if record is None or record.get("blocked"):
+                    continue
+                user_id = record["id"]
+                if self._latest.get(user_id) != line_offset or user_id in self._blocked:
+                    continue
+                yield Recipient(user_id, record["chat_id"], offset)
+
+    @property
+    def size(self) -> int:
+        """Текущий размер файла: рассылка идёт до него, новые регистрации в неё не попадают."""
+        self._load()
+        return self._size
+
+    def _append(self, record: dict, user_id: int) -> None:
+        if self._path is None:
+            self._latest[user_id] = self._size
+            return
+        line = (json.dumps(record) + "\n").encode()
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with self._path.open("ab") as fh:
+                offset = fh.tell()
+                fh.write(line)
+        except OSError as e:
+            logger.error(f"Failed to save user {user_id} to {self._path}: {e}")
+            return
+        self._latest[user_id] = offset
+        self._size = offset + len(line)
+
+    def _load(self) -> None:
+        if self._latest is not None:
+            return
+        self._latest = {}
+        if self._path is None or not self._path.exists():
+            return
+        offset = 0
+        try:
+            with self._path.open("rb+") as fh:
+                for line in fh:
+                    if not line.endswith(b"\n"):
+                        # недописанная строка после падения, иначе следующая запись склеится с ней
+                        fh.truncate(offset)
+                        break
+                    record = _parse(line)
+                    if record is not None:
+                        self._latest[record["id"]] = offset
+                        if record.get("blocked"):
+                            self._blocked.add(record["id"])
+                        else:
+                            self._blocked.discard(record["id"])
+                    offset += len(line)
+        except OSError as e:
+            logger.error(f"Failed to load users from {self._path}: {e}")
+        self._size = offset
+        logger.info(f"User registry {self._path.name}: {len(self)} recipients")
+
+
+def _parse(line: bytes) -> Optional[dict]:
+    try:
+        record = json.loads(line)
+        return record if isinstance(record, dict) and "id" in record else None
+    except ValueError:
+        return None
+
+
+users = UserRegistry(DATA_DIR / "users.jsonl")
@@ -0,0 +1,120 @@
+"""
+Сводка по медленным трассам из logs/traces.jsonl (бот пишет их при TRACING_ENABLED=1).
+
+    python bot/trace_summary.py [path] --top 10 --min-ms 2000
+"""
+import argparse
+import json
+import statistics
+from collections import defaultdict
+from pathlib import Path
+
+DEFAULT_PATH = Path(__file__).parent.parent / "logs" / "traces.jsonl"
+
+
+def load_spans(path: Path) -> list[dict]:
+    spans = []
+    with path.open(encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                spans.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return spans
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize_traces(spans: list[dict]) -> list[dict]:
+    by_trace = defaultdict(list)
+    for span in spans:
+        by_trace[span.get("trace_id")].append(span)
+
+    traces = []
+    for trace_id, trace_spans in by_trace.items():
+        roots = [s for s in trace_spans if s.get("parent_id") is None]
+        handler_ms = sum(s["duration_ms"] for s in roots)
+        http_ms = sum(s["duration_ms"] for s in trace_spans if s.get("kind") == "http")
+        start = min(s["start"] for s in trace_spans)
+        end = max(s["start"] + s["duration_ms"] / 1000 for s in trace_spans)
+        slowest = max(trace_spans, key=lambda s: s["duration_ms"])
+        user_id = next((s["attrs"].get("user_id") for s in roots if s.get("attrs", {}).get("user_id")), None)
+        traces.append({
+            "trace_id": trace_id,
+            "user_id": user_id,
+            "handler_ms": handler_ms,
+            "http_ms": http_ms,
+            "wall_s": end - start,
+            "spans": len(trace_spans),
+            "errors": sum(1 for s in trace_spans if "error" in s.get("attrs", {})),
+            "slowest": slowest,
+        })
+    traces.sort(key=lambda t: t["handler_ms"], reverse=True)
+    return traces
+
+
+def summarize_names(spans: list[dict]) -> list[tuple[str, int, float, float, float]]:
+    by_name = defaultdict(list)
+    for span in spans:
+        by_name[(span.get("kind"), span["name"])].append(span["duration_ms"])
+
+    rows = []
+    for (kind, name), durations in by_name.items():
+        rows.append((
+            f"{kind}:{name}",
+            len(durations),
+            statistics.median(durations),
+            percentile(durations, 0.95),
+            max(durations),
+        ))
+    rows.sort(key=lambda row: row[3], reverse=True)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize slow conversation traces")
+    parser.add_argument("path", nargs="?", type=Path, default=DEFAULT_PATH)
+    parser.add_argument("--top", type=int, default=10, help="how many slow traces to show")
+    parser.add_argument("--min-ms", type=float, default=0, help="hide traces faster than this (handler time)")
+    parser.add_argument("--trace", help="print every span of a single trace")
+    args = parser.parse_args()
+
+    spans = load_spans(args.path)
+    if not spans:
+        print(f"No spans in {args.path}")
+        return
+
+    if args.trace:
+        trace_spans = sorted((s for s in spans if s.get("trace_id") == args.trace), key=lambda s: s["start"])
+        for span in trace_spans:
+            indent = "  " if span.get("parent_id") else ""
+            print(f"{indent}{span['kind']:<8} {span['name']:<45} {span['duration_ms']:>10.1f} ms  {span.get('attrs', {})}")
+        return
+
+    traces = [t for t in summarize_traces(spans) if t["handler_ms"] >= args.min_ms]
+    print(f"Slowest traces (of {len(traces)}):")
+    print(f"{'trace_id':<18}{'user':>12}{'handlers ms':>14}{'http ms':>12}{'wall s':>10}{'spans':>7}{'err':>5}  slowest span")
+    for trace in traces[:args.top]:
+        slowest = trace["slowest"]
+        print(
+            f"{str(trace['trace_id']):<18}{str(trace['user_id']):>12}{trace['handler_ms']:>14.1f}"
+            f"{trace['http_ms']:>12.1f}{trace['wall_s']:>10.1f}{trace['spans']:>7}{trace['errors']:>5}"
+            f"  {slowest['name']} ({slowest['duration_ms']:.0f} ms)"
+        )
+
+    print()
+    print("Span latency by name:")
+    print(f"{'span':<55}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, count, p50, p95, worst in summarize_names(spans)[:args.top * 2]:
+        print(f"{name:<55}{count:>8}{p50:>10.1f}{p95:>10.1f}{worst:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,3 +6,25 @@ load_dotenv()
 
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 BASE_API_URL = os.getenv('BASE_API_URL')
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', '0') == '1'
+TRACE_FILE = os.getenv('TRACE_FILE')
+# при превышении файл спанов переименовывается в .1 (предыдущий .1 удаляется); 0 — без ротации
+TRACE_MAX_BYTES = int(os.getenv('TRACE_MAX_BYTES', str(50 * 1024 * 1024)))
+ADMIN_IDS = {int(user_id) for user_id in os.getenv('ADMIN_IDS', '').split(',') if user_id.strip()}
+# дилеры, которым доступен массовый расчёт из файла; администраторам он доступен всегда
+BULK_QUOTE_USER_IDS = {int(user_id) for user_id in os.getenv('BULK_QUOTE_USER_IDS', '').split(',') if user_id.strip()}
+BACKEND_RECORD_FILE = os.getenv('BACKEND_RECORD_FILE')
+ADMISSION_MAX_ACTIVE = int(os.getenv('ADMISSION_MAX_ACTIVE', '50'))
+ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', '500'))
+ADMISSION_LATENCY_TARGET = float(os.getenv('ADMISSION_LATENCY_TARGET', '2.0'))
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', '100'))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '64'))
+JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', '1000'))
+# пустая строка отключает снимок каталога на диске
+CATALOG_SNAPSHOT_FILE = os.getenv('CATALOG_SNAPSHOT_FILE')
+TENANTS_FILE = os.getenv('TENANTS_FILE')
+# сообщений в секунду для рассылки; общий предел Telegram — 30, часть остаётся обычным ответам
+BROADCAST_RATE = float(os.getenv('BROADCAST_RATE', '20'))
+# сколько вариантов монтажа отправлять на расчёт заранее, пока пользователь выбирает; 0 — выключено
+SPECULATIVE_MOUNTINGS = int(os.getenv('SPECULATIVE_MOUNTINGS', '0'))
+SPECULATIVE_MAX_IN_FLIGHT = int(os.getenv('SPECULATIVE_MAX_IN_FLIGHT', '40'))
@@ -0,0 +1,13 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# модули бота импортируются так же, как при запуске из bot/: config из корня, services и handlers из bot/
+sys.path[:0] = [str(ROOT), str(ROOT / "bot")]
+
+os.environ.setdefault("BOT_TOKEN", "1:TEST")
+os.environ.setdefault("BASE_API_URL", "http://127.0.0.1:9/")
+os.environ["CATALOG_SNAPSHOT_FILE"] = ""
+os.environ["TRACING_ENABLED"] = "0"
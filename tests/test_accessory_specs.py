@@ -0,0 +1,42 @@
+import asyncio
+
+from services.accessory_specs import AccessorySpecIndex
+from services.catalog import CatalogEntry
+
+ITEMS = [{"id": 1, "name": "Столб"}, {"id": 2, "name": "Заглушка"}]
+
+
+class FakeCatalog:
+    async def accessories(self, kind: str) -> CatalogEntry:
+        return CatalogEntry(f"accessories?accessoriableType={kind}", 1, 0.0, ITEMS)
+
+
+class SlowClient:
+    """Характеристики аксессуара 1 приходят только после release."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.requests: list[str] = []
+
+    async def get_json(self, path: str) -> dict:
+        self.requests.append(path)
+        if path == "accessories/1":
+            await self.release.wait()
+        accessory_id = int(path.rsplit("/", 1)[1])
+        return {"data": {"specs": [{"spec_id": accessory_id * 10, "dimension": "60x60"}]}}
+
+
+def test_lookup_on_cold_index_is_kept():
+    async def scenario():
+        client = SlowClient()
+        index = AccessorySpecIndex(FakeCatalog(), client)
+        first = await index.lookup("fence", 2)
+        second = await index.lookup("fence", 2)
+        client.release.set()
+        built = await index.get("fence")
+        return index, client, first, second, built
+
+    index, client, first, second, built = asyncio.run(scenario())
+    assert second is first
+    assert (index.hits, index.misses) == (1, 1)
+    assert set(built) == {1, 2}
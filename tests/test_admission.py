@@ -0,0 +1,81 @@
+import asyncio
+
+from services.admission import AdmissionController
+from services.metrics import LatencyWindow
+
+
+class FakeClient:
+    def __init__(self):
+        self.latency = LatencyWindow(16)
+        self.in_flight = 0
+
+
+def make_admission(max_active: int = 2, max_queue: int = 10) -> AdmissionController:
+    return AdmissionController(
+        FakeClient(), max_active=max_active, max_queue=max_queue,
+        latency_target=2.0, max_in_flight=100, min_active=1,
+    )
+
+
+def test_queue_positions_and_release_promotes_in_order():
+    admission = make_admission()
+    assert admission.try_admit(1, 1) is None
+    assert admission.try_admit(2, 2) is None
+    assert admission.try_admit(3, 3) == 1
+    assert admission.try_admit(4, 4) == 2
+    # повторный /calc из очереди не двигает пользователя в конец
+    assert admission.try_admit(3, 3) == 1
+
+    admission.release(1)
+    assert admission.active == 2
+    assert admission.queued == 1
+    assert admission.try_admit(3, 3) is None
+    assert admission.position(4) == 1
+
+
+def test_user_who_left_the_queue_is_not_admitted():
+    admission = make_admission(max_active=1)
+    admission.try_admit(1, 1)
+    admission.try_admit(2, 2)
+    admission.try_admit(3, 3)
+
+    admission.leave_queue(2)
+    admission.release(1)
+
+    assert admission.position(2) is None
+    assert admission.try_admit(3, 3) is None
+    assert admission.try_admit(2, 2) == 1
+
+
+def test_full_queue_rejects():
+    admission = make_admission(max_active=1, max_queue=1)
+    admission.try_admit(1, 1)
+    assert admission.try_admit(2, 2) == 1
+    assert admission.try_admit(3, 3) == 0
+    assert admission.rejected_total == 1
+
+
+def test_slow_backend_lowers_capacity():
+    admission = make_admission(max_active=10)
+    for _ in range(16):
+        admission._client.latency.observe(8.0)
+    assert admission.capacity() == 2
+
+
+def test_promoted_user_is_notified():
+    async def scenario():
+        notified = []
+
+        async def notify(chat_id):
+            notified.append(chat_id)
+
+        admission = make_admission(max_active=1)
+        admission.start(notify)
+        admission.try_admit(1, 100)
+        admission.try_admit(2, 200)
+        admission.release(1)
+        await asyncio.sleep(0)
+        await admission.stop()
+        return notified
+
+    assert asyncio.run(scenario()) == [200]
@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from services.backend import BackendClient, BackendStatusError
+from services.recording import BackendRecorder, fixture_body, load_fixtures
+
+ITEMS = {"data": [{"id": number, "name": f"Позиция {number}"} for number in range(200)]}
+
+
+async def items(request):
+    return web.json_response(ITEMS)
+
+
+async def missing(request):
+    return web.json_response({"error": "not found"}, status=404)
+
+
+def record_requests(tmp_path, *paths):
+    app = web.Application()
+    app.router.add_get("/items", items)
+    app.router.add_get("/missing", missing)
+
+    async def scenario():
+        async with TestServer(app) as server:
+            client = BackendClient(str(server.make_url("/")), BackendRecorder(tmp_path / "traffic.jsonl"))
+            results = []
+            for path in paths:
+                try:
+                    results.append(await client.get_list(path))
+                except BackendStatusError as e:
+                    results.append(e)
+            await client.close()
+            return results
+
+    return asyncio.run(scenario())
+
+
+def test_error_response_is_recorded(tmp_path):
+    [error] = record_requests(tmp_path, "missing")
+
+    assert isinstance(error, BackendStatusError)
+    [entry] = load_fixtures(tmp_path / "traffic.jsonl")
+    assert entry["status"] == 404
+    assert json.loads(fixture_body(entry)) == {"error": "not found"}
+
+
+def test_list_body_is_recorded_whole(tmp_path):
+    [decoded] = record_requests(tmp_path, "items")
+
+    assert decoded == ITEMS["data"]
+    [entry] = load_fixtures(tmp_path / "traffic.jsonl")
+    assert json.loads(fixture_body(entry)) == ITEMS
@@ -0,0 +1,61 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from config import config
+from handlers import bulk_quote
+from handlers.bulk_quote import MAX_FILE_SIZE, handle_bulk_quote_file
+from services.bulk_quote import BulkQuoteError, parse_table
+
+HEADER = "fence_type;height;fence_variant;length;mounting\n"
+
+
+def test_csv_in_cp1251_is_read():
+    content = (HEADER + "Профнастил;2;С8 зелёный;25;Под ключ\n").encode("cp1251")
+    rows = parse_table("заказ.csv", content)
+    assert rows[0].values["fence_variant"] == "С8 зелёный"
+
+
+def test_csv_in_utf8_with_bom_is_read():
+    content = (HEADER + "Профнастил;2;С8;25;Под ключ\n").encode("utf-8-sig")
+    rows = parse_table("order.csv", content)
+    assert rows[0].values["fence_type"] == "Профнастил"
+
+
+def test_broken_xlsx_is_reported_to_user():
+    with pytest.raises(BulkQuoteError):
+        parse_table("order.xlsx", b"not a zip archive")
+
+
+class FakeMessage:
+    def __init__(self):
+        self.replies: list[str] = []
+        self.document = SimpleNamespace(file_size=MAX_FILE_SIZE + 1)
+
+    async def reply_text(self, text: str):
+        self.replies.append(text)
+
+
+def bulk_update(user_id: int):
+    return SimpleNamespace(effective_user=SimpleNamespace(id=user_id), message=FakeMessage())
+
+
+def test_bulk_quote_is_for_dealers_only(monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_IDS", set())
+    monkeypatch.setattr(config, "BULK_QUOTE_USER_IDS", {7})
+    stranger, dealer = bulk_update(1), bulk_update(7)
+    context = SimpleNamespace(user_data={})
+    asyncio.run(handle_bulk_quote_file(stranger, context))
+    asyncio.run(handle_bulk_quote_file(dealer, context))
+    assert "дилерам" in stranger.message.replies[0]
+    # дилер дошёл до проверки файла
+    assert "слишком большой" in dealer.message.replies[0]
+
+
+def test_second_upload_waits_for_the_first(monkeypatch):
+    monkeypatch.setattr(config, "BULK_QUOTE_USER_IDS", {7})
+    monkeypatch.setattr(bulk_quote, "_active_uploads", {7})
+    update = bulk_update(7)
+    asyncio.run(handle_bulk_quote_file(update, SimpleNamespace(user_data={})))
+    assert "ещё обрабатывается" in update.message.replies[0]
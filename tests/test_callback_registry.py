@@ -0,0 +1,54 @@
+from telegram import InlineKeyboardButton
+
+from services.callback_registry import CallbackRegistry, FenceSpecChoice
+from services.keyboards import KeyboardPager, PageTurn
+
+
+def test_issue_is_stable_and_resolves():
+    registry = CallbackRegistry(maxsize=10)
+    token = registry.issue(FenceSpecChoice(1, 1.5))
+
+    assert registry.issue(FenceSpecChoice(1, 1.5)) == token
+    assert registry.resolve(token) == FenceSpecChoice(1, 1.5)
+    assert len(token) <= 64
+
+
+def test_least_recently_used_token_is_evicted():
+    registry = CallbackRegistry(maxsize=2)
+    first = registry.issue("a")
+    second = registry.issue("b")
+    registry.resolve(first)
+    third = registry.issue("c")
+
+    assert registry.resolve(second) is None
+    assert registry.is_expired(second)
+    assert registry.resolve(first) == "a"
+    assert registry.resolve(third) == "c"
+    # после вытеснения тот же payload получает новый токен
+    assert registry.issue("b") not in (first, second, third)
+
+
+def test_tokens_of_another_process_are_expired():
+    token = CallbackRegistry().issue("a")
+    assert CallbackRegistry().is_expired(token)
+    assert not CallbackRegistry().is_expired("done")
+
+
+def test_pager_drops_pages_with_evicted_tokens(monkeypatch):
+    registry = CallbackRegistry(maxsize=4)
+    monkeypatch.setattr("services.keyboards.callback_registry", registry)
+
+    pager = KeyboardPager(page_size=2)
+    rows = [[InlineKeyboardButton(str(n), callback_data=str(n))] for n in range(6)]
+    pages = pager.pages("fences", 1, lambda: rows)
+    assert len(pages) == 3
+    assert pager.page(PageTurn("fences", 1, 1)) is pages[1]
+
+    for n in range(10):
+        registry.issue(f"other {n}")
+
+    assert pager.page(PageTurn("fences", 1, 1)) is None
+    rebuilt = pager.pages("fences", 1, lambda: rows)
+    assert rebuilt is not pages
+    next_token = rebuilt[0].inline_keyboard[-1][-1].callback_data
+    assert registry.resolve(next_token) == PageTurn("fences", 1, 1)
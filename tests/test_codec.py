@@ -0,0 +1,21 @@
+import json
+
+import pytest
+
+from services import codec
+
+
+@pytest.mark.parametrize("payload", [
+    {"meta": {"total": 2}, "data": [{"id": 1, "name": "Столб 60 мм", "price": 1.5, "tags": ["а", {"x": None}]}]},
+    [],
+])
+def test_loads_matches_json(payload):
+    raw = json.dumps(payload, ensure_ascii=False)
+
+    assert codec.loads(raw.encode()) == payload
+    assert codec.loads(raw) == payload
+
+
+def test_invalid_json_raises_value_error():
+    with pytest.raises(ValueError):
+        codec.loads(b'{"data": [{"id": 1}, ')
@@ -0,0 +1,44 @@
+import asyncio
+from types import SimpleNamespace
+
+from telegram.ext import ConversationHandler
+
+from handlers.calculation_states import CalcStates
+from handlers.flow import Flow, Step
+from services import DialogSteps
+
+
+def make_flow(dialogs: DialogSteps, returns: int) -> Flow:
+    async def step(update, context):
+        return returns
+
+    flow = Flow(
+        [Step(CalcStates.FENCE_TYPE, on_callback=step)],
+        page_handler=step,
+        dialogs=lambda: dialogs,
+    )
+    flow.compile()
+    return flow
+
+
+def run_step(flow: Flow, user_id: int) -> None:
+    (handler,) = flow.table[CalcStates.FENCE_TYPE.value]
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=user_id))
+    asyncio.run(handler.callback(update, SimpleNamespace(user_data=None)))
+
+
+def test_step_transitions_are_counted():
+    dialogs = DialogSteps()
+    run_step(make_flow(dialogs, CalcStates.FENCE_POPULAR_SPECS.value), user_id=1)
+    run_step(make_flow(dialogs, CalcStates.FENCE_POPULAR_SPECS.value), user_id=2)
+    assert dialogs.counts() == {"FENCE_POPULAR_SPECS": 2}
+
+    run_step(make_flow(dialogs, ConversationHandler.END), user_id=1)
+    assert dialogs.counts() == {"FENCE_POPULAR_SPECS": 1}
+
+
+def test_idle_dialogs_are_forgotten():
+    dialogs = DialogSteps(idle_seconds=-1)
+    dialogs.enter(1, "FENCE_TYPE")
+    assert dialogs.counts() == {}
+    assert len(dialogs) == 0
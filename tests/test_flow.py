@@ -0,0 +1,30 @@
+from telegram import CallbackQuery, Update, User
+
+from handlers.calculation_conversation import calculation_flow
+from handlers.calculation_states import CalcStates
+from services import callback_registry
+from services.callback_registry import FenceSpecChoice
+from services.history import HistoryAction
+
+
+def callback_update(data: str) -> Update:
+    query = CallbackQuery("1", User(1, "user", False), chat_instance="chat", data=data)
+    return Update(1, callback_query=query)
+
+
+def step_accepts(state: CalcStates, data: str) -> bool:
+    handlers = calculation_flow.compile()[state.value]
+    update = callback_update(data)
+    return any(handler.check_update(update) not in (None, False) for handler in handlers)
+
+
+def test_steps_accept_only_their_own_buttons():
+    history = callback_registry.issue(HistoryAction(1, "open"))
+    spec = callback_registry.issue(FenceSpecChoice(3, 2.0))
+
+    assert step_accepts(CalcStates.MOUNTING_TYPE, "12")
+    assert not step_accepts(CalcStates.MOUNTING_TYPE, history)
+    assert not step_accepts(CalcStates.FENCE_TYPE, "price_file")
+    assert step_accepts(CalcStates.FENCE_VARIANTS, spec)
+    assert not step_accepts(CalcStates.GATE_TYPE, spec)
+    assert step_accepts(CalcStates.GATE_VARIANTS, "no_gate_variant")
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from services.jobs import JobQueueFull, JobRunner
+
+
+def test_queue_limit_and_completion():
+    async def scenario():
+        runner = JobRunner(workers=1, queue_size=2)
+        done = []
+
+        async def job(n):
+            done.append(n)
+
+        runner.submit("a", lambda: job(1))
+        runner.submit("b", lambda: job(2))
+        with pytest.raises(JobQueueFull):
+            runner.submit("c", lambda: job(3))
+        runner.start()
+        await runner.shutdown()
+        return runner, done
+
+    runner, done = asyncio.run(scenario())
+    assert done == [1, 2]
+    assert runner.completed == 2
+
+
+def test_timeout_and_failure_do_not_stop_the_worker():
+    async def scenario():
+        runner = JobRunner(workers=1, queue_size=10)
+        runner.start()
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        async def ok():
+            pass
+
+        runner.submit("hang", hang, timeout=0.01)
+        runner.submit("fail", fail)
+        runner.submit("ok", ok)
+        await runner.shutdown()
+        return runner
+
+    runner = asyncio.run(scenario())
+    assert (runner.timed_out, runner.failed, runner.completed) == (1, 1, 1)
+
+
+def test_cancel_by_key_queued_and_running():
+    async def scenario():
+        runner = JobRunner(workers=1, queue_size=10)
+        started = asyncio.Event()
+
+        async def running():
+            started.set()
+            await asyncio.sleep(10)
+
+        async def queued():
+            raise AssertionError("cancelled job must not run")
+
+        runner.submit("running", running, key="r")
+        runner.submit("queued", queued, key="q")
+        assert runner.cancel("q")
+        runner.start()
+        await started.wait()
+        assert runner.cancel("r")
+        assert not runner.cancel("missing")
+        await runner.shutdown()
+        return runner
+
+    runner = asyncio.run(scenario())
+    assert runner.cancelled == 2
+    assert runner.failed == 0
+
+
+def test_shutdown_rejects_new_jobs():
+    async def scenario():
+        runner = JobRunner(workers=1, queue_size=10)
+        runner.start()
+        await runner.shutdown()
+        assert not runner.accepting
+
+        async def job():
+            pass
+
+        with pytest.raises(JobQueueFull):
+            runner.submit("late", job)
+
+    asyncio.run(scenario())
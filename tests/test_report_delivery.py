@@ -0,0 +1,254 @@
+import asyncio
+from types import SimpleNamespace
+
+from telegram.error import RetryAfter
+
+from services import reports
+from services.jobs import JobRunner
+from services.reports import PendingReports, ReportDelivery
+
+
+class FakeResponse:
+    def __init__(self, status: int, body: bytes):
+        self.status = status
+        self._body = body
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeBackend:
+    """Отчёт готов после ready_after опросов статуса."""
+
+    def __init__(self, ready_after: int = 1):
+        self._ready_after = ready_after
+        self.polls: dict[str, int] = {}
+
+    def request(self, method: str, path: str):
+        report_id = path.split("/")[1]
+        if path.endswith("/status"):
+            self.polls[report_id] = self.polls.get(report_id, 0) + 1
+            if self.polls[report_id] >= self._ready_after:
+                return FakeResponse(200, b'{"status": "success"}')
+            return FakeResponse(202, b'{"status": "pending"}')
+        return FakeResponse(200, b"%PDF-1.4")
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent: list[int] = []
+
+    async def send_document(self, chat_id, document, filename=None, caption=None):
+        self.sent.append(chat_id)
+        return SimpleNamespace(document=None)
+
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+
+
+def test_reports_beyond_worker_count_are_all_delivered(monkeypatch):
+    monkeypatch.setattr(reports, "REPORT_POLL_INTERVAL", 0.05)
+
+    async def scenario():
+        runner = JobRunner(workers=2, queue_size=100)
+        runner.start()
+        pending = PendingReports(None, deadline_seconds=0.5)
+        delivery = ReportDelivery(FakeBackend(ready_after=3), pending, runner)
+        bot = FakeBot()
+        for chat_id in range(20):
+            assert delivery.deliver(bot, f"r{chat_id}", chat_id)
+        # ожидание в очереди не съедает дедлайн, а опросы не держат воркеры
+        await wait_for(lambda: len(pending) == 0)
+        await runner.shutdown()
+        return bot
+
+    bot = asyncio.run(scenario())
+    assert sorted(bot.sent) == list(range(20))
+
+
+def test_report_is_dropped_after_deadline(monkeypatch):
+    monkeypatch.setattr(reports, "REPORT_POLL_INTERVAL", 0.02)
+
+    async def scenario():
+        runner = JobRunner(workers=1, queue_size=10)
+        runner.start()
+        pending = PendingReports(None, deadline_seconds=0.1)
+        backend = FakeBackend(ready_after=1000)
+        delivery = ReportDelivery(backend, pending, runner)
+        bot = FakeBot()
+        delivery.deliver(bot, "r1", 1)
+        await wait_for(lambda: len(pending) == 0)
+        await runner.shutdown()
+        return bot, backend
+
+    bot, backend = asyncio.run(scenario())
+    assert bot.sent == []
+    assert backend.polls["r1"] > 1
+
+
+def test_full_queue_is_retried(monkeypatch):
+    monkeypatch.setattr(reports, "REPORT_RETRY_SECONDS", 0.02)
+
+    async def scenario():
+        runner = JobRunner(workers=1, queue_size=1)
+        pending = PendingReports(None)
+        delivery = ReportDelivery(FakeBackend(), pending, runner)
+        bot = FakeBot()
+        accepted = [delivery.deliver(bot, f"r{chat_id}", chat_id) for chat_id in range(3)]
+        runner.start()
+        await wait_for(lambda: len(pending) == 0)
+        await runner.shutdown()
+        return accepted, bot
+
+    accepted, bot = asyncio.run(scenario())
+    assert accepted == [True, False, False]
+    assert sorted(bot.sent) == [0, 1, 2]
+
+
+def test_stop_keeps_undelivered_reports(monkeypatch):
+    monkeypatch.setattr(reports, "REPORT_POLL_INTERVAL", 0.02)
+
+    async def scenario():
+        runner = JobRunner(workers=1, queue_size=10)
+        runner.start()
+        pending = PendingReports(None)
+        backend = FakeBackend(ready_after=1000)
+        delivery = ReportDelivery(backend, pending, runner)
+        delivery.deliver(FakeBot(), "r1", 1)
+        await wait_for(lambda: backend.polls.get("r1", 0) >= 2)
+        delivery.stop()
+        await runner.shutdown()
+        polls = backend.polls["r1"]
+        await asyncio.sleep(0.1)
+        return pending, polls, backend.polls["r1"]
+
+    pending, polls_at_stop, polls_later = asyncio.run(scenario())
+    assert "r1" in pending
+    assert polls_later == polls_at_stop
+
+
+class FloodedBot(FakeBot):
+    """Первая отправка упирается во flood control Telegram."""
+
+    def __init__(self):
+        super().__init__()
+        self.flooded = False
+
+    async def send_document(self, chat_id, document, filename=None, caption=None):
+        if not self.flooded:
+            self.flooded = True
+            raise RetryAfter(0)
+        return await super().send_document(chat_id, document, filename, caption)
+
+
+def test_flood_control_retries_ready_report():
+    async def scenario():
+        runner = JobRunner(workers=1, queue_size=10)
+        runner.start()
+        pending = PendingReports(None)
+        delivery = ReportDelivery(FakeBackend(), pending, runner)
+        bot = FloodedBot()
+        delivery.deliver(bot, "r1", 1)
+        await wait_for(lambda: len(pending) == 0)
+        await runner.shutdown()
+        return bot
+
+    bot = asyncio.run(scenario())
+    assert bot.sent == [1]
+
+
+class HangingResponse(FakeResponse):
+    def __init__(self):
+        super().__init__(200, b"")
+
+    async def __aenter__(self):
+        await asyncio.Event().wait()
+
+
+class HangingBackend(FakeBackend):
+    """Эндпоинт статуса не отвечает вовсе."""
+
+    def request(self, method: str, path: str):
+        report_id = path.split("/")[1]
+        self.polls[report_id] = self.polls.get(report_id, 0) + 1
+        return HangingResponse()
+
+
+def test_hanging_status_is_dropped_after_deadline(monkeypatch):
+    monkeypatch.setattr(reports, "REPORT_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(reports, "REPORT_POLL_TIMEOUT", 0.02)
+
+    async def scenario():
+        runner = JobRunner(workers=1, queue_size=10)
+        runner.start()
+        pending = PendingReports(None, deadline_seconds=0.1)
+        backend = HangingBackend()
+        ReportDelivery(backend, pending, runner).deliver(FakeBot(), "r1", 1)
+        await wait_for(lambda: len(pending) == 0)
+        await runner.shutdown()
+        return backend, runner
+
+    backend, runner = asyncio.run(scenario())
+    assert backend.polls["r1"] > 1
+    assert runner.timed_out == backend.polls["r1"]
+
+
+def test_cancelled_delivery_is_not_rescheduled(monkeypatch):
+    monkeypatch.setattr(reports, "REPORT_POLL_INTERVAL", 0.01)
+
+    async def scenario():
+        runner = JobRunner(workers=1, queue_size=10)
+        runner.start()
+        pending = PendingReports(None)
+        backend = HangingBackend()
+        ReportDelivery(backend, pending, runner).deliver(FakeBot(), "r1", 1)
+        await wait_for(lambda: runner.running == 1)
+        assert runner.cancel("r1")
+        await wait_for(lambda: runner.running == 0)
+        await asyncio.sleep(0.05)
+        await runner.shutdown()
+        return backend, pending
+
+    backend, pending = asyncio.run(scenario())
+    assert backend.polls["r1"] == 1
+    assert "r1" not in pending
+
+
+def test_pending_file_is_written_in_batches(monkeypatch, tmp_path):
+    monkeypatch.setattr(reports, "PENDING_SAVE_DEBOUNCE_SECONDS", 0.02)
+    path = tmp_path / "pending.json"
+    writes = []
+    original_write = PendingReports._write
+
+    def counting_write(self, version, payload):
+        writes.append(version)
+        original_write(self, version, payload)
+
+    monkeypatch.setattr(PendingReports, "_write", counting_write)
+
+    async def scenario():
+        pending = PendingReports(path)
+        for number in range(50):
+            pending.track(f"r{number}", number)
+        pending.done("r0")
+        await asyncio.sleep(0.1)
+        pending.track("late", 1)
+        # остановка не ждёт фоновой записи
+        pending.flush()
+
+    asyncio.run(scenario())
+    assert len(writes) == 2
+    restored = PendingReports(path)
+    restored.load()
+    assert len(restored) == 50
+    assert "late" in restored and "r0" not in restored
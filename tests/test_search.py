@@ -0,0 +1,21 @@
+from services.search import SearchIndex, SearchItem, parse_search_payload, search_payload
+
+
+def test_accessories_of_fences_and_gates_have_distinct_keys():
+    index = SearchIndex([
+        SearchItem("fence_accessory", 7, "Заглушка столба"),
+        SearchItem("gate_accessory", 7, "Заглушка столба"),
+        SearchItem("gate_accessory", 7, "Заглушка столба"),
+    ])
+
+    results = index.search("заглушка")
+    assert len({(item.kind, item.id) for item in results}) == len(results) == 2
+
+
+def test_payload_round_trip():
+    item = SearchItem("gate_accessory", 42, "Петля")
+    payload = search_payload(item)
+
+    assert parse_search_payload(payload) == ("gate_accessory", 42)
+    assert parse_search_payload("calc-fence-") is None
+    assert parse_search_payload("ref-123") is None
@@ -0,0 +1,67 @@
+import asyncio
+from types import SimpleNamespace
+
+from handlers import calculation_conversation
+from handlers.calculation_states import CalcStates
+from handlers.inline_search import SEARCH_PICK_KEY, take_search_pick
+
+FENCES = [{"id": 7, "typeId": 2, "name": "Профнастил С8", "height": 1800}]
+
+
+class FakeCatalog:
+    def __init__(self, specs: list[dict]):
+        self._specs = specs
+
+    async def all_fences(self):
+        return SimpleNamespace(items=FENCES)
+
+    async def fence_popular_specs(self, type_id: int):
+        return SimpleNamespace(items=self._specs)
+
+
+class FakeMessage:
+    def __init__(self):
+        self.replies: list[str] = []
+
+    async def reply_text(self, text: str, reply_markup=None):
+        self.replies.append(text)
+
+
+def begin_from_fence(monkeypatch, specs: list[dict], fence_id: int = 7):
+    tenant = SimpleNamespace(catalog=FakeCatalog(specs))
+    monkeypatch.setattr(calculation_conversation, "current_tenant", lambda: tenant)
+    update = SimpleNamespace(effective_message=FakeMessage())
+    context = SimpleNamespace(user_data={})
+    state = asyncio.run(calculation_conversation._begin_from_fence(update, context, fence_id))
+    return state, context.user_data
+
+
+def test_fence_from_search_goes_straight_to_length(monkeypatch):
+    state, user_data = begin_from_fence(monkeypatch, [{"spec_id": 11, "height": 1800}])
+
+    assert state == CalcStates.FENCE_LENGTH.value
+    assert user_data["fence_type_id"] == 2
+    assert user_data["fence_spec_id"] == 11
+    assert user_data["fence_height"] == 1.8
+    assert user_data["fence_variant_id"] == 7
+
+
+def test_fence_with_unpopular_height_starts_from_height(monkeypatch):
+    state, user_data = begin_from_fence(monkeypatch, [{"spec_id": 12, "height": 2000}])
+
+    assert state == CalcStates.FENCE_VARIANTS.value
+    assert user_data["fence_type_id"] == 2
+    assert "fence_variant_id" not in user_data
+
+
+def test_unknown_fence_starts_from_the_beginning(monkeypatch):
+    state, _ = begin_from_fence(monkeypatch, [], fence_id=99)
+    assert state is None
+
+
+def test_search_pick_is_taken_once_by_its_kind():
+    user_data = {SEARCH_PICK_KEY: ("gate", 5)}
+
+    assert take_search_pick(user_data, "fence_accessory") is None
+    assert take_search_pick(user_data, "gate") == 5
+    assert take_search_pick(user_data, "gate") is None
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from services import broadcast
+from services.broadcast import BROADCAST, SendBudget
+
+
+async def send(budget: SendBudget, kind=None):
+    async def callback():
+        return True
+
+    return await budget.process_request(callback, (), {}, "sendMessage", {}, kind)
+
+
+def test_normal_traffic_window_is_pruned(monkeypatch):
+    monkeypatch.setattr(broadcast, "RATE_WINDOW_SECONDS", 0.05)
+
+    async def scenario():
+        budget = SendBudget(broadcast_rate=20, global_rate=30, reserve=5)
+        for _ in range(40):
+            await send(budget)
+        # диалоги заняли весь предел — рассылке сейчас ничего не остаётся
+        assert budget._limit() <= 0
+        await asyncio.sleep(0.06)
+        await send(budget)
+        return budget
+
+    budget = asyncio.run(scenario())
+    assert len(budget._normal) == 1
+    assert budget._limit() == 20
+
+
+def test_broadcast_waits_for_normal_traffic_to_leave_the_window(monkeypatch):
+    monkeypatch.setattr(broadcast, "RATE_WINDOW_SECONDS", 0.05)
+
+    async def scenario():
+        budget = SendBudget(broadcast_rate=20, global_rate=30, reserve=5)
+        for _ in range(30):
+            await send(budget)
+        return await asyncio.wait_for(send(budget, BROADCAST), 1.0)
+
+    assert asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("rate, reserve", [(0, 5), (20, 30)])
+def test_non_positive_broadcast_rate_is_rejected(rate, reserve):
+    with pytest.raises(ValueError):
+        SendBudget(broadcast_rate=rate, global_rate=30, reserve=reserve)
@@ -0,0 +1,49 @@
+from services.snapshot import _HEADER, CatalogSnapshot, encode_items
+
+FENCES = [{"id": 1, "name": "Профнастил С8"}, {"id": 2, "name": "Штакетник"}]
+GATES = [{"id": 7, "name": "Распашные 3 м"}]
+
+
+def write_snapshot(path):
+    CatalogSnapshot(path).write([
+        ("fences", '"v1"', "Mon, 01 Jan 2024 00:00:00 GMT", "c-10", encode_items(FENCES)),
+        ("gates", None, None, None, encode_items(GATES)),
+    ])
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "catalog.snapshot"
+    write_snapshot(path)
+
+    snapshot = CatalogSnapshot(path)
+    assert len(snapshot) == 2
+    assert "fences" in snapshot and "mountings" not in snapshot
+
+    section, items = snapshot.section("fences")
+    assert items == FENCES
+    assert (section.etag, section.last_modified, section.cursor) == ('"v1"', "Mon, 01 Jan 2024 00:00:00 GMT", "c-10")
+    assert snapshot.section("gates")[1] == GATES
+    assert snapshot.written_at is not None
+
+
+def test_corrupted_section_is_ignored(tmp_path):
+    path = tmp_path / "catalog.snapshot"
+    write_snapshot(path)
+    raw = bytearray(path.read_bytes())
+    # портим последний байт данных — это секция gates
+    raw[-2] ^= 0xFF
+    path.write_bytes(bytes(raw))
+
+    snapshot = CatalogSnapshot(path)
+    assert snapshot.section("gates") is None
+    assert "gates" not in snapshot
+    assert snapshot.section("fences")[1] == FENCES
+
+
+def test_unknown_format_and_missing_file_give_empty_snapshot(tmp_path):
+    assert len(CatalogSnapshot(tmp_path / "missing.snapshot")) == 0
+    assert len(CatalogSnapshot(None)) == 0
+
+    path = tmp_path / "catalog.snapshot"
+    path.write_bytes(b"NOPE" + bytes(_HEADER.size))
+    assert len(CatalogSnapshot(path)) == 0
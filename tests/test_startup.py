@@ -0,0 +1,18 @@
+import gc
+
+from main import finish_startup
+
+
+def test_startup_freeze_only_after_entry_point_disabled_gc():
+    frozen = gc.get_freeze_count()
+    finish_startup()
+    assert gc.get_freeze_count() == frozen
+
+    gc.disable()
+    try:
+        finish_startup()
+        assert gc.isenabled()
+        assert gc.get_freeze_count() > frozen
+    finally:
+        gc.unfreeze()
+        gc.enable()
@@ -0,0 +1,29 @@
+import json
+
+from services.tracing import Tracer
+
+
+def test_spans_are_written_on_close(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(path, flush_every=2)
+    for n in range(5):
+        with tracer.span("step", n=n):
+            pass
+    tracer.close()
+
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [record["attrs"]["n"] for record in records] == list(range(5))
+
+
+def test_file_is_rotated_past_max_bytes(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(path, flush_every=1, max_bytes=200)
+    for n in range(10):
+        with tracer.span("step", n=n):
+            pass
+    tracer.close()
+
+    rotated = path.with_name("traces.jsonl.1")
+    assert rotated.exists()
+    assert path.stat().st_size < 400
+    assert rotated.stat().st_size < 400